@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from HSM_AI.helper.cache_versions import get_version, get_versions
+
+# Never cached: loaded lazily from the DB if a view ever touches them
+PRINCIPAL_EXCLUDED_FIELDS = ("password", "otp_code", "otp_created_at")
+
+
+def principal_cache_key(user_id):
+    return f"principal:{user_id}"
+
+
+def build_principal_snapshot(user, user_version):
+    """
+    Builds the cacheable snapshot of a user (concrete fields + role id/name),
+    tagged with the user and role versions it was built against. The user
+    version must be read *before* the row is loaded so a concurrent save
+    can never be masked.
+    """
+    field_names = [
+        f.attname
+        for f in user._meta.concrete_fields
+        if f.attname not in PRINCIPAL_EXCLUDED_FIELDS
+    ]
+    role_version = get_version("role", user.role_id)
+    return {
+        "user_version": user_version,
+        "role_version": role_version,
+        "fields": field_names,
+        "values": [getattr(user, name) for name in field_names],
+        "role_id": user.role_id,
+        "role_name": user.role.role_name if user.role_id else None,
+    }
+
+
+def principal_from_snapshot(user_model, snapshot):
+    """
+    Rebuilds a `Users` instance from a snapshot. Excluded fields are deferred,
+    so `save()` on the instance only writes the fields that were loaded.
+    """
+    from roles_permissions.models import Role
+
+    user = user_model.from_db(DEFAULT_DB_ALIAS, snapshot["fields"], snapshot["values"])
+    if snapshot["role_id"]:
+        user._state.fields_cache["role"] = Role.from_db(
+            DEFAULT_DB_ALIAS,
+            ["id", "role_name"],
+            [snapshot["role_id"], snapshot["role_name"]],
+        )
+    return user
+
+
+def get_cached_principal(user_model, user_id):
+    """
+    Returns the principal for `user_id` from cache, or None when the snapshot
+    is missing or was built against an outdated user/role version.
+    """
+    snapshot = cache.get(principal_cache_key(user_id))
+    if not snapshot:
+        return None
+
+    user_version, role_version = get_versions(
+        ("user", user_id), ("role", snapshot["role_id"])
+    )
+    if (
+        snapshot["user_version"] != user_version
+        or snapshot["role_version"] != role_version
+    ):
+        return None
+    return principal_from_snapshot(user_model, snapshot)
+
+
+def cache_principal(user, user_version):
+    cache.set(
+        principal_cache_key(user.pk),
+        build_principal_snapshot(user, user_version),
+        timeout=settings.PRINCIPAL_CACHE_TIMEOUT,
+    )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Drop-in replacement for simplejwt's `JWTAuthentication` that resolves the
+    user from a versioned cache snapshot instead of querying `Users` on every
+    request. Snapshots are invalidated by the version bumps in
+    `authentication.signals` (user save/soft delete, role save).
+    """
+
+    def get_user(self, validated_token):
+        if getattr(api_settings, "CHECK_REVOKE_TOKEN", False):
+            # Revocation check needs the password hash, which is never cached
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_principal(self.user_model, user_id)
+        if user is None:
+            user_version = get_version("user", user_id)
+            try:
+                user = self.user_model.objects.select_related("role").get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache_principal(user, user_version)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
@@ -0,0 +1,183 @@
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from HSM_AI import utils
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Copied from the batch request into every sub-request (minus body/routing keys)
+SKIPPED_ENVIRON_KEYS = (
+    "wsgi.input",
+    "REQUEST_METHOD",
+    "PATH_INFO",
+    "SCRIPT_NAME",
+    "QUERY_STRING",
+    "CONTENT_TYPE",
+    "CONTENT_LENGTH",
+    "HTTP_ACCEPT",
+)
+
+
+def build_sub_request(request, method, path, query=None, body=None):
+    """
+    Builds a WSGIRequest for one sub-request, sharing the batch request's
+    headers and its already-authenticated user (DRF's forced authentication),
+    so the JWT is verified once for the whole batch.
+    """
+    path, _, inline_query = path.partition("?")
+    if isinstance(query, dict):
+        query = urlencode(query, doseq=True)
+    query_string = "&".join(filter(None, [inline_query, query]))
+
+    payload = b"" if body is None else json.dumps(body).encode("utf-8")
+    environ = {
+        key: value
+        for key, value in request.META.items()
+        if key not in SKIPPED_ENVIRON_KEYS
+    }
+    environ.update(
+        {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": query_string,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(payload)),
+            # sub-responses are decoded as JSON whatever the batch itself negotiates
+            "HTTP_ACCEPT": "application/json",
+            "wsgi.input": io.BytesIO(payload),
+        }
+    )
+    sub_request = WSGIRequest(environ)
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def dispatch_sub_request(request, spec):
+    """
+    Runs one sub-request through the URLconf (views only, no middleware) and
+    returns {"id", "status", "headers", "body"}.
+    """
+    method = str(spec.get("method", "GET")).upper()
+    path = spec.get("path") or ""
+    result = {"id": spec.get("id", path)}
+
+    try:
+        match = resolve(path.partition("?")[0])
+    except Resolver404:
+        return {**result, "status": 404, "headers": {}, "body": {"message": "Not found."}}
+    if getattr(match.func, "view_class", None) is BatchView:
+        return {
+            **result,
+            "status": 400,
+            "headers": {},
+            "body": {"message": "Batch requests can't be nested."},
+        }
+
+    sub_request = build_sub_request(
+        request, method, path, spec.get("query"), spec.get("body")
+    )
+    sub_request.resolver_match = match
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", method, path)
+        return {
+            **result,
+            "status": 500,
+            "headers": {},
+            "body": {"message": "Internal server error."},
+        }
+
+    if getattr(response, "streaming", False):
+        return {
+            **result,
+            "status": 400,
+            "headers": {},
+            "body": {"message": "Streaming responses are not supported in a batch."},
+        }
+
+    content = response.content.decode(response.charset or "utf-8")
+    try:
+        body = json.loads(content) if content else None
+    except ValueError:
+        body = content
+    return {
+        **result,
+        "status": response.status_code,
+        "headers": dict(response.items()),
+        "body": body,
+    }
+
+
+def _dispatch_in_thread(request, spec):
+    try:
+        return dispatch_sub_request(request, spec)
+    finally:
+        # worker threads open their own DB connections
+        connections.close_all()
+
+
+class BatchView(APIView):
+    """
+    Runs several API calls in one round-trip.
+
+    Body: {"requests": [{"id", "method", "path", "query", "body"}, ...],
+    "parallel": false}. Sub-requests go through the URLconf in order, with
+    the caller's authentication resolved once. With `parallel` and only
+    read-only methods, they run concurrently. Responses come back in
+    request order as {"id", "status", "headers", "body"}.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # a JSON array (or scalar) body has no "requests" key
+        specs = request.data.get("requests") if isinstance(request.data, dict) else None
+        if not isinstance(specs, list) or not all(isinstance(s, dict) for s in specs):
+            return utils.error_response(
+                "Invalid batch.",
+                "`requests` must be a list of objects.",
+                status.HTTP_400_BAD_REQUEST,
+            )
+        if len(specs) > settings.BATCH_MAX_REQUESTS:
+            return utils.error_response(
+                "Too many requests in batch.",
+                f"At most {settings.BATCH_MAX_REQUESTS} sub-requests are allowed.",
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        parallel = bool(request.data.get("parallel")) and all(
+            str(spec.get("method", "GET")).upper() in SAFE_METHODS for spec in specs
+        )
+        if parallel and len(specs) > 1:
+            with ThreadPoolExecutor(
+                max_workers=min(len(specs), settings.BATCH_MAX_WORKERS)
+            ) as pool:
+                responses = list(
+                    pool.map(lambda spec: _dispatch_in_thread(request, spec), specs)
+                )
+        else:
+            responses = [dispatch_sub_request(request, spec) for spec in specs]
+
+        return utils.success_response(
+            message="Batch processed successfully.",
+            data={"responses": responses},
+            status_code=status.HTTP_200_OK,
+        )
@@ -1,12 +1,11 @@
-# import os
-# from celery import Celery
-# from celery.schedules import crontab
+import os
+from celery import Celery
 
-# os.environ.setdefault("DJANGO_SETTINGS_MODULE", "HSM_AI.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "HSM_AI.settings")
 
-# app = Celery("HSM_AI")
-# app.config_from_object("django.conf:settings", namespace="CELERY")
-# app.autodiscover_tasks()
+app = Celery("HSM_AI")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
 
 # ## Celery Beat schedule (runs every 10 seconds)
 # # app.conf.beat_schedule = {
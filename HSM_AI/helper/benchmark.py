@@ -0,0 +1,87 @@
+import statistics
+import time
+
+from django.db import connections
+
+from HSM_AI.helper.query_budget import count_queries
+
+
+def measure(fn, repeat=100, warmup=3):
+    """
+    Calls `fn()` `warmup` + `repeat` times and returns timings of the measured
+    calls: {"calls", "queries" (per call), "mean_ms", "p50_ms", "p95_ms"}.
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    with count_queries() as stats:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "calls": repeat,
+        "queries": round(stats.count / repeat, 2),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+
+def format_table(rows, columns):
+    """
+    Renders a list of dicts as a fixed-width text table (management command output).
+    """
+    widths = {
+        column: max(len(column), *(len(str(row.get(column, ""))) for row in rows))
+        for column in columns
+    }
+    lines = ["  ".join(column.ljust(widths[column]) for column in columns)]
+    lines.append("  ".join("-" * widths[column] for column in columns))
+    for row in rows:
+        lines.append(
+            "  ".join(str(row.get(column, "")).ljust(widths[column]) for column in columns)
+        )
+    return "\n".join(lines)
+
+
+def relation_size(model, using="default"):
+    """
+    Returns the on-disk size in bytes of a model's table including its indexes
+    and TOAST (Postgres only, None elsewhere).
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_total_relation_size(%s)", [model._meta.db_table])
+        return cursor.fetchone()[0]
+
+
+def index_sizes(model, using="default"):
+    """
+    Returns {index name: bytes} for a model's table (Postgres only, {} elsewhere).
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexrelid::regclass::text, pg_relation_size(indexrelid) "
+            "FROM pg_index WHERE indrelid = %s::regclass",
+            [model._meta.db_table],
+        )
+        return dict(cursor.fetchall())
+
+
+def format_bytes(size):
+    if size is None:
+        return "n/a"
+    for unit in ("B", "kB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
@@ -0,0 +1,87 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Counters in these backends are private to one process (or not kept at all)
+PROCESS_LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def version_key(scope, key=None):
+    """
+    Returns the cache key that holds the version counter for a scope.
+    `scope` is a logical name ("user", "role", ...) and `key` an optional id.
+    """
+    if key is None:
+        return f"ver:{scope}"
+    return f"ver:{scope}:{key}"
+
+
+def new_version():
+    """
+    Starting value for a counter that is missing (never set, evicted, cache
+    flushed). Wall-clock nanoseconds are above anything the counter held
+    before, so entries tagged with an old value can never become valid again
+    (restarting at 0/1 would revive them).
+    """
+    return time.time_ns()
+
+
+def versions_are_shared():
+    """
+    True when version counters live in a cache every process sees, so a bump
+    anywhere is visible everywhere. Only then may a version carried by a
+    client (e.g. a token's `perm_ver`) stand in for a DB check.
+    """
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_BACKENDS
+
+
+def get_version(scope, key=None):
+    """
+    Returns the current version counter for a scope, seeding it when missing.
+    """
+    return get_versions((scope, key))[0]
+
+
+def get_versions(*pairs):
+    """
+    Returns the version counters for several (scope, key) pairs in one cache
+    round-trip (plus one to seed missing counters).
+    """
+    keys = [version_key(scope, key) for scope, key in pairs]
+    found = cache.get_many(keys)
+    missing = [k for k in dict.fromkeys(keys) if k not in found]
+    if missing:
+        seeds = {k: new_version() for k in missing}
+        for k, seed in seeds.items():
+            # add(): a concurrent seed or bump wins, re-read below
+            cache.add(k, seed, timeout=None)
+        stored = cache.get_many(missing)
+        found.update({k: stored.get(k, seeds[k]) for k in missing})
+    return [found[k] for k in keys]
+
+
+def bump_version(scope, key=None):
+    """
+    Increments the version counter for a scope once the current transaction
+    commits (immediately in autocommit), invalidating every cache entry that
+    embedded the previous value. Bumping before commit would let a concurrent
+    reader cache the pre-commit rows under the new version.
+    """
+    cache_key = version_key(scope, key)
+    transaction.on_commit(lambda: _incr_version(cache_key))
+
+
+def _incr_version(cache_key):
+    try:
+        return cache.incr(cache_key)
+    except ValueError:
+        # Missing or evicted: a fresh seed is above every previous value
+        seed = new_version()
+        if cache.add(cache_key, seed, timeout=None):
+            return seed
+        return cache.incr(cache_key)
@@ -0,0 +1,115 @@
+import hashlib
+
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from HSM_AI.helper.cache_versions import get_versions
+
+
+class NotModified(Exception):
+    """Raised from `initial()` when the client's validators still match."""
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for GET endpoints.
+
+    Views implement `get_conditional_validators()` returning
+    (token, last_modified) - usually via `list_validators(scope, ...)` or
+    `object_validators()` - or None to skip. Validators are checked after
+    authentication and permissions but before any serialization; a match
+    answers `304 Not Modified` with an empty body.
+
+    The ETag also covers the query string, the negotiated format and the
+    cache versions in `conditional_versions` (e.g. ("roles",) when role
+    names are embedded), so it changes whenever the response body would.
+    """
+
+    conditional_versions = ()
+    _etag = None
+    _last_modified = None
+
+    def get_conditional_validators(self, request, *args, **kwargs):
+        return None
+
+    def list_validators(self, *scopes):
+        """
+        Table-wide cache versions (e.g. "users"), bumped on every write to the
+        table: any insert, update or (soft) delete changes the token, and
+        checking it costs no query. Lists carry no Last-Modified.
+        """
+        versions = get_versions(*((scope, None) for scope in scopes))
+        return ".".join(str(v) for v in versions), None
+
+    def object_validators(self, queryset, pk):
+        """
+        Per-object `modified_date` (primary key lookup). None when the object
+        doesn't exist, so the view produces its usual 404.
+        """
+        last_modified = (
+            queryset.filter(pk=pk).values_list("modified_date", flat=True).first()
+        )
+        if last_modified is None:
+            return None
+        return f"{pk}:{last_modified.isoformat()}", last_modified
+
+    def build_etag(self, request, token):
+        versions = get_versions(*((scope, None) for scope in self.conditional_versions))
+        renderer = getattr(request, "accepted_renderer", None)
+        raw = "|".join(
+            [
+                type(self).__name__,
+                request.get_full_path(),
+                getattr(renderer, "format", ""),
+                token,
+                ".".join(str(v) for v in versions),
+            ]
+        )
+        return 'W/"%s"' % hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_not_modified(request, etag, last_modified):
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match:
+            # weak comparison (RFC 9110 13.1.2)
+            etags = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+            return "*" in etags or etag.removeprefix("W/") in etags
+
+        if_modified_since = parse_http_date_safe(
+            request.META.get("HTTP_IF_MODIFIED_SINCE", "")
+        )
+        return (
+            if_modified_since is not None
+            and last_modified is not None
+            and int(last_modified.timestamp()) <= if_modified_since
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in ("GET", "HEAD"):
+            return
+
+        validators = self.get_conditional_validators(request, *args, **kwargs)
+        if validators is None:
+            return
+        token, last_modified = validators
+        self._etag = self.build_etag(request, token)
+        self._last_modified = last_modified
+        if self.is_not_modified(request, self._etag, last_modified):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._etag and response.status_code in (200, 304):
+            response["ETag"] = self._etag
+            if self._last_modified is not None:
+                response["Last-Modified"] = http_date(self._last_modified.timestamp())
+            # always revalidate; per-user data must not sit in shared caches
+            response["Cache-Control"] = "private, no-cache"
+        return response
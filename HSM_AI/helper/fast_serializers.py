@@ -0,0 +1,104 @@
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.relations import RelatedField
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path producing the same output as a DRF serializer, from
+    `values()` rows instead of model instances.
+
+    The serializer's readable fields (after `?fields=` / `?exclude=`) are
+    compiled once into (name, reader) pairs; each row is then a single dict
+    comprehension, with no model instantiation, get_attribute walks or
+    SkipField handling. Fields the generic compiler can't express (method
+    fields, related attributes, nested JSON) are declared on the serializer as
+    `values_overrides = {name: (columns, fn(row))}`.
+
+    Usage:
+        reader = ValuesSerializer(UserSerializer, context)
+        page = paginator.paginate_queryset(reader.values(queryset), ...)
+        data = reader.serialize(page)
+    """
+
+    def __init__(self, serializer_class, context=None, extra_columns=()):
+        serializer = serializer_class(context=context or {})
+        overrides = getattr(serializer_class, "values_overrides", {})
+
+        self.columns = []
+        self.readers = []
+        for field in serializer._readable_fields:
+            name = field.field_name
+            if name in overrides:
+                columns, read = overrides[name]
+            elif field.source == "*":
+                raise ValueError(
+                    f"{serializer_class.__name__}.{name} needs a values_overrides entry"
+                )
+            else:
+                column = "__".join(field.source_attrs)
+                columns, read = (column,), self.compile_reader(field, column)
+            self.add_columns(columns)
+            self.readers.append((name, read))
+        # e.g. ordering columns a keyset cursor reads back from the rows
+        self.add_columns(extra_columns)
+
+    def add_columns(self, columns):
+        for column in columns:
+            if column not in self.columns:
+                self.columns.append(column)
+
+    @staticmethod
+    def compile_reader(field, column):
+        if isinstance(field, RelatedField) or type(field) in (
+            serializers.CharField,
+            serializers.EmailField,
+        ):
+            # values() already yields the pk / the str the field would return
+            return lambda row: row[column]
+        if type(field) is serializers.UUIDField and field.uuid_format == "hex_verbose":
+            return lambda row: None if row[column] is None else str(row[column])
+
+        convert = field.to_representation
+        return lambda row: None if row[column] is None else convert(row[column])
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def serialize(self, rows):
+        readers = self.readers
+        return [{name: read(row) for name, read in readers} for row in rows]
+
+
+class FastListMixin:
+    """
+    For list views: with FAST_LIST_SERIALIZATION, GET pages are fetched with
+    `values()` and serialized by a `ValuesSerializer` compiled from
+    `serializer_class`; otherwise the regular serializer (with `?fields=`
+    projection) is used. Writes never go through here.
+    Usage:
+        queryset = self.get_list_queryset()
+        page = self.paginate_queryset(queryset)
+        data = self.serialize_list(page)
+    """
+
+    values_serializer = None
+
+    def get_list_queryset(self):
+        queryset = self.get_queryset()
+        if not settings.FAST_LIST_SERIALIZATION:
+            return self.serializer_class.project_queryset(queryset, self.request)
+
+        # ordering columns stay in the rows for keyset cursors
+        ordering = [name.lstrip("-") for name in queryset.query.order_by]
+        self.values_serializer = ValuesSerializer(
+            self.serializer_class,
+            self.get_serializer_context(),
+            extra_columns=[name for name in ordering if "__" not in name],
+        )
+        return self.values_serializer.values(queryset)
+
+    def serialize_list(self, rows):
+        if self.values_serializer is None:
+            return self.get_serializer(rows, many=True).data
+        return self.values_serializer.serialize(rows)
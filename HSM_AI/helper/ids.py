@@ -0,0 +1,47 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_seq = 0
+
+
+def uuid7():
+    """
+    Returns a time-ordered UUID (RFC 9562 version 7): 48-bit unix ms timestamp,
+    12-bit sequence, 62 random bits. Ids generated later compare greater, so
+    B-tree inserts append at the right edge and `ORDER BY id` follows creation
+    time. Within the same millisecond the sequence keeps ids monotonic per process.
+    """
+    global _last_ms, _last_seq
+
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            _last_seq = int.from_bytes(os.urandom(2), "big") & 0x7FF  # leave room to count up
+        else:
+            # Same millisecond (or clock went back): keep counting on the last timestamp
+            _last_seq += 1
+            if _last_seq > 0xFFF:
+                _last_ms += 1
+                _last_seq = 0
+        ms, seq = _last_ms, _last_seq
+
+    rand = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | seq << 64 | 0b10 << 62 | rand
+    return uuid.UUID(int=value)
+
+
+def uuid7_timestamp(value):
+    """
+    Returns the unix timestamp (seconds, float) embedded in a UUIDv7, or None
+    for other versions (e.g. rows created before the switch from uuid4).
+    """
+    if not isinstance(value, uuid.UUID):
+        value = uuid.UUID(str(value))
+    if value.version != 7:
+        return None
+    return (value.int >> 80) / 1000
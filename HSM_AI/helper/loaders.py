@@ -0,0 +1,82 @@
+from django.db.models.functions import Lower
+
+
+class BatchLoader:
+    """
+    DataLoader-style memo for one model and lookup field.
+
+    Keys are collected with `prime()` and resolved together on the next
+    `load()` / `load_many()` with a single `field__in` query; results (and
+    misses) are memoized for the loader's lifetime. Lookups on a field other
+    than the pk are case-insensitive (`lower(field) IN (...)`), like emails.
+    """
+
+    def __init__(self, model, field="pk", queryset=None):
+        self.model = model
+        self.field = field
+        self.queryset = queryset if queryset is not None else model._default_manager.all()
+        self.cache = {}
+        self.pending = set()
+
+    def normalize(self, key):
+        # UUID / str ids and mixed-case emails must hit the same entry
+        return str(key).lower()
+
+    def prime(self, keys):
+        for key in keys:
+            if key is not None and self.normalize(key) not in self.cache:
+                self.pending.add(key)
+
+    def add(self, key, obj):
+        """Stores an already-loaded object (e.g. from select_related)."""
+        self.cache[self.normalize(key)] = obj
+
+    def dispatch(self):
+        if not self.pending:
+            return
+        keys, self.pending = self.pending, set()
+        if self.field == "pk":
+            queryset = self.queryset.filter(pk__in=keys)
+        else:
+            # matches what normalize() does to the keys
+            queryset = self.queryset.alias(_batch_key=Lower(self.field)).filter(
+                _batch_key__in={self.normalize(key) for key in keys}
+            )
+        for obj in queryset:
+            key = obj.pk if self.field == "pk" else getattr(obj, self.field)
+            self.cache[self.normalize(key)] = obj
+        for key in keys:
+            self.cache.setdefault(self.normalize(key), None)
+
+    def load(self, key):
+        if key is None:
+            return None
+        self.prime([key])
+        self.dispatch()
+        return self.cache.get(self.normalize(key))
+
+    def load_many(self, keys):
+        """Returns {key: object or None} for `keys`, one query for all unseen keys."""
+        keys = list(keys)
+        self.prime(keys)
+        self.dispatch()
+        return {key: self.cache.get(self.normalize(key)) for key in keys}
+
+
+def get_loader(request, model, field="pk", queryset=None):
+    """
+    Returns the `BatchLoader` for (model, field) scoped to `request`, so every
+    serializer in the request shares one memo. Without a request, a new
+    loader (scoped to the caller) is returned. `queryset` (default: all rows)
+    is used when the loader is created.
+    """
+    if request is None:
+        return BatchLoader(model, field, queryset)
+
+    # DRF's Request wraps the HttpRequest; keep the memo on the underlying one
+    request = getattr(request, "_request", request)
+    loaders = request.__dict__.setdefault("_batch_loaders", {})
+    key = (model._meta.label, field)
+    if key not in loaders:
+        loaders[key] = BatchLoader(model, field, queryset)
+    return loaders[key]
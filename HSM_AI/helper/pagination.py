@@ -1,17 +1,356 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import partial
+from uuid import UUID
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from HSM_AI.utils import success_response  # ✅ correct import path
 
+
+def live_rows_index(model):
+    """
+    Returns the name of a model's partial index over exactly its live
+    (is_deleted=False) rows, if it has one.
+    """
+    for index in model._meta.indexes:
+        if index.condition == Q(is_deleted=False):
+            return index.name
+    return None
+
+
+def estimate_live_rows(model, using="default"):
+    """
+    Returns the Postgres planner estimate of a model's live (is_deleted=False)
+    rows - pg_class.reltuples of its live-rows partial index, which ANALYZE
+    keeps current - or None when unavailable (other backends, no such index,
+    never analyzed).
+    """
+    connection = connections[using]
+    index_name = live_rows_index(model)
+    if connection.vendor != "postgresql" or index_name is None:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [index_name],
+        )
+        row = cursor.fetchone()
+    if not row or row[0] < 0:
+        return None
+    return row[0]
+
+
+class UncountedPage(Page):
+    """
+    A page fetched without counting; whether a next page exists is known from
+    the one extra row read past its end.
+    """
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CountingPaginator(DjangoPaginator):
+    """
+    Django paginator with a pluggable counting strategy.
+
+    - "exact": plain COUNT(*) on every request (Django default).
+    - "estimated": pages are fetched without any count (LIMIT per_page + 1),
+      and `count` is only reported in the response: unfiltered lists use the
+      planner's live-row estimate once the table is large enough for COUNT(*)
+      to matter; filtered lists reuse an exact count cached for a few
+      seconds, keyed by the normalized query.
+
+    `count_is_exact` tells whether the reported count is a fresh COUNT(*).
+    """
+
+    def __init__(self, *args, count_strategy="exact", filtered=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_strategy = count_strategy
+        self.filtered = filtered
+        self.count_is_exact = True
+
+    @property
+    def pages_by_count(self):
+        return self.count_strategy != "estimated" or not isinstance(self.object_list, QuerySet)
+
+    def validate_number(self, number):
+        if self.pages_by_count:
+            return super().validate_number(number)
+        # no upper bound: a page past the end is detected when it comes back empty
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        if self.pages_by_count:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage(_("That page contains no results"))
+        return UncountedPage(
+            rows[: self.per_page], number, self, has_next=len(rows) > self.per_page
+        )
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if self.pages_by_count:
+            return super().count
+
+        if not self.filtered:
+            estimate = estimate_live_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.PAGINATION_ESTIMATE_THRESHOLD:
+                self.count_is_exact = False
+                return estimate
+            return super().count
+
+        # Same WHERE clause ⇒ same SQL; ordering doesn't matter for a count
+        sql = str(queryset.order_by().query)
+        key = "page_count:" + hashlib.md5(
+            f"{queryset.model._meta.label}:{sql}".encode("utf-8")
+        ).hexdigest()
+        count = cache.get(key)
+        if count is not None:
+            self.count_is_exact = False
+            return count
+
+        count = super().count
+        cache.set(key, count, timeout=settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+# ?ordering= values accepted by list views, mapped to their keyset ordering
+LIST_ORDERINGS = {
+    "created": ("created_date", "id"),
+    # UUIDv7 ids are time ordered, so the primary key alone is a creation order
+    # (rows created before the switch from uuid4 sort by their random id)
+    "id": ("id",),
+}
+DEFAULT_LIST_ORDERING = "created"
+
+
+def get_list_ordering(request):
+    """
+    Returns the keyset ordering fields for a list request (`?ordering=id`
+    or the default created_date, id).
+    """
+    ordering = request.query_params.get("ordering")
+    return LIST_ORDERINGS.get(ordering, LIST_ORDERINGS[DEFAULT_LIST_ORDERING])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination on `ordering` - (created_date, id) by default,
+    or (id,) for time-ordered primary keys.
+
+    Each page is one indexed range scan `WHERE (created_date, id) > cursor
+    ORDER BY created_date, id LIMIT n` - no OFFSET and no COUNT(*), so deep
+    pages cost the same as the first one. `count` is always None.
+    """
+
+    page_size = 10
+    page_size_query_param = "limit"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = LIST_ORDERINGS[DEFAULT_LIST_ORDERING]
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for field in self.ordering:
+            # rows may be model instances or values() dicts
+            value = obj[field] if isinstance(obj, dict) else getattr(obj, field)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else str(value))
+        raw = "|".join(["r" if reverse else "f", *values])
+        token = urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            direction, *values = (
+                urlsafe_b64decode(token.encode("ascii")).decode("utf-8").split("|")
+            )
+            if direction not in ("f", "r") or len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.parse_cursor_value(field, value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return direction == "r", values
+
+    def parse_cursor_value(self, field, value):
+        if field == "id":
+            return UUID(value)
+        if field.endswith("_date"):
+            parsed = parse_datetime(value)
+            if parsed is None:
+                raise ValueError
+            return parsed
+        return value
+
+    def cursor_filter(self, values, op):
+        """
+        Row-value comparison `(a, b, ...) op (x, y, ...)` spelled as
+        `a >= x AND (a op x OR (a = x AND b op y) OR ...)`.
+
+        The OR form alone gives the planner no start key for the index range;
+        the redundant leading `a >= x` (`<=` walking backwards) does.
+        """
+        query = Q()
+        for i, field in enumerate(self.ordering):
+            equal = dict(zip(self.ordering[:i], values[:i]))
+            query |= Q(**equal, **{f"{field}__{op}": values[i]})
+        if len(self.ordering) > 1:
+            bound = "gte" if op == "gt" else "lte"
+            query = Q(**{f"{self.ordering[0]}__{bound}": values[0]}) & query
+        return query
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[0])
+
+        if reverse:
+            queryset = queryset.order_by(*(f"-{field}" for field in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if cursor:
+            queryset = queryset.filter(
+                self.cursor_filter(cursor[1], "lt" if reverse else "gt")
+            )
+
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Walking backwards, "more" rows lie before the page; forwards, after it
+        has_next = has_more if not reverse else cursor is not None
+        has_previous = has_more if reverse else cursor is not None
+
+        self.next_link = self.encode_cursor(rows[-1], False) if rows and has_next else None
+        self.previous_link = (
+            self.encode_cursor(rows[0], True) if rows and has_previous else None
+        )
+        if not rows and cursor is not None:
+            # Ran off the end; offer a way back to the first page
+            self.previous_link = remove_query_param(self.base_url, self.cursor_query_param)
+
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        return self.next_link
+
+    def get_previous_link(self):
+        return self.previous_link
+
+
 class CustomPagination(PageNumberPagination):
     page_size = 10                  # Default page size
     page_size_query_param = 'limit' # Allow client to override
     max_page_size = 100
 
+    # ?pagination=cursor (or any ?cursor=) switches to keyset pagination
+    mode_query_param = "pagination"
+    keyset_class = KeysetPagination
+
+    # "exact" or "estimated", see CountingPaginator
+    count_strategy = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.keyset_class.cursor_query_param in request.query_params
+        ):
+            self.keyset = self.keyset_class()
+            self.keyset.ordering = get_list_ordering(request)
+            self.keyset.page_size = self.page_size
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        # params that shape the page, not which rows match
+        paging_params = {
+            self.page_query_param,
+            self.page_size_query_param,
+            self.mode_query_param,
+            "ordering",
+            "fields",
+            "exclude",
+        }
+        self.django_paginator_class = partial(
+            CountingPaginator,
+            count_strategy=self.count_strategy or settings.PAGINATION_COUNT_STRATEGY,
+            filtered=any(
+                value for key, value in request.query_params.items()
+                if key not in paging_params
+            ),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
     def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return success_response(
+                message="Modules fetched successfully.",
+                data={
+                    "list": data,
+                    "count": None,  # not computed in cursor mode
+                    "count_exact": False,
+                    "next": self.keyset.get_next_link(),
+                    "previous": self.keyset.get_previous_link(),
+                },
+            )
+
         return success_response(
             message="Modules fetched successfully.",
             data={
                 "list": data,                 # Actual results
                 "count": self.page.paginator.count,
+                "count_exact": self.page.paginator.count_is_exact,
                 "next": self.get_next_link(),
                 "previous": self.get_previous_link(),
             },
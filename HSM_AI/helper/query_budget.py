@@ -0,0 +1,102 @@
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class QueryStats:
+    """
+    `connection.execute_wrapper` that counts queries and their DB time.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # seconds
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+            self.queries.append(sql)
+
+    @property
+    def duration_ms(self):
+        return round(self.duration * 1000, 2)
+
+
+@contextmanager
+def count_queries(using=None):
+    """
+    Counts queries run on every configured database (or only `using`) inside the block.
+
+        with count_queries() as stats:
+            ...
+        stats.count, stats.duration_ms, stats.queries
+    """
+    stats = QueryStats()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+        yield stats
+
+
+@contextmanager
+def assert_max_queries(budget, using=None):
+    """
+    Fails with AssertionError (listing the SQL) when the block runs more than `budget` queries.
+    """
+    with count_queries(using) as stats:
+        yield stats
+    if stats.count > budget:
+        raise AssertionError(
+            f"{stats.count} queries executed, budget is {budget}:\n"
+            + "\n".join(f"{i}. {sql}" for i, sql in enumerate(stats.queries, start=1))
+        )
+
+
+def get_query_budget(view_class, method):
+    """
+    Returns a view's `query_budget` for an HTTP method (int, or dict by method), if any.
+    """
+    budget = getattr(view_class, "query_budget", None)
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+
+class ViewQueryStats:
+    """
+    In-process totals per view name: requests, queries, DB time and the worst request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, stats):
+        with self._lock:
+            entry = self._views.setdefault(
+                view_name,
+                {"requests": 0, "queries": 0, "db_time_ms": 0.0, "max_queries": 0},
+            )
+            entry["requests"] += 1
+            entry["queries"] += stats.count
+            entry["db_time_ms"] = round(entry["db_time_ms"] + stats.duration_ms, 2)
+            entry["max_queries"] = max(entry["max_queries"], stats.count)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._views.items()}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+view_query_stats = ViewQueryStats()
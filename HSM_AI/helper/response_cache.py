@@ -0,0 +1,130 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+
+from HSM_AI.helper.cache_versions import get_versions
+from HSM_AI.helper.conditional import ConditionalGetMixin
+from HSM_AI.helper.single_flight import single_flight
+
+# Stored with the body and replayed on hits (ETag / Last-Modified answer 304s)
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+AES_MIDDLEWARE = "HSM_AI.middleware.aes_middleware.AESMiddleware"
+
+
+class ResponseCacheHit(Exception):
+    """Raised from `initial()` with the stored entry to replay."""
+
+    def __init__(self, entry, not_modified=False):
+        super().__init__()
+        self.entry = entry
+        self.not_modified = not_modified
+
+
+def normalize_query(query_params):
+    """Sorted `key=value` pairs, blank values dropped (`?a=1&b=` == `?b=&a=1`)."""
+    return "&".join(
+        f"{key}={value}"
+        for key in sorted(query_params)
+        for value in sorted(query_params.getlist(key))
+        if value != ""
+    )
+
+
+def build_response_cache_key(view, request):
+    versions = get_versions(*((scope, None) for scope in view.response_cache_versions))
+    renderer = getattr(request, "accepted_renderer", None)
+    raw = "|".join(
+        [
+            request.path,
+            normalize_query(request.query_params),
+            getattr(renderer, "format", ""),
+            # encrypted and plain bodies never share an entry
+            "aes" if AES_MIDDLEWARE in settings.MIDDLEWARE else "",
+        ]
+    )
+    digest = hashlib.md5(raw.encode("utf-8")).hexdigest()
+    return f"resp:{type(view).__name__}:{digest}:{'.'.join(str(v) for v in versions)}"
+
+
+def build_cache_entry(response):
+    return {
+        "content": response.content,
+        "headers": {h: response[h] for h in CACHED_HEADERS if h in response},
+    }
+
+
+class ResponseCacheMixin:
+    """
+    Caches the final response bytes of a GET endpoint whose data is shared by
+    every caller.
+
+    The key is the path, the normalized query string, the renderer format and
+    the `response_cache_versions` counters (bumped by the Role / Module
+    signals), so writes invalidate precisely and the TTL only bounds memory.
+    Lookups happen after authentication and permissions; on a hit the stored
+    bytes (already encrypted when AESMiddleware is on) are returned without
+    touching the ORM or the serializers. Entries are written by
+    `ResponseCacheMiddleware`, which must sit above AESMiddleware.
+
+    With SINGLE_FLIGHT, concurrent misses for the same key are coalesced:
+    one request computes, the others wait and replay its stored entry.
+
+    List it after ConditionalGetMixin: hits answer If-None-Match /
+    If-Modified-Since from the stored validators, misses fall through to the
+    regular conditional check.
+    """
+
+    response_cache_versions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # only GETs that went through ResponseCacheMiddleware (not batch sub-requests)
+        http_request = request._request
+        if request.method != "GET" or not getattr(
+            http_request, "response_cache_enabled", False
+        ):
+            return
+
+        key = build_response_cache_key(self, request)
+        entry = cache.get(key)
+        if entry is None and settings.SINGLE_FLIGHT:
+            entry = single_flight.join(key, type(self).__name__, load=cache.get)
+            if entry is None:
+                # released by the middleware once the entry is stored
+                http_request.response_cache_flight = key
+        if entry is None:
+            # stored by the middleware once the response is final
+            http_request.response_cache_key = key
+            return
+
+        headers = entry["headers"]
+        last_modified = parse_http_date_safe(headers.get("Last-Modified", ""))
+        not_modified = "ETag" in headers and ConditionalGetMixin.is_not_modified(
+            request,
+            headers["ETag"],
+            None
+            if last_modified is None
+            else datetime.fromtimestamp(last_modified, tz=timezone.utc),
+        )
+        raise ResponseCacheHit(entry, not_modified)
+
+    def handle_exception(self, exc):
+        if not isinstance(exc, ResponseCacheHit):
+            return super().handle_exception(exc)
+
+        if exc.not_modified:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(exc.entry["content"])
+        for header, value in exc.entry["headers"].items():
+            if not exc.not_modified or header != "Content-Type":
+                response[header] = value
+        # AESMiddleware must not encrypt the stored bytes again
+        response.from_response_cache = True
+        return response
@@ -0,0 +1,26 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+
+# Migration operations (Postgres-only indexes on a project that also migrates SQLite)
+
+
+class PostgresOnlyMixin:
+    """
+    Applies the operation's schema change on Postgres only; other backends
+    (the local SQLite database) just record the index in the migration state.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class PostgresAddIndexConcurrently(PostgresOnlyMixin, AddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY: builds without the write lock a plain CREATE
+    INDEX holds for the whole build. The migration must set `atomic = False`.
+    """
+
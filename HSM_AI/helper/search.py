@@ -0,0 +1,151 @@
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+# table -> columns covered by search indexes (the models' `*_trgm` GIN indexes
+# on Postgres, FTS5 tables on SQLite; see the *_search_indexes migrations)
+SEARCH_INDEXED_COLUMNS = {
+    "authentication_users": ("first_name", "last_name", "email"),
+    "roles_permissions_role": ("role_name",),
+    "roles_permissions_module": ("module_name", "description"),
+}
+
+# SQLite's trigram tokenizer can't match terms shorter than one trigram
+FTS_MIN_TERM_LENGTH = 3
+
+
+def fts_table(table):
+    return f"{table}_fts"
+
+
+# ------------------- SCHEMA HELPERS (called from migrations) -------------------
+
+
+def sqlite_supports_trigram(connection):
+    # FTS5 trigram tokenizer ships with SQLite >= 3.34
+    return connection.Database.sqlite_version_info >= (3, 34, 0)
+
+
+def create_search_indexes(schema_editor, table, columns):
+    """
+    SQLite: an external-content FTS5 table (trigram tokenizer) kept in sync
+    by triggers, used by `SQLiteFTSSearchBackend` in local test runs.
+
+    (Postgres uses the `*_trgm` GIN indexes declared on the models.)
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite" and sqlite_supports_trigram(schema_editor.connection):
+        fts = fts_table(table)
+        cols = ", ".join(columns)
+        new_values = ", ".join(f"new.{c}" for c in columns)
+        old_values = ", ".join(f"old.{c}" for c in columns)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{table}', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_values}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+            f"VALUES ('delete', old.rowid, {old_values}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+            f"VALUES ('delete', old.rowid, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.rowid, {new_values}); END"
+        )
+        schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def drop_search_indexes(schema_editor, table, columns):
+    if schema_editor.connection.vendor == "sqlite":
+        fts = fts_table(table)
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+# ------------------- SEARCH BACKENDS -------------------
+
+
+class IContainsSearchBackend:
+    """
+    OR of `icontains` over the fields (the original SearchableMixin behaviour).
+    """
+
+    def search(self, queryset, fields, term, rank=False):
+        query = Q()
+        for field in fields:
+            # ✅ ensures icontains runs even if field is nullable
+            query |= Q(**{f"{field}__icontains": term})
+        return queryset.filter(query)
+
+
+class PostgresTrigramSearchBackend(IContainsSearchBackend):
+    """
+    Same `icontains` predicate, which compiles to `UPPER(col) LIKE '%x%'` and
+    is served by the `gin_trgm_ops` indexes on UPPER(col); with
+    `rank`, results are ordered by best trigram word similarity first.
+    """
+
+    def search(self, queryset, fields, term, rank=False):
+        queryset = super().search(queryset, fields, term)
+        if not rank:
+            return queryset
+
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        similarities = [TrigramWordSimilarity(term, field) for field in fields]
+        score = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        return queryset.annotate(search_rank=score).order_by(
+            "-search_rank", *queryset.query.order_by
+        )
+
+
+class SQLiteFTSSearchBackend(IContainsSearchBackend):
+    """
+    Local/test fallback: matches through the FTS5 trigram table when the
+    searched fields are indexed and the term is long enough, else `icontains`.
+    """
+
+    _fts_tables = {}
+
+    @classmethod
+    def has_fts_table(cls, using, table):
+        if using not in cls._fts_tables:
+            cls._fts_tables[using] = set(connections[using].introspection.table_names())
+        return fts_table(table) in cls._fts_tables[using]
+
+    def search(self, queryset, fields, term, rank=False):
+        table = queryset.model._meta.db_table
+        columns = [queryset.model._meta.get_field(f).column for f in fields]
+        indexed = SEARCH_INDEXED_COLUMNS.get(table, ())
+        if (
+            len(term) < FTS_MIN_TERM_LENGTH
+            or not set(columns) <= set(indexed)
+            or not self.has_fts_table(queryset.db, table)
+        ):
+            return super().search(queryset, fields, term)
+
+        fts = fts_table(table)
+        match = "{%s} : \"%s\"" % (" ".join(columns), term.replace('"', '""'))
+        rowids = RawSQL(
+            f"SELECT t.{queryset.model._meta.pk.column} FROM {table} t "
+            f"JOIN {fts} ON {fts}.rowid = t.rowid WHERE {fts} MATCH %s",
+            [match],
+        )
+        return queryset.filter(pk__in=rowids)
+
+
+def get_search_backend(queryset):
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        return PostgresTrigramSearchBackend()
+    if vendor == "sqlite":
+        return SQLiteFTSSearchBackend()
+    return IContainsSearchBackend()
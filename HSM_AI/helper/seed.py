@@ -0,0 +1,84 @@
+from django.contrib.auth.hashers import make_password
+
+from authentication.models import Users
+from roles_permissions.models import Module, Role
+
+# Synthetic data for tests and `benchmark_*` management commands
+FIRST_NAMES = (
+    "Aarav", "Maya", "Liam", "Sofia", "Noah", "Isha", "Ethan", "Zara", "Lucas", "Anaya",
+)
+LAST_NAMES = (
+    "Sharma", "Garcia", "Smith", "Kumar", "Nguyen", "Brown", "Patel", "Rossi", "Khan", "Lee",
+)
+SEED_EMAIL_DOMAIN = "seed.invalid"
+
+
+def seed_modules(count, prefix="seed"):
+    return Module.objects.bulk_create(
+        [
+            Module(
+                module_name=f"{prefix} module {i}",
+                path=f"/{prefix}/module-{i}",
+                description=f"{prefix} module {i} description",
+            )
+            for i in range(count)
+        ]
+    )
+
+
+def seed_role(modules, role_name="Seed role"):
+    """A role granting visible + read on every module in `modules`."""
+    return Role.objects.create(
+        role_name=role_name,
+        module_permissions=[
+            {
+                "module_id": str(module.id),
+                "visible": True,
+                "can_create": False,
+                "can_read": True,
+                "can_update": False,
+                "can_delete": False,
+            }
+            for module in modules
+        ],
+    )
+
+
+def seed_roles(count, prefix="seed"):
+    """Roles without module permissions."""
+    return Role.objects.bulk_create(
+        [Role(role_name=f"{prefix} role {i}", module_permissions=[]) for i in range(count)]
+    )
+
+
+def seed_users(role, count, prefix="seed", batch_size=5000, return_users=True):
+    """
+    Bulk-inserts `count` users of `role` (unusable passwords, no permission
+    rows). Returns the users, or only the count with `return_users=False`
+    (large benchmark tables).
+    """
+    password = make_password(None)
+    users = []
+    for start in range(0, count, batch_size):
+        batch = Users.objects.bulk_create(
+            [
+                Users(
+                    email=f"{prefix}-{i}@{SEED_EMAIL_DOMAIN}",
+                    first_name=FIRST_NAMES[i % len(FIRST_NAMES)],
+                    last_name=f"{LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]}{i}",
+                    phone_number=f"9{i:09d}"[-10:],
+                    password=password,
+                    role=role,
+                )
+                for i in range(start, min(start + batch_size, count))
+            ]
+        )
+        if return_users:
+            users.extend(batch)
+    return users if return_users else count
+
+
+def delete_seeded_users(prefix="seed"):
+    return Users.objects.filter(
+        email__startswith=f"{prefix}-", email__endswith=f"@{SEED_EMAIL_DOMAIN}"
+    ).delete()
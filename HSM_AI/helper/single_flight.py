@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical reads: the first request for a key (the
+    leader) computes the response, followers wait for it and then read the
+    stored result instead of hitting the database.
+
+    In-process followers wait on an Event. With SINGLE_FLIGHT_DISTRIBUTED
+    (needs a shared cache such as Redis), the leader also takes a
+    `cache.add()` lock so leaders in other workers poll the cache instead
+    of recomputing. Waits are bounded by SINGLE_FLIGHT_WAIT_TIMEOUT; after
+    that the request computes on its own.
+
+    Outcomes are counted per view (leaders / coalesced / remote_coalesced /
+    timeouts) and logged every SINGLE_FLIGHT_STATS_INTERVAL seconds.
+
+        entry = single_flight.join(key, view_name, load=cache.get)
+        if entry is None:  # leader (or timed out): compute, store, then
+            ...
+            single_flight.release(key)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._owned_locks = set()
+        self._views = {}
+        self._stats_since = time.monotonic()
+
+    def lock_key(self, key):
+        return f"sf:{key}"
+
+    def join(self, key, view_name, load):
+        """
+        Returns the leader's result (via `load(key)`) or None when the caller
+        must compute it; the caller is then leader and must `release(key)`.
+        """
+        with self._lock:
+            event = self._flights.get(key)
+            leader = event is None
+            if leader:
+                self._flights[key] = threading.Event()
+
+        if not leader:
+            event.wait(settings.SINGLE_FLIGHT_WAIT_TIMEOUT)
+            result = load(key)
+            self.record(view_name, "coalesced" if result is not None else "timeouts")
+            return result
+
+        if settings.SINGLE_FLIGHT_DISTRIBUTED:
+            if cache.add(self.lock_key(key), 1, timeout=settings.SINGLE_FLIGHT_WAIT_TIMEOUT):
+                with self._lock:
+                    self._owned_locks.add(key)
+            else:
+                # another worker leads: poll its result, local followers wait on us
+                result = self.poll(key, load)
+                if result is not None:
+                    self.release(key)
+                    self.record(view_name, "remote_coalesced")
+                    return result
+                self.record(view_name, "timeouts")
+        self.record(view_name, "leaders")
+        return None
+
+    def poll(self, key, load):
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            result = load(key)
+            if result is not None:
+                return result
+            time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        return None
+
+    def release(self, key):
+        """Wakes the followers of `key` (they re-read the stored result)."""
+        with self._lock:
+            event = self._flights.pop(key, None)
+            owns_lock = key in self._owned_locks
+            self._owned_locks.discard(key)
+        if owns_lock:
+            cache.delete(self.lock_key(key))
+        if event is not None:
+            event.set()
+
+    def record(self, view_name, outcome):
+        with self._lock:
+            entry = self._views.setdefault(
+                view_name,
+                {"leaders": 0, "coalesced": 0, "remote_coalesced": 0, "timeouts": 0},
+            )
+            entry[outcome] += 1
+        self.log_stats()
+
+    def log_stats(self):
+        """
+        Logs and resets the counts once SINGLE_FLIGHT_STATS_INTERVAL seconds
+        have passed since the last report (0 disables it).
+        """
+        interval = settings.SINGLE_FLIGHT_STATS_INTERVAL
+        with self._lock:
+            elapsed = time.monotonic() - self._stats_since
+            if not interval or elapsed < interval:
+                return
+            views, self._views = self._views, {}
+            self._stats_since = time.monotonic()
+        if views:
+            logger.info(
+                "Single-flight stats",
+                extra={"structured": {"interval_s": round(elapsed, 1), "views": views}},
+            )
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._views.items()}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._stats_since = time.monotonic()
+
+
+single_flight = SingleFlight()
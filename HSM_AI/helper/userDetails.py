@@ -1,14 +1,32 @@
 from authentication.models import Users
+from HSM_AI.helper.loaders import get_loader
 
-def get_user_name_by_email(email: str) -> str:
+
+def _display_name(user, email):
+    if user is None:
+        return email
+    full_name = " ".join(filter(None, [user.first_name, user.last_name]))
+    return full_name or user.username or email
+
+
+def get_user_name_by_email(email: str, request=None) -> str:
     """
     Returns the full name of a user given their email.
     Falls back to the email if the user is not found or has no name.
+    With `request`, lookups are memoized (and batched) for the request.
     """
-    try:
-        user = Users.objects.get(email=email)
-        full_name = " ".join(filter(None, [user.first_name, user.last_name]))
-        return full_name or user.username or email
-    except Users.DoesNotExist:
-        return email
+    return get_user_names_by_emails([email], request=request)[email]
+
 
+def get_user_names_by_emails(emails, request=None) -> dict:
+    """
+    Returns {email: full name} for many emails with one query.
+    Same fallbacks as `get_user_name_by_email`.
+    """
+    emails = list(dict.fromkeys(emails))
+    # emails are unique case-insensitively among live users only
+    loader = get_loader(
+        request, Users, field="email", queryset=Users.objects.filter(is_deleted=False)
+    )
+    users = loader.load_many(emails)
+    return {email: _display_name(users[email], email) for email in emails}
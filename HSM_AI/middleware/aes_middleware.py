@@ -1,7 +1,27 @@
 import json
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
-from HSM_AI.utils import decrypt_data, encrypt_data  # adjust import as needed
+from HSM_AI.utils import decrypt_data, encrypt_bytes, encrypt_data  # adjust import as needed
+
+# Conditional GET validators survive encryption (the payload is re-wrapped)
+PRESERVED_HEADERS = ("ETag", "Last-Modified", "Cache-Control", "Vary")
+
+
+# Bodies encrypted as rendered (HSM_AI/renderers.py); the decrypted payload keeps its format
+ENCRYPTED_CONTENT_TYPES = ("application/json", "application/msgpack")
+
+
+def _is_rendered_body(response):
+    content_type = response.get("Content-Type", "").split(";")[0].strip()
+    return content_type in ENCRYPTED_CONTENT_TYPES and response.content
+
+
+def _encrypted_response(response, encrypted):
+    encrypted_response = JsonResponse({"payload": encrypted}, status=response.status_code)
+    for header in PRESERVED_HEADERS:
+        if header in response:
+            encrypted_response[header] = response[header]
+    return encrypted_response
 
 
 class AESMiddleware(MiddlewareMixin):
@@ -29,27 +49,26 @@ class AESMiddleware(MiddlewareMixin):
 
     def process_response(self, request, response):
         # print(f"[AESMiddleware] Returning response for {request.path} with status {response.status_code}")
+        if getattr(response, "streaming", False):
+            # Streamed exports are written incrementally, never buffered to encrypt
+            return response
+        if getattr(response, "from_response_cache", False):
+            # Replayed bytes were stored after encryption
+            return response
+        if response.status_code == 304:
+            # Not Modified has no body to encrypt
+            return response
+
         try:
-            if hasattr(response, "data"):  # For DRF Response
+            if _is_rendered_body(response):
+                # Encrypt the bytes the renderer already produced, no second json.dumps
+                encrypted = encrypt_bytes(response.content)
+                if encrypted:
+                    return _encrypted_response(response, encrypted)
+            elif hasattr(response, "data"):  # DRF Response with a non-API renderer (browsable API)
                 encrypted = encrypt_data(response.data)
                 if encrypted:
-                    return JsonResponse(
-                        {"payload": encrypted}, status=response.status_code
-                    )
-            elif hasattr(response, "content"):
-                # Optional: encrypt raw Django responses (e.g., not DRF)
-                content = response.content.decode("utf-8")
-                try:
-                    parsed = json.loads(content)
-                    encrypted = encrypt_data(parsed)
-                    if encrypted:
-                        return JsonResponse(
-                            {"payload": encrypted}, status=response.status_code
-                        )
-                except Exception as inner_e:
-                    print(
-                        "[AESMiddleware] Could not parse raw content as JSON:", inner_e
-                    )
+                    return _encrypted_response(response, encrypted)
         except Exception as e:
             print("[AESMiddleware] Error encrypting response:", e)
 
@@ -0,0 +1,53 @@
+# middleware/query_count_middleware.py
+import logging
+
+from django.conf import settings
+
+from HSM_AI.helper.query_budget import count_queries, get_query_budget, view_query_stats
+
+logger = logging.getLogger("django.db.queries")
+
+
+class QueryCountMiddleware:
+    """
+    Records the number of queries and DB time of every request per view
+    (`view_query_stats`), logs a warning when a view's `query_budget` is
+    exceeded and, with QUERY_COUNT_HEADERS, exposes both as response headers.
+    Queries run while a streaming response is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as stats:
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return response
+
+        view_class = getattr(match.func, "view_class", None)
+        view_name = match.view_name or (view_class or match.func).__name__
+        view_query_stats.record(view_name, stats)
+
+        budget = get_query_budget(view_class, request.method)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                "Query budget exceeded",
+                extra={
+                    "structured": {
+                        "view": view_name,
+                        "method": request.method,
+                        "path": request.path,
+                        "queries": stats.count,
+                        "budget": budget,
+                        "db_time_ms": stats.duration_ms,
+                    }
+                },
+            )
+
+        if settings.QUERY_COUNT_HEADERS:
+            response["X-Query-Count"] = str(stats.count)
+            response["X-DB-Time-Ms"] = str(stats.duration_ms)
+        return response
@@ -0,0 +1,37 @@
+# middleware/response_cache_middleware.py
+from django.conf import settings
+from django.core.cache import cache
+
+from HSM_AI.helper.response_cache import build_cache_entry
+from HSM_AI.helper.single_flight import single_flight
+
+
+class ResponseCacheMiddleware:
+    """
+    Stores the final bytes of responses from `ResponseCacheMixin` views.
+    Listed above AESMiddleware, so what gets stored (and replayed) is the
+    encrypted payload when encryption is on. Then releases the request's
+    single-flight followers, whatever the outcome.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.response_cache_enabled = settings.RESPONSE_CACHE
+        try:
+            response = self.get_response(request)
+
+            key = getattr(request, "response_cache_key", None)
+            if (
+                key is not None
+                and response.status_code == 200
+                and not getattr(response, "streaming", False)
+                and not getattr(response, "from_response_cache", False)
+            ):
+                cache.set(key, build_cache_entry(response), settings.RESPONSE_CACHE_TIMEOUT)
+            return response
+        finally:
+            flight = getattr(request, "response_cache_flight", None)
+            if flight is not None:
+                single_flight.release(flight)
@@ -61,10 +61,18 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # must stay above AESMiddleware: it stores the encrypted bytes
+    "HSM_AI.middleware.response_cache_middleware.ResponseCacheMiddleware",
     # 'HSM_AI.middleware.aes_middleware.AESMiddleware',
     # 'HSM_AI.middleware.logging_middleware.APILoggingMiddleware',
 ]
 
+# Per-view query count / DB time and `query_budget` warnings (HSM_AI/middleware/query_count_middleware.py)
+QUERY_INSTRUMENTATION = config("QUERY_INSTRUMENTATION", default=DEBUG, cast=bool)
+QUERY_COUNT_HEADERS = config("QUERY_COUNT_HEADERS", default=DEBUG, cast=bool)
+if QUERY_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, "HSM_AI.middleware.query_count_middleware.QueryCountMiddleware")
+
 ROOT_URLCONF = "HSM_AI.urls"
 
 TEMPLATES = [
@@ -131,12 +139,27 @@ AUTH_PASSWORD_VALIDATORS = [
 #             'rest_framework_simplejwt.authentication.JWTAuthentication',
 #         ),
 # }
+# MessagePack (application/msgpack) for internal service clients, next to orjson-backed JSON
+MSGPACK_CONTENT_NEGOTIATION = config("MSGPACK_CONTENT_NEGOTIATION", default=True, cast=bool)
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "HSM_AI.authentication.CachedJWTAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": [
+        "HSM_AI.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "HSM_AI.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "EXCEPTION_HANDLER": "HSM_AI.utils.custom_exception_handler",
 }
+if MSGPACK_CONTENT_NEGOTIATION:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].insert(1, "HSM_AI.renderers.MessagePackRenderer")
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].insert(1, "HSM_AI.renderers.MessagePackParser")
 
 
 SIMPLE_JWT = {
@@ -144,6 +167,66 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=2),
 }
 
+# Shared by every web and Celery process: version counters (HSM_AI/helper/cache_versions.py),
+# principals, permissions and responses must be invalidated everywhere at once
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("CACHE_REDIS_URL", default="redis://redis:6379/1"),
+        "KEY_PREFIX": "hsm",
+    }
+}
+
+# Seconds a cached JWT principal (see HSM_AI/authentication.py) lives without a version bump
+PRINCIPAL_CACHE_TIMEOUT = config("PRINCIPAL_CACHE_TIMEOUT", default=300, cast=int)
+
+# Seconds a user's serialized effective permissions stay cached (roles_permissions/cache.py)
+PERMISSIONS_CACHE_TIMEOUT = config("PERMISSIONS_CACHE_TIMEOUT", default=3600, cast=int)
+
+# "materialized": role permissions copied into UserModulePermission for every user
+# "overlay": Role.module_permissions is the base, UserModulePermission only holds per-user overrides
+PERMISSION_MODE = config("PERMISSION_MODE", default="materialized")
+
+# Embed per-module permission bitmasks + perm_ver in issued tokens (roles_permissions/permissions.py)
+PERMISSION_CLAIMS_IN_TOKEN = config("PERMISSION_CLAIMS_IN_TOKEN", default=False, cast=bool)
+
+# CustomPagination counts: "exact" (COUNT(*) every page) or "estimated" (pages
+# fetched without counting; the reported count is the planner's live-row estimate
+# for unfiltered lists, a short-lived cached COUNT(*) for filtered ones)
+PAGINATION_COUNT_STRATEGY = config("PAGINATION_COUNT_STRATEGY", default="exact")
+PAGINATION_ESTIMATE_THRESHOLD = config("PAGINATION_ESTIMATE_THRESHOLD", default=10000, cast=int)
+PAGINATION_COUNT_CACHE_TIMEOUT = config("PAGINATION_COUNT_CACHE_TIMEOUT", default=30, cast=int)
+
+# List endpoints read pages with values() and precompiled row serializers (HSM_AI/helper/fast_serializers.py)
+FAST_LIST_SERIALIZATION = config("FAST_LIST_SERIALIZATION", default=True, cast=bool)
+
+# Rendered-response cache for shared read endpoints (HSM_AI/helper/response_cache.py);
+# entries are invalidated by table versions, the timeout only bounds memory
+RESPONSE_CACHE = config("RESPONSE_CACHE", default=True, cast=bool)
+RESPONSE_CACHE_TIMEOUT = config("RESPONSE_CACHE_TIMEOUT", default=3600, cast=int)
+
+# Single-flight for response cache misses (HSM_AI/helper/single_flight.py): concurrent
+# identical requests wait up to SINGLE_FLIGHT_WAIT_TIMEOUT seconds for the first one;
+# SINGLE_FLIGHT_DISTRIBUTED also coalesces across workers (needs a shared cache, e.g. Redis)
+SINGLE_FLIGHT = config("SINGLE_FLIGHT", default=True, cast=bool)
+SINGLE_FLIGHT_WAIT_TIMEOUT = config("SINGLE_FLIGHT_WAIT_TIMEOUT", default=5, cast=float)
+SINGLE_FLIGHT_DISTRIBUTED = config("SINGLE_FLIGHT_DISTRIBUTED", default=False, cast=bool)
+SINGLE_FLIGHT_POLL_INTERVAL = config("SINGLE_FLIGHT_POLL_INTERVAL", default=0.05, cast=float)
+# Per-view leader / coalesced / timeout counts are logged (and reset) this often, 0 disables
+SINGLE_FLIGHT_STATS_INTERVAL = config("SINGLE_FLIGHT_STATS_INTERVAL", default=300, cast=float)
+
+# /api/batch/ (HSM_AI/batch.py): max sub-requests per call, threads for parallel GETs
+BATCH_MAX_REQUESTS = config("BATCH_MAX_REQUESTS", default=20, cast=int)
+BATCH_MAX_WORKERS = config("BATCH_MAX_WORKERS", default=4, cast=int)
+
+# Bulk user import (authentication/services.py): rows validated/written per chunk,
+# passwords hashed on a process pool of this size, started once per server process
+# and shared by all imports
+USER_IMPORT_CHUNK_SIZE = config("USER_IMPORT_CHUNK_SIZE", default=1000, cast=int)
+USER_IMPORT_WORKERS = config("USER_IMPORT_WORKERS", default=2, cast=int)
+# Rows fetched per server-side cursor round-trip by the user export
+USER_EXPORT_CHUNK_SIZE = config("USER_EXPORT_CHUNK_SIZE", default=2000, cast=int)
+
 LANGUAGE_CODE = "en-us"
 
 TIME_ZONE = "UTC"
@@ -174,6 +257,11 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "authentication.Users"
 
+# Email is unique among live users only (users_email_ci_uniq), so login goes
+# through a backend that looks up live users; auth.W004 flags the non-unique field
+AUTHENTICATION_BACKENDS = ["authentication.backends.LiveUserBackend"]
+SILENCED_SYSTEM_CHECKS = ["auth.W004"]
+
 # AWS S3 settings
 AWS_ACCESS_KEY_ID = config("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = config("AWS_SECRET_ACCESS_KEY")
@@ -201,8 +289,28 @@ SHAREPOINT_SCOPES = config("SHAREPOINT_SCOPES")
 
 
 CELERY_BROKER_URL = "redis://redis:6379/0"
+CELERY_RESULT_BACKEND = "redis://redis:6379/0"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
+# Fail fast when Redis is down: publishing happens on the request path
+# (roles_permissions/tasks.py falls back to applying changes inline)
+CELERY_BROKER_CONNECTION_TIMEOUT = config("CELERY_BROKER_CONNECTION_TIMEOUT", default=1, cast=float)
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "socket_connect_timeout": CELERY_BROKER_CONNECTION_TIMEOUT,
+    "socket_timeout": CELERY_BROKER_CONNECTION_TIMEOUT,
+    "max_retries": 0,
+}
+CELERY_REDIS_SOCKET_CONNECT_TIMEOUT = CELERY_BROKER_CONNECTION_TIMEOUT
+CELERY_REDIS_SOCKET_TIMEOUT = CELERY_BROKER_CONNECTION_TIMEOUT
+
+# Keep per-user edits when a role's module_permissions change (roles_permissions/tasks.py)
+ROLE_PERMISSION_PRESERVE_OVERRIDES = config(
+    "ROLE_PERMISSION_PRESERVE_OVERRIDES", default=True, cast=bool
+)
+# How long a role's propagation task id can be polled (matches Celery's default result_expires)
+ROLE_PROPAGATION_STATUS_TIMEOUT = config(
+    "ROLE_PROPAGATION_STATUS_TIMEOUT", default=86400, cast=int
+)
 
 GROQ_API_KEY = config("GROQ_API_KEY")
 # OPENAI_API_KEY = config("OPENAI_API_KEY")
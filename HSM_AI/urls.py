@@ -4,11 +4,13 @@ from HSM_AI import settings
 from django.conf.urls.static import static
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from HSM_AI.batch import BatchView
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("auth/", include("authentication.urls")),
+    path("api/batch/", BatchView.as_view(), name="batch"),
     path("api/", include("roles_permissions.urls")),
     # path('api/', include('projects.urls')),
     # path('api/', include('uploader.urls')),
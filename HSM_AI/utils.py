@@ -120,7 +120,15 @@ def encrypt_data(data):
     try:
         # Convert dictionary or object to JSON string
         json_str = json.dumps(data)
+    except Exception as e:
+        print("❌ Encryption failed:", e)
+        return None
+    return encrypt_bytes(json_str.encode('utf-8'))
 
+
+def encrypt_bytes(plaintext):
+    """Encrypts an already-serialized body (e.g. a rendered response)."""
+    try:
         # Derive the AES-256 key using SHA256 from the SECRET_KEY
         key = hashlib.sha256(settings.SECRET_KEY.encode('utf-8')).digest()
 
@@ -128,7 +136,7 @@ def encrypt_data(data):
         cipher = AES.new(key, AES.MODE_ECB)
 
         # Pad the plaintext to AES block size
-        padded_data = pad(json_str.encode('utf-8'), AES.block_size)
+        padded_data = pad(plaintext, AES.block_size)
 
         # Encrypt and encode in base64 for transport
         encrypted = cipher.encrypt(padded_data)
@@ -0,0 +1,12 @@
+from django.contrib.auth.backends import ModelBackend
+
+
+class LiveUserBackend(ModelBackend):
+    """
+    ModelBackend that never authenticates soft-deleted users. Login looks up
+    the email through `UsersManager.get_by_natural_key` (case-insensitive,
+    live users only).
+    """
+
+    def user_can_authenticate(self, user):
+        return super().user_can_authenticate(user) and not user.is_deleted
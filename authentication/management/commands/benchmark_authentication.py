@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from HSM_AI.authentication import CachedJWTAuthentication, principal_cache_key
+from HSM_AI.helper.benchmark import format_table, measure
+from authentication.models import Users
+
+
+class Command(BaseCommand):
+    help = (
+        "Queries and latency per authenticated request: simplejwt's "
+        "JWTAuthentication (before) vs CachedJWTAuthentication, cold and warm."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", help="User to authenticate as (default: any live user).")
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        users = Users.objects.filter(is_deleted=False, is_active=True)
+        if options["email"]:
+            users = users.filter(email__iexact=options["email"])
+        user = users.first()
+        if user is None:
+            raise CommandError("No live user to authenticate as.")
+
+        token = str(AccessToken.for_user(user))
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        def cold():
+            cache.delete(principal_cache_key(user.pk))
+            CachedJWTAuthentication().authenticate(request)
+
+        scenarios = [
+            ("JWTAuthentication (before)", lambda: JWTAuthentication().authenticate(request)),
+            ("CachedJWTAuthentication, cold", cold),
+            (
+                "CachedJWTAuthentication, warm",
+                lambda: CachedJWTAuthentication().authenticate(request),
+            ),
+        ]
+        rows = []
+        for name, fn in scenarios:
+            rows.append({"scenario": name, **measure(fn, repeat=options["repeat"])})
+
+        self.stdout.write(
+            format_table(rows, ["scenario", "queries", "mean_ms", "p50_ms", "p95_ms"])
+        )
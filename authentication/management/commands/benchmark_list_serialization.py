@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from HSM_AI.helper.benchmark import format_table, measure
+from HSM_AI.helper.fast_serializers import ValuesSerializer
+from HSM_AI.helper.seed import seed_modules, seed_role, seed_users
+from authentication.models import Users
+from authentication.serializers import UserSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "User list serialization (fetch + serialize) at 100 / 1k / 10k rows: the "
+        "DRF serializer (FAST_LIST_SERIALIZATION off, before) vs ValuesSerializer. "
+        "Seeds users inside a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated row counts.")
+        parser.add_argument("--fields", help="A ?fields= projection to apply, e.g. id,email.")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = self.run(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            format_table(
+                rows, ["rows", "path", "queries", "mean_ms", "p50_ms", "p95_ms", "speedup"]
+            )
+        )
+
+    def run(self, options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        role = seed_role(seed_modules(1, prefix="bench-list"), role_name="Benchmark list")
+        seed_users(role, max(sizes), prefix="bench-list", return_users=False)
+
+        query = {"fields": options["fields"]} if options["fields"] else {}
+        factory = APIRequestFactory()
+        queryset = Users.objects.filter(is_deleted=False).order_by("created_date", "id")
+
+        def serializer_path(size):
+            # a request per call: BatchRelatedField memoizes roles on it
+            request = Request(factory.get("/", query))
+            page = UserSerializer.project_queryset(queryset, request)[:size]
+            return UserSerializer(page, many=True, context={"request": request}).data
+
+        def values_path(size):
+            request = Request(factory.get("/", query))
+            reader = ValuesSerializer(UserSerializer, {"request": request})
+            return reader.serialize(reader.values(queryset)[:size])
+
+        rows = []
+        for size in sizes:
+            before = measure(lambda: serializer_path(size), repeat=options["repeat"], warmup=1)
+            after = measure(lambda: values_path(size), repeat=options["repeat"], warmup=1)
+            speedup = before["mean_ms"] / after["mean_ms"] if after["mean_ms"] else None
+            rows.append({"rows": size, "path": "serializer (before)", **before})
+            rows.append(
+                {
+                    "rows": size,
+                    "path": "values()",
+                    "speedup": f"{speedup:.1f}x" if speedup else "",
+                    **after,
+                }
+            )
+        return rows
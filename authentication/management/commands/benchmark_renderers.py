@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from HSM_AI.helper.benchmark import format_bytes, format_table, measure
+from HSM_AI.helper.seed import seed_modules, seed_role, seed_users
+from HSM_AI.renderers import MessagePackRenderer, ORJSONRenderer
+from authentication.views.authviews import UserListCreateView
+
+RENDERERS = {
+    "DRF JSONRenderer (before)": JSONRenderer,
+    "ORJSONRenderer": ORJSONRenderer,
+    "MessagePackRenderer": MessagePackRenderer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Render time and size of a --page-size row user list page (as returned by "
+        "UserListCreateView) per renderer. Seeds users inside a transaction that "
+        "is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = self.run(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            format_table(rows, ["renderer", "bytes", "mean_ms", "p50_ms", "p95_ms", "speedup"])
+        )
+
+    def run(self, options):
+        role = seed_role(seed_modules(1, prefix="bench-render"), role_name="Benchmark render")
+        users = seed_users(role, options["page_size"], prefix="bench-render")
+
+        # the page data as the view hands it to the renderer
+        request = APIRequestFactory().get("/", {"limit": options["page_size"]})
+        force_authenticate(request, user=users[0])
+        data = UserListCreateView.as_view()(request).data
+
+        rows = []
+        for name, renderer_class in RENDERERS.items():
+            renderer = renderer_class()
+            timings = measure(lambda: renderer.render(data), repeat=options["repeat"])
+            rows.append(
+                {"renderer": name, "bytes": format_bytes(len(renderer.render(data))), **timings}
+            )
+
+        baseline = rows[0]["mean_ms"]
+        for row in rows:
+            row["speedup"] = f"{baseline / row['mean_ms']:.1f}x" if row["mean_ms"] else ""
+        return rows
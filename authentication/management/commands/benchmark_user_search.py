@@ -0,0 +1,78 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from HSM_AI.helper.benchmark import format_table, measure
+from HSM_AI.helper.seed import seed_modules, seed_role, seed_users
+from authentication.models import Users
+from authentication.serializers import UserSerializer
+
+# A common last name, a rare last name, an email fragment
+DEFAULT_TERMS = ["patel", "rossi4242", "-4242@"]
+
+
+class Command(BaseCommand):
+    help = (
+        "User list ?search= latency (first page + COUNT) on --users seeded users, "
+        "served by the pg_trgm GIN indexes vs a sequential scan. Seeds inside a "
+        "transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--term", action="append", dest="terms", help="Repeatable.")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The trigram search indexes exist on PostgreSQL only.")
+
+        with transaction.atomic():
+            rows = self.run(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            format_table(rows, ["term", "scan", "plan", "matches", "mean_ms", "p50_ms", "p95_ms"])
+        )
+
+    def run(self, options):
+        role = seed_role(seed_modules(1, prefix="bench-search"), role_name="Benchmark search")
+        seed_users(role, options["users"], prefix="bench-search", return_users=False)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE "{Users._meta.db_table}"')
+
+        rows = []
+        for term in options["terms"] or DEFAULT_TERMS:
+            queryset = UserSerializer.apply_search(
+                Users.objects.filter(is_deleted=False).order_by("created_date", "id"), term
+            )
+
+            def search():
+                list(queryset[:10])
+                queryset.count()
+
+            for scan, disabled in (
+                ("trigram index", []),
+                ("sequential", ["enable_bitmapscan", "enable_indexscan"]),
+            ):
+                with connection.cursor() as cursor:
+                    for setting in ("enable_bitmapscan", "enable_indexscan"):
+                        value = "off" if setting in disabled else "on"
+                        cursor.execute(f"SET LOCAL {setting} = {value}")
+                timings = measure(search, repeat=options["repeat"])
+                rows.append(
+                    {
+                        "term": term,
+                        "scan": scan,
+                        "plan": self.plan_indexes(queryset.order_by().explain()),
+                        "matches": queryset.count(),
+                        **timings,
+                    }
+                )
+        return rows
+
+    @staticmethod
+    def plan_indexes(plan):
+        indexes = sorted(set(re.findall(r"Index Scan on (\w+)", plan)))
+        return ", ".join(indexes) or "Seq Scan"
@@ -0,0 +1,76 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from HSM_AI.helper.benchmark import format_bytes, format_table
+from HSM_AI.helper.ids import uuid7
+
+KEY_GENERATORS = {
+    "uuid4 (before)": uuid.uuid4,
+    "uuid7": uuid7,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert throughput and primary key index size with uuid4 vs uuid7 keys: "
+        "--rows rows inserted in --batch-size batches into a temporary table "
+        "shaped like authentication_users' key (rolled back at the end)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Relation sizes are read from PostgreSQL.")
+
+        rows = []
+        for name, generate in KEY_GENERATORS.items():
+            with transaction.atomic():
+                rows.append({"keys": name, **self.run(generate, options)})
+                transaction.set_rollback(True)
+
+        self.stdout.write(
+            format_table(
+                rows, ["keys", "rows", "seconds", "rows_per_s", "last_batch_ms", "index", "table"]
+            )
+        )
+
+    def run(self, generate, options):
+        total, batch_size = options["rows"], options["batch_size"]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE bench_uuid_keys "
+                "(id uuid PRIMARY KEY, created_date timestamptz NOT NULL) ON COMMIT DROP"
+            )
+            elapsed = last_batch = 0.0
+            for start in range(0, total, batch_size):
+                ids = [str(generate()) for _ in range(min(batch_size, total - start))]
+                began = time.perf_counter()
+                cursor.execute(
+                    "INSERT INTO bench_uuid_keys (id, created_date) "
+                    "SELECT unnest(%s::uuid[]), now()",
+                    [ids],
+                )
+                last_batch = time.perf_counter() - began
+                elapsed += last_batch
+
+            cursor.execute(
+                "SELECT pg_relation_size('bench_uuid_keys_pkey'), "
+                "pg_relation_size('bench_uuid_keys')"
+            )
+            index_size, table_size = cursor.fetchone()
+
+        return {
+            "rows": total,
+            "seconds": round(elapsed, 2),
+            "rows_per_s": round(total / elapsed) if elapsed else None,
+            # random keys slow down once the index outgrows the cache
+            "last_batch_ms": round(last_batch * 1000, 1),
+            "index": format_bytes(index_size),
+            "table": format_bytes(table_size),
+        }
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.services import (
+    IMPORT_FORMATS,
+    detect_import_format,
+    import_users,
+    iter_import_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Bulk-create users from a CSV (with header row) or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file to import.")
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=IMPORT_FORMATS,
+            help="File format (default: from the file extension).",
+        )
+        parser.add_argument("--chunk-size", type=int, help="Rows per batch.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Password hashing processes (default: USER_IMPORT_WORKERS).",
+        )
+        parser.add_argument("--report", help="Write the per-row error report (JSON) here.")
+
+    def handle(self, *args, **options):
+        file_format = options["file_format"] or detect_import_format(options["path"])
+        try:
+            with open(options["path"], "rb") as fileobj:
+                report = import_users(
+                    iter_import_rows(fileobj, file_format),
+                    chunk_size=options["chunk_size"],
+                    workers=options["workers"],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        if options["report"]:
+            with open(options["report"], "w") as out:
+                json.dump(report["errors"], out, indent=2, default=str)
+        else:
+            for error in report["errors"]:
+                self.stderr.write(f"row {error['row']}: {error['errors']}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {report['created']} of {report['total']} users "
+                f"({report['failed']} failed)."
+            )
+        )
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:00
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from HSM_AI.helper.schema import PostgresAddIndexConcurrently
+from HSM_AI.helper.search import create_search_indexes, drop_search_indexes
+
+SEARCH_COLUMNS = ("first_name", "last_name", "email")
+
+
+def forwards(apps, schema_editor):
+    create_search_indexes(schema_editor, "authentication_users", SEARCH_COLUMNS)
+
+
+def backwards(apps, schema_editor):
+    drop_search_indexes(schema_editor, "authentication_users", SEARCH_COLUMNS)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('authentication', '0004_users_title'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(forwards, backwards),
+        PostgresAddIndexConcurrently(
+            model_name='users',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='gin_trgm_ops'), name='users_first_name_trgm'),
+        ),
+        PostgresAddIndexConcurrently(
+            model_name='users',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='gin_trgm_ops'), name='users_last_name_trgm'),
+        ),
+        PostgresAddIndexConcurrently(
+            model_name='users',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='users_email_trgm'),
+        ),
+    ]
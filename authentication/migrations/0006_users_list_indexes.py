@@ -0,0 +1,21 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0005_users_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='users',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_date', 'id'], name='users_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='users',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['role', 'created_date'], name='users_live_role_created_idx'),
+        ),
+    ]
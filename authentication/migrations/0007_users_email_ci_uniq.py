@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-18 10:15
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_users_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='users',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('is_deleted', False)), name='users_email_ci_uniq'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:00
+
+import HSM_AI.helper.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_users_email_ci_uniq'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailtemplate',
+            name='id',
+            field=models.UUIDField(default=HSM_AI.helper.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='users',
+            name='id',
+            field=models.UUIDField(default=HSM_AI.helper.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.17 on 2026-10-18 15:00
+
+import authentication.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0008_uuid7_primary_keys'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='users',
+            managers=[
+                ('objects', authentication.models.UsersManager()),
+            ],
+        ),
+        # superseded by users_email_ci_uniq (lower(email), live rows)
+        migrations.AlterField(
+            model_name='users',
+            name='email',
+            field=models.EmailField(max_length=254),
+        ),
+    ]
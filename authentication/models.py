@@ -1,9 +1,12 @@
-import uuid
 from datetime import timedelta
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
-from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.db.models.functions import Lower, Upper
+from django.contrib.auth.models import AbstractUser, BaseUserManager, UserManager
 from django.utils import timezone
 
+from HSM_AI.helper.ids import uuid7
+
 
 class BaseModel(models.Model):
     created_date = models.DateTimeField(auto_now_add=True)
@@ -14,10 +17,20 @@ class BaseModel(models.Model):
         abstract = True
 
 
+class UsersManager(UserManager):
+    def get_by_natural_key(self, username):
+        # Login lookup: email is unique only case-insensitively among live users
+        # (users_email_ci_uniq), and this filter is served by that index
+        return self.alias(email_lower=Lower("email")).get(
+            email_lower=username.lower(), is_deleted=False
+        )
+
+
 class Users(AbstractUser, BaseModel):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # UUID
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)  # UUID
     username = None  # Remove username field from AbstractUser
-    email = models.EmailField(unique=True)
+    # unique among live users, case-insensitively: see users_email_ci_uniq
+    email = models.EmailField()
 
     STATUS_CHOICES = [
         ("active", "Active"),
@@ -43,6 +56,8 @@ class Users(AbstractUser, BaseModel):
     otp_code = models.CharField(max_length=6, blank=True, null=True)
     otp_created_at = models.DateTimeField(blank=True, null=True)
 
+    objects = UsersManager()
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = [
         "first_name",
@@ -52,6 +67,34 @@ class Users(AbstractUser, BaseModel):
         "country_code",
     ]
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # UserListCreateView: is_deleted=False ORDER BY created_date (+ keyset on id)
+            models.Index(
+                fields=["created_date", "id"],
+                condition=models.Q(is_deleted=False),
+                name="users_live_created_idx",
+            ),
+            # UserListCreateView ?role= filter
+            models.Index(
+                fields=["role", "created_date"],
+                condition=models.Q(is_deleted=False),
+                name="users_live_role_created_idx",
+            ),
+            # ?search= icontains (UPPER(col) LIKE '%x%'), see HSM_AI/helper/search.py
+            GinIndex(OpClass(Upper("first_name"), name="gin_trgm_ops"), name="users_first_name_trgm"),
+            GinIndex(OpClass(Upper("last_name"), name="gin_trgm_ops"), name="users_last_name_trgm"),
+            GinIndex(OpClass(Upper("email"), name="gin_trgm_ops"), name="users_email_trgm"),
+        ]
+        constraints = [
+            # Case-insensitive email uniqueness among live users (replaces the exists() pre-check)
+            models.UniqueConstraint(
+                Lower("email"),
+                condition=models.Q(is_deleted=False),
+                name="users_email_ci_uniq",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.email} ({self.role or 'No Role'})"
 
@@ -69,7 +112,7 @@ class Users(AbstractUser, BaseModel):
 
 
 class EmailTemplate(BaseModel):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(
         max_length=100, unique=True
     )  # Unique identifier for the template
@@ -3,6 +3,14 @@ from django.db import transaction
 from rest_framework import serializers
 from .models import Users
 from roles_permissions.models import UserModulePermission, Module
+from roles_permissions.serializers import (
+    BatchLoadingListSerializer,
+    BatchRelatedField,
+    DynamicFieldsMixin,
+    SearchableMixin,
+    UniqueConstraintErrorMixin,
+)
+from roles_permissions.services import materialize_role_permissions
 
 EMAIL_REGEX = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
 
@@ -68,12 +76,21 @@ EMAIL_REGEX = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
 #         return instance
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(
+    DynamicFieldsMixin, SearchableMixin, UniqueConstraintErrorMixin, serializers.ModelSerializer
+):
     id = serializers.UUIDField(read_only=True)
-    role_name = serializers.CharField(source="role.role_name", read_only=True)
+    # resolved per request in one query for the whole page (see BatchRelatedField)
+    role_name = BatchRelatedField("role", "role_name")
+
+    # read-only fast path for the user list (HSM_AI/helper/fast_serializers.py)
+    values_overrides = {
+        "role_name": (("role__role_name",), lambda row: row["role__role_name"]),
+    }
 
     class Meta:
         model = Users
+        list_serializer_class = BatchLoadingListSerializer
         fields = [
             "id",
             "first_name",
@@ -88,6 +105,9 @@ class UserSerializer(serializers.ModelSerializer):
             "is_deleted",
             "title",
         ]
+        search_fields = ["first_name", "last_name", "email"]
+        unique_constraint_fields = {"users_email_ci_uniq": "email"}
+        unique_error_messages = {"email": "User already exists with this email."}
         # === CHANGES MADE HERE ===
         extra_kwargs = {
             # 1. Make password NOT REQUIRED for PUT/PATCH requests
@@ -100,6 +120,8 @@ class UserSerializer(serializers.ModelSerializer):
             "email": {
                 "required": False,  # Setting False makes it optional for updates
                 "error_messages": {"required": "Email is required."},
+                # enforced by users_email_ci_uniq (lower(email), live rows)
+                "validators": [],
             },
             # The rest of the fields should probably also be optional for PATCH requests.
             "first_name": {
@@ -146,35 +168,15 @@ class UserSerializer(serializers.ModelSerializer):
     #     return user
 
     def create(self, validated_data):
-        email = validated_data["email"]
-        if Users.objects.filter(email=email, is_deleted=False).exists():
-            raise serializers.ValidationError(
-                {"email": "User already exists with this email."}
-            )
-
         password = validated_data.pop("password")
         user = Users(**validated_data)
         user.set_password(password)
-        user.save()
-
-        # -------- Copy role permissions to UserModulePermission --------
-        role = user.role
-        role_permissions = role.module_permissions  # JSON list
-
-        for perm in role_permissions:
-            module_id = perm.get("module_id")
-            if not module_id:
-                continue
-
-            UserModulePermission.objects.create(
-                user=user,
-                module_id=module_id,
-                visible=perm.get("visible", False),
-                can_create=perm.get("can_create", False),
-                can_read=perm.get("can_read", False),
-                can_update=perm.get("can_update", False),
-                can_delete=perm.get("can_delete", False),
-            )
+
+        with transaction.atomic():
+            user.save()
+
+            # -------- Copy role permissions to UserModulePermission --------
+            materialize_role_permissions(user)
 
         return user
 
@@ -188,17 +190,7 @@ class UserSerializer(serializers.ModelSerializer):
         # This correctly uses .pop("password", None) to handle its optional nature
         password = validated_data.pop("password", None)
 
-        # NOTE: Email uniqueness check for updates
-        email = validated_data.get("email")
-        if (
-            email
-            and email != instance.email
-            and Users.objects.filter(email=email, is_deleted=False).exists()
-        ):
-            raise serializers.ValidationError(
-                {"email": "User already exists with this email."}
-            )
-
+        # NOTE: Email uniqueness is enforced by the DB, see try_save()
         with transaction.atomic():
             if password:
                 instance.set_password(password)
@@ -211,6 +203,33 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 
+class UserImportSerializer(UserSerializer):
+    """
+    Validates one bulk-import row with the `UserSerializer` rules, without
+    per-row queries: roles are resolved from `context["roles"]` ({id: Role})
+    and email uniqueness is checked per chunk by `import_users`.
+    """
+    role = serializers.CharField(
+        error_messages={"required": "Role is required."}
+    )
+    password = serializers.CharField(
+        write_only=True, error_messages={"required": "Password is required."}
+    )
+
+    class Meta(UserSerializer.Meta):
+        fields = [f for f in UserSerializer.Meta.fields if f not in ("id", "role_name", "is_deleted")]
+        extra_kwargs = {
+            **UserSerializer.Meta.extra_kwargs,
+            "email": {**UserSerializer.Meta.extra_kwargs["email"], "required": True},
+        }
+
+    def validate_role(self, value):
+        role = self.context["roles"].get(str(value).strip().lower())
+        if role is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return role
+
+
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
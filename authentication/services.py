@@ -0,0 +1,394 @@
+import csv
+import io
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from HSM_AI.helper.cache_versions import bump_version, get_version, get_versions
+from roles_permissions.cache import get_my_permissions_data
+from roles_permissions.models import Module, Role
+from roles_permissions.services import (
+    PERMISSION_FIELDS,
+    get_effective_permissions_bulk,
+    materialize_role_permissions,
+)
+from .models import Users
+
+IMPORT_FORMATS = ("csv", "jsonl")
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_FIELDS = (
+    "id",
+    "email",
+    "first_name",
+    "last_name",
+    "phone_number",
+    "country_code",
+    "title",
+    "role",
+    "role_name",
+    "status",
+    "created_date",
+)
+DUPLICATE_EMAIL_MESSAGE = "User already exists with this email."
+# error key of the row where an import file stopped being readable
+IMPORT_FILE_ERROR = "file"
+
+
+_hasher_pool = None
+_hasher_pool_lock = threading.Lock()
+
+
+def _setup_hasher_worker():
+    # Workers started with spawn/forkserver need the app registry for the hashers
+    import django
+
+    django.setup()
+
+
+def get_hasher_pool():
+    """
+    Password hashing pool of `USER_IMPORT_WORKERS` processes, started on first
+    use and reused by every import in this process, so concurrent uploads
+    share a fixed number of workers instead of each starting its own.
+    """
+    global _hasher_pool
+    with _hasher_pool_lock:
+        if _hasher_pool is None:
+            _hasher_pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.USER_IMPORT_WORKERS),
+                initializer=_setup_hasher_worker,
+            )
+        return _hasher_pool
+
+
+def _discard_hasher_pool(pool):
+    # A worker died: the next import starts a fresh pool
+    global _hasher_pool
+    with _hasher_pool_lock:
+        if _hasher_pool is pool:
+            _hasher_pool = None
+    pool.shutdown(wait=False)
+
+
+def detect_import_format(filename, default="csv"):
+    """
+    Returns "csv" or "jsonl" from a file name (.csv, .jsonl, .ndjson).
+    """
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def iter_import_rows(fileobj, file_format):
+    """
+    Streams (row_number, data, error) tuples out of a binary CSV/JSONL file
+    without loading it into memory. Empty CSV cells are dropped so optional
+    fields fall back to their defaults.
+
+    If the file can't be decoded or parsed past some point, a last row with an
+    `IMPORT_FILE_ERROR` error is yielded and the stream ends.
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    number = 1 if file_format == "csv" else 0
+    try:
+        if file_format == "csv":
+            # row 1 is the header
+            for number, row in enumerate(csv.DictReader(text), start=2):
+                data = {
+                    key.strip(): value.strip()
+                    for key, value in row.items()
+                    if key and value not in (None, "")
+                }
+                yield number, data, None
+        else:
+            for number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError as e:
+                    yield number, None, {"detail": [f"Invalid JSON: {e}"]}
+                    continue
+                if not isinstance(data, dict):
+                    yield number, None, {"detail": ["Each line must be a JSON object."]}
+                    continue
+                yield number, data, None
+    except (UnicodeDecodeError, csv.Error) as e:
+        number += 1
+        yield number, None, {IMPORT_FILE_ERROR: [f"Unreadable file from row {number}: {e}"]}
+    finally:
+        # Don't let the wrapper close the caller's file
+        text.detach()
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_users(rows, chunk_size=None, workers=None):
+    """
+    Bulk-creates users from `iter_import_rows` output, `chunk_size` rows at a time.
+
+    Per chunk: rows are validated with `UserImportSerializer` (no per-row
+    queries), emails already taken are found with one query, passwords are
+    hashed in the shared process pool (or a dedicated one of `workers`
+    processes), then users and their role permissions are written with one
+    `bulk_create` each. Memory stays bounded by the chunk.
+
+    Returns:
+    - dict: {"total", "created", "failed", "errors": [{"row", "email", "errors"}]}
+    """
+    from .serializers import UserImportSerializer
+
+    chunk_size = chunk_size or settings.USER_IMPORT_CHUNK_SIZE
+    context = {
+        "roles": {str(role.pk): role for role in Role.objects.filter(is_deleted=False)}
+    }
+
+    report = {"total": 0, "created": 0, "failed": 0, "errors": []}
+    seen_emails = set()
+
+    def fail(number, email, errors):
+        report["failed"] += 1
+        report["errors"].append({"row": number, "email": email, "errors": errors})
+
+    if workers:
+        pool_context = ProcessPoolExecutor(max_workers=workers, initializer=_setup_hasher_worker)
+    else:
+        pool_context = nullcontext(get_hasher_pool())
+
+    with pool_context as pool:
+        for chunk in _chunks(rows, chunk_size):
+            report["total"] += len(chunk)
+
+            valid = []
+            for number, data, errors in chunk:
+                if errors:
+                    fail(number, None, errors)
+                    continue
+                serializer = UserImportSerializer(data=data, context=context)
+                if not serializer.is_valid():
+                    fail(number, data.get("email"), serializer.errors)
+                    continue
+                email = serializer.validated_data["email"].lower()
+                if email in seen_emails:
+                    fail(number, email, {"email": [DUPLICATE_EMAIL_MESSAGE]})
+                    continue
+                seen_emails.add(email)
+                valid.append((number, serializer.validated_data))
+
+            if not valid:
+                continue
+
+            # email is unique case-insensitively among live users (users_email_ci_uniq)
+            taken = set(
+                Users.objects.annotate(email_lower=Lower("email"))
+                .filter(
+                    email_lower__in=[v["email"].lower() for _, v in valid],
+                    is_deleted=False,
+                )
+                .values_list("email_lower", flat=True)
+            )
+            pending = []
+            for number, validated in valid:
+                if validated["email"].lower() in taken:
+                    fail(number, validated["email"], {"email": [DUPLICATE_EMAIL_MESSAGE]})
+                else:
+                    pending.append((number, validated))
+
+            passwords = [validated.pop("password") for _, validated in pending]
+            try:
+                hashes = list(
+                    pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 32))
+                )
+            except BrokenProcessPool:
+                if not workers:
+                    _discard_hasher_pool(pool)
+                raise
+            users = []
+            for (_, validated), password in zip(pending, hashes):
+                user = Users(**validated)
+                user.password = password
+                users.append(user)
+
+            report["created"] += _create_users(pending, users, fail)
+
+    return report
+
+
+def _create_users(pending, users, fail):
+    """
+    Writes one chunk. If a concurrent insert wins a unique constraint, the
+    chunk is retried row by row so only the conflicting rows are reported.
+    """
+    try:
+        with transaction.atomic():
+            Users.objects.bulk_create(users)
+            materialize_role_permissions(users)
+            # bulk_create skips post_save: invalidate the user list ETag here
+            bump_version("users")
+        return len(users)
+    except IntegrityError:
+        pass
+
+    created = 0
+    for (number, _), user in zip(pending, users):
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+                materialize_role_permissions(user)
+            created += 1
+        except IntegrityError:
+            fail(number, user.email, {"email": [DUPLICATE_EMAIL_MESSAGE]})
+    return created
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer streaming."""
+
+    def write(self, value):
+        return value
+
+
+def _export_row(user):
+    return {
+        "id": str(user.pk),
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "phone_number": user.phone_number,
+        "country_code": user.country_code,
+        "title": user.title,
+        "role": str(user.role_id) if user.role_id else None,
+        "role_name": user.role.role_name if user.role_id else None,
+        "status": user.status,
+        "created_date": user.created_date.isoformat(),
+    }
+
+
+def _export_permissions(perms):
+    return [
+        {
+            "module_id": str(perm.module_id),
+            "module_name": perm.module.module_name,
+            "path": perm.module.path,
+            **{field: getattr(perm, field) for field in PERMISSION_FIELDS},
+        }
+        for perm in perms
+    ]
+
+
+def iter_user_export(queryset, file_format, include_permissions=False, chunk_size=None):
+    """
+    Yields the users of `queryset` as CSV lines (header first) or NDJSON
+    lines, reading them with a server-side cursor `chunk_size` rows at a time
+    so memory stays constant. With `include_permissions`, each user gets a
+    `module_permissions` list (a JSON string in CSV), fetched with one query
+    per chunk.
+    """
+    chunk_size = chunk_size or settings.USER_EXPORT_CHUNK_SIZE
+    users = queryset.select_related("role").iterator(chunk_size=chunk_size)
+    fields = EXPORT_FIELDS + (("module_permissions",) if include_permissions else ())
+
+    writer = None
+    if file_format == "csv":
+        writer = csv.DictWriter(_Echo(), fieldnames=fields)
+        yield writer.writeheader()
+
+    for chunk in _chunks(users, chunk_size):
+        perms = get_effective_permissions_bulk(chunk) if include_permissions else {}
+        lines = []
+        for user in chunk:
+            row = _export_row(user)
+            if include_permissions:
+                row["module_permissions"] = _export_permissions(perms[user.pk])
+
+            if writer is not None:
+                if include_permissions:
+                    row["module_permissions"] = json.dumps(row["module_permissions"])
+                lines.append(writer.writerow(row))
+            else:
+                lines.append(json.dumps(row) + "\n")
+        # one write per chunk keeps the number of socket sends low
+        yield "".join(lines)
+
+
+# ------------------- SESSION BOOTSTRAP (login `include=`) -------------------
+
+BOOTSTRAP_PARTS = ("profile", "permissions", "modules")
+
+
+def parse_bootstrap_include(value):
+    """
+    Returns the requested bootstrap parts from `include` ("profile,modules" or a list).
+    """
+    if not value:
+        return []
+    names = value.split(",") if isinstance(value, str) else value
+    names = {str(name).strip() for name in names}
+    return [part for part in BOOTSTRAP_PARTS if part in names]
+
+
+def get_bootstrap_profile(user):
+    """
+    `UserSerializer` profile, cached per user and role version (any save of
+    the user or its role makes the entry unreachable).
+    """
+    from .serializers import UserSerializer
+
+    user_version, role_version = get_versions(("user", user.pk), ("role", user.role_id))
+    key = f"bootstrap:profile:{user.pk}:{user_version}.{role_version}"
+    data = cache.get(key)
+    if data is None:
+        data = dict(UserSerializer(user).data)
+        cache.set(key, data, timeout=settings.PERMISSIONS_CACHE_TIMEOUT)
+    return data
+
+
+def get_bootstrap_modules():
+    """
+    Active module list (sidebar), shared by all users and cached per module version.
+    """
+    from roles_permissions.serializers import ModuleSerializer
+
+    key = f"bootstrap:modules:{get_version('modules')}"
+    data = cache.get(key)
+    if data is None:
+        modules = Module.objects.filter(status="active", is_deleted=False).order_by(
+            "created_date"
+        )
+        data = [dict(row) for row in ModuleSerializer(modules, many=True).data]
+        cache.set(key, data, timeout=settings.PERMISSIONS_CACHE_TIMEOUT)
+    return data
+
+
+def get_bootstrap_document(user, include):
+    """
+    Returns {part: data} for the requested `include` parts: "profile",
+    "permissions" (effective, as served by my-permissions) and "modules".
+    Each part is cached under its own versions, so a repeat login is served
+    from cache without recomputation.
+    """
+    builders = {
+        "profile": lambda: get_bootstrap_profile(user),
+        "permissions": lambda: get_my_permissions_data(user),
+        "modules": get_bootstrap_modules,
+    }
+    return {part: builders[part]() for part in parse_bootstrap_include(include)}
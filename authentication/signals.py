@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from HSM_AI.helper.cache_versions import bump_version
+from .models import Users
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=Users)
+def invalidate_user_principal(sender, instance, **kwargs):
+    """
+    Any save (including soft delete via `is_deleted=True`) or delete of a user
+    bumps its version so the cached JWT principal is rebuilt on next request.
+    """
+    bump_version("user", instance.pk)
+    # table-wide version for the user list ETag
+    bump_version("users")
@@ -1,3 +1,623 @@
-from django.test import TestCase
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+import msgpack
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework_simplejwt.tokens import AccessToken
+
+from HSM_AI.helper.loaders import BatchLoader
+from HSM_AI.helper.pagination import KeysetPagination
+from HSM_AI.helper.query_budget import get_query_budget
+from HSM_AI.helper.seed import seed_modules, seed_role, seed_users
+from HSM_AI.helper.userDetails import get_user_names_by_emails
+from HSM_AI.renderers import MessagePackRenderer, ORJSONRenderer
+from roles_permissions.services import materialize_role_permissions
+from test_support import (
+    LOCMEM_CACHES,
+    FastListEquivalenceMixin,
+    QueryBudgetMixin,
+    QueryPlanMixin,
+    auth_header,
+)
+from .models import Users
+from .serializers import UserSerializer
+from .views.authviews import (
+    AddUser,
+    GetUserDetails,
+    LoginUser,
+    MicrosoftLogin,
+    RegisterUser,
+    ResetForgotPassword,
+    SendForgotPasswordOtp,
+    UserBulkImportView,
+    UserDetailView,
+    UserExportView,
+    UserListCreateView,
+    VerifyForgotPasswordOtp,
+)
+
+PASSWORD = "Secret@123"
+# hashing cost is not what these tests measure
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are Postgres-specific")
+class UserIndexUsageTests(QueryPlanMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="explain"), role_name="Explain role")
+        cls.users = seed_users(cls.role, 200, prefix="explain")
+
+    def live_users(self):
+        return Users.objects.filter(is_deleted=False).order_by("created_date", "id")
+
+    def test_list_page(self):
+        self.assertUsesIndex(self.live_users()[:10], "users_live_created_idx")
+
+    def test_keyset_page_has_range_bound(self):
+        pagination = KeysetPagination()
+        last = self.users[99]
+        queryset = self.live_users().filter(
+            pagination.cursor_filter([last.created_date, last.pk], "gt")
+        )[:10]
+        plan = self.assertUsesIndex(queryset, "users_live_created_idx", ["authentication_users"])
+        # the leading created_date >= x is an index condition, not a filter
+        self.assertRegex(plan, r"Index Cond: .*created_date >=")
+
+    def test_role_filter(self):
+        self.assertUsesIndex(
+            self.live_users().filter(role=self.role)[:10], "users_live_role_created_idx"
+        )
+
+    def test_search(self):
+        queryset = UserSerializer.apply_search(self.live_users(), "patel")
+        plan = self.assertUsesIndex(queryset, "users_last_name_trgm", ["authentication_users"])
+        self.assertIn("users_email_trgm", plan)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class EmailUniquenessTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="unique"), role_name="Unique role")
+
+    def user_data(self, email):
+        return {
+            "email": email,
+            "password": "Secret@123",
+            "first_name": "Unique",
+            "last_name": "Email",
+            "phone_number": "9999999999",
+            "role": str(self.role.pk),
+        }
+
+    def create(self, email):
+        serializer = UserSerializer(data=self.user_data(email))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer, serializer.try_save()
+
+    def test_case_insensitive_duplicate_maps_to_email(self):
+        self.create("dup@example.com")
+        serializer, saved = self.create("DUP@example.com")
+        self.assertFalse(saved)
+        self.assertEqual(serializer.errors["email"][0].code, "unique")
+
+    def test_deleted_user_frees_the_email(self):
+        first, _ = self.create("reuse@example.com")
+        Users.objects.filter(pk=first.instance.pk).update(is_deleted=True)
+        second, saved = self.create("reuse@example.com")
+        self.assertTrue(saved)
+
+        # login picks the live user, whatever the case
+        user = authenticate(email="Reuse@Example.com", password="Secret@123")
+        self.assertEqual(user.pk, second.instance.pk)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UserListETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="etag"), role_name="ETag role")
+        [cls.user] = seed_users(cls.role, 1, prefix="etag")
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("user-list-create")
+        self.auth = auth_header(self.user)
+
+    def test_revalidation_runs_no_query(self):
+        etag = self.client.get(self.url, **self.auth)["ETag"]
+        # principal is cached by the first request, the ETag check reads cache versions only
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 304)
+
+    def test_insert_changes_etag(self):
+        etag = self.client.get(self.url, **self.auth)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Users.objects.create(
+                email="etag-new@example.com",
+                first_name="New",
+                last_name="User",
+                phone_number="9999999999",
+                role=self.role,
+            )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UserListSerializationTests(FastListEquivalenceMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="fastlist"), role_name="Fast list role")
+        cls.users = seed_users(cls.role, 15, prefix="fastlist")
+        Users.objects.filter(pk=cls.users[1].pk).update(title="Manager", status="inactive")
+
+    def test_values_path_matches_serializer(self):
+        url = reverse("user-list-create")
+        for params, fields in (
+            ({}, None),
+            ({"fields": "id,email,role_name"}, {"id", "email", "role_name"}),
+            ({"exclude": "role,status,title"}, None),
+            ({"search": "fastlist", "ordering": "relevance"}, None),
+        ):
+            with self.subTest(params=params):
+                body = self.assertSameListOutput(
+                    url, {"limit": 100, **params}, **auth_header(self.users[0])
+                )
+                rows = body["data"]["list"]
+                self.assertTrue(rows)
+                if fields:
+                    self.assertEqual(set(rows[0]), fields)
+
+
+class BatchLoaderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="loader"), role_name="Loader role")
+        cls.users = seed_users(cls.role, 3, prefix="loader")
+
+    def test_email_lookup_is_case_insensitive(self):
+        loader = BatchLoader(Users, field="email")
+        emails = [self.users[0].email.upper(), self.users[1].email, "missing@example.com"]
+        with self.assertNumQueries(1):
+            found = loader.load_many(emails)
+        self.assertEqual(found[emails[0]], self.users[0])
+        self.assertEqual(found[emails[1]], self.users[1])
+        self.assertIsNone(found[emails[2]])
+        # memoized under the normalized key
+        with self.assertNumQueries(0):
+            self.assertEqual(loader.load(self.users[0].email), self.users[0])
+
+    def test_user_names_skip_deleted_users(self):
+        user = self.users[2]
+        Users.objects.filter(pk=user.pk).update(is_deleted=True)
+        Users.objects.create(
+            email=user.email.upper(),
+            first_name="Live",
+            last_name="User",
+            phone_number="9999999999",
+            role=self.role,
+        )
+        self.assertEqual(get_user_names_by_emails([user.email])[user.email], "Live User")
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES, PERMISSION_MODE="materialized", PASSWORD_HASHERS=FAST_HASHERS
+)
+class UserEndpointQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Every authentication URL at 10 and 1000 rows (see QueryBudgetMixin),
+    within the view's `query_budget`. Atomic blocks cost a SAVEPOINT and a
+    RELEASE since the test runs in a transaction.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="budget"), role_name="Budget role")
+        [cls.user] = seed_users(cls.role, 1, prefix="budget")
+
+    def setUp(self):
+        self.auth = auth_header(self.user)
+
+    def post_json(self, url, data, **extra):
+        return self.client.post(url, data, content_type="application/json", **extra)
+
+    def seed_list_users(self, size):
+        return seed_users(self.role, size, prefix=f"budget-list-{size}")
+
+    def last_seeded_user(self, size):
+        return self.seed_list_users(size)[-1]
+
+    def role_with_modules(self, size):
+        return seed_role(
+            seed_modules(size, prefix=f"budget-{size}"), role_name=f"Budget role {size}"
+        )
+
+    def user_with_modules(self, size):
+        [user] = seed_users(self.role_with_modules(size), 1, prefix=f"budget-{size}")
+        user.set_password(PASSWORD)
+        user.save()
+        materialize_role_permissions(user)
+        return user
+
+    def new_user_data(self, size):
+        # the role's modules are copied to the new user
+        return {
+            "email": f"budget-new-{size}@example.com",
+            "password": PASSWORD,
+            "first_name": "Budget",
+            "last_name": "User",
+            "phone_number": "9999999999",
+            "role": str(self.role_with_modules(size).pk),
+        }
+
+    def test_register(self):
+        self.assertQueryBudget(
+            get_query_budget(RegisterUser, "POST"),
+            self.new_user_data, lambda data: self.post_json(reverse("register"), data)
+        )
+
+    def test_login(self):
+        self.assertQueryBudget(
+            get_query_budget(LoginUser, "POST"),
+            self.user_with_modules,
+            lambda user: self.post_json(
+                reverse("login"), {"email": user.email, "password": PASSWORD}
+            ),
+        )
+
+    def test_login_microsoft(self):
+        def login(user):
+            with patch("authentication.views.authviews.requests") as client:
+                client.post.return_value.json.return_value = {"access_token": "token"}
+                client.get.return_value.json.return_value = {"mail": user.email}
+                return self.post_json(reverse("login-microsoft"), {"code": "code"})
+
+        self.assertQueryBudget(
+            get_query_budget(MicrosoftLogin, "POST"), self.user_with_modules, login
+        )
+
+    def test_profile(self):
+        self.assertQueryBudget(
+            get_query_budget(GetUserDetails, "GET"),
+            self.seed_list_users, lambda _: self.client.get(reverse("profile"), **self.auth)
+        )
+
+    def test_forgot_password_email(self):
+        self.assertQueryBudget(
+            get_query_budget(SendForgotPasswordOtp, "POST"),
+            self.last_seeded_user,
+            lambda user: self.post_json(
+                reverse("forgot-password-email"), {"email": user.email}
+            ),
+        )
+
+    def test_forgot_password_verify(self):
+        def setup(size):
+            user = self.last_seeded_user(size)
+            Users.objects.filter(pk=user.pk).update(
+                otp_code="123456", otp_created_at=timezone.now()
+            )
+            return user
+
+        self.assertQueryBudget(
+            get_query_budget(VerifyForgotPasswordOtp, "POST"),
+            setup,
+            lambda user: self.post_json(
+                reverse("forgot-password-verify"), {"email": user.email, "otp": "123456"}
+            ),
+        )
+
+    def test_forgot_password_reset(self):
+        self.assertQueryBudget(
+            get_query_budget(ResetForgotPassword, "POST"),
+            self.last_seeded_user,
+            lambda user: self.post_json(
+                reverse("forgot-password-reset"),
+                {"reset_token": str(AccessToken.for_user(user)), "new_password": PASSWORD},
+            ),
+        )
+
+    def test_add_user(self):
+        self.assertQueryBudget(
+            get_query_budget(AddUser, "POST"),
+            self.new_user_data,
+            lambda data: self.post_json(reverse("add-user"), data, **self.auth),
+        )
+
+    def test_user_list(self):
+        self.assertQueryBudget(
+            get_query_budget(UserListCreateView, "GET"),
+            self.seed_list_users,
+            lambda _: self.client.get(reverse("user-list-create"), **self.auth),
+        )
+
+    def test_user_create(self):
+        self.assertQueryBudget(
+            get_query_budget(UserListCreateView, "POST"),
+            self.new_user_data,
+            lambda data: self.post_json(reverse("user-list-create"), data, **self.auth),
+        )
+
+    def test_user_retrieve(self):
+        self.assertQueryBudget(
+            get_query_budget(UserDetailView, "GET"),
+            self.last_seeded_user,
+            lambda user: self.client.get(reverse("user-detail", args=[user.pk]), **self.auth),
+        )
+
+    def test_user_update(self):
+        for method in (self.client.put, self.client.patch):
+            with self.subTest(method=method.__name__):
+                self.assertQueryBudget(
+                    get_query_budget(UserDetailView, method.__name__.upper()),
+                    self.last_seeded_user,
+                    lambda user: method(
+                        reverse("user-detail", args=[user.pk]),
+                        {"first_name": "Renamed"},
+                        content_type="application/json",
+                        **self.auth,
+                    ),
+                )
+
+    def test_user_delete(self):
+        self.assertQueryBudget(
+            get_query_budget(UserDetailView, "DELETE"),
+            self.last_seeded_user,
+            lambda user: self.client.delete(reverse("user-detail", args=[user.pk]), **self.auth),
+        )
+
+    @override_settings(USER_IMPORT_CHUNK_SIZE=1000)
+    def test_user_import(self):
+        def upload(size):
+            lines = ["email,password,first_name,last_name,phone_number,role"]
+            lines += [
+                f"budget-import-{size}-{i}@example.com,{PASSWORD},Import,User{i},"
+                f"9999999999,{self.role.pk}"
+                for i in range(size)
+            ]
+            return SimpleUploadedFile("users.csv", "\n".join(lines).encode())
+
+        # hash in threads: the process pool would need the test database
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        with patch("authentication.services.get_hasher_pool", return_value=pool):
+            response = self.assertQueryBudget(
+                get_query_budget(UserBulkImportView, "POST"),
+                upload,
+                lambda file: self.client.post(
+                    reverse("user-bulk-import"), {"file": file}, **self.auth
+                ),
+            )
+        self.assertEqual(response.data["data"]["created"], 1000)
+
+    def test_user_export(self):
+        self.assertQueryBudget(
+            get_query_budget(UserExportView, "GET"),
+            self.seed_list_users,
+            lambda _: self.client.get(
+                reverse("user-export"), {"include": "permissions"}, **self.auth
+            ),
+        )
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES, PERMISSION_MODE="materialized", PASSWORD_HASHERS=FAST_HASHERS
+)
+class UserImportErrorTests(TestCase):
+    HEADER = b"email,password,first_name,last_name,phone_number,role\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="import"), role_name="Import role")
+        [cls.user] = seed_users(cls.role, 1, prefix="import")
+
+    def setUp(self):
+        # hash in threads: the process pool would need the test database
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        patcher = patch("authentication.services.get_hasher_pool", return_value=pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def row(self, i):
+        return (
+            f"import-{i}@example.com,{PASSWORD},Import,User{i},9999999999,{self.role.pk}\n"
+        ).encode()
+
+    def upload(self, content, name="users.csv"):
+        return self.client.post(
+            reverse("user-bulk-import"),
+            {"file": SimpleUploadedFile(name, content)},
+            **auth_header(self.user),
+        )
+
+    def test_undecodable_file_is_a_400_with_the_report(self):
+        response = self.upload(self.HEADER + self.row(1) + b"\xff\xfe broken\n")
+
+        self.assertEqual(response.status_code, 400)
+        report = response.json()["errors"]
+        self.assertEqual(report["failed"], 1)
+        self.assertIn("file", report["errors"][-1]["errors"])
+
+    def test_broken_csv_is_a_400_with_the_report(self):
+        # a cell over csv.field_size_limit() raises csv.Error
+        response = self.upload(self.HEADER + self.row(1) + b"x" * 200_000 + b",y\n")
+
+        self.assertEqual(response.status_code, 400)
+        report = response.json()["errors"]
+        self.assertEqual(report["created"], 1)
+        self.assertIn("file", report["errors"][-1]["errors"])
+
+    def test_bad_jsonl_lines_are_row_errors(self):
+        response = self.upload(b'{"email": 1}\nnot json\n', name="users.jsonl")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [error["row"] for error in response.json()["data"]["errors"]], [1, 2]
+        )
+
+    def test_server_fault_is_a_500_without_details(self):
+        with patch(
+            "authentication.views.authviews.import_users",
+            side_effect=RuntimeError("connection string with password"),
+        ), self.assertLogs("authentication.views.authviews", "ERROR"):
+            response = self.upload(self.HEADER + self.row(1))
+
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn("password", response.content.decode())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BatchViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="batch"), role_name="Batch role")
+        [cls.user] = seed_users(cls.role, 1, prefix="batch")
+
+    def setUp(self):
+        self.url = reverse("batch")
+        self.auth = auth_header(self.user)
+
+    def batch(self, data):
+        return self.client.post(self.url, data, content_type="application/json", **self.auth)
+
+    def test_non_object_body_is_rejected(self):
+        # raw JSON bodies: an array, a string, a number
+        for data in ('[{"path": "/auth/profile/"}]', '"requests"', "1"):
+            with self.subTest(data=data):
+                response = self.batch(data)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["message"], "Invalid batch.")
+
+    def test_sub_requests_run_in_order(self):
+        response = self.batch(
+            {
+                "requests": [
+                    {"id": "profile", "path": "/auth/profile/"},
+                    {"id": "nested", "method": "POST", "path": "/api/batch/"},
+                    {"id": "missing", "path": "/nowhere/"},
+                ]
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        responses = response.json()["data"]["responses"]
+        self.assertEqual([r["id"] for r in responses], ["profile", "nested", "missing"])
+        self.assertEqual([r["status"] for r in responses], [200, 400, 404])
+        self.assertEqual(responses[0]["body"]["data"]["email"], self.user.email)
+
+    def test_failing_sub_request_does_not_leak_the_error(self):
+        with patch(
+            "authentication.views.authviews.GetUserDetails.get",
+            side_effect=RuntimeError("connection string with password"),
+        ), self.assertLogs("HSM_AI.batch", "ERROR"):
+            response = self.batch({"requests": [{"id": "profile", "path": "/auth/profile/"}]})
+
+        self.assertEqual(response.status_code, 200)
+        [result] = response.json()["data"]["responses"]
+        self.assertEqual(result["status"], 500)
+        self.assertEqual(result["body"], {"message": "Internal server error."})
+
+    def test_parallel_workers_close_only_their_connections(self):
+        closed_in = []
+
+        def close_all():
+            closed_in.append(threading.get_ident())
+            real_close_all()
+
+        real_close_all = connections.close_all
+        specs = [{"id": str(i), "path": "/auth/profile/"} for i in range(3)]
+        with patch.object(connections, "close_all", side_effect=close_all):
+            response = self.batch({"requests": specs, "parallel": True})
+
+        self.assertEqual(response.status_code, 200)
+        responses = response.json()["data"]["responses"]
+        self.assertEqual([r["id"] for r in responses], ["0", "1", "2"])
+        self.assertEqual({r["status"] for r in responses}, {200})
+        # once per sub-request, never on the request thread (the test's transaction)
+        self.assertEqual(len(closed_in), len(specs))
+        self.assertNotIn(threading.get_ident(), closed_in)
+        self.assertTrue(connection.in_atomic_block)
+
+    def test_writes_are_not_run_in_parallel(self):
+        with patch.object(connections, "close_all") as close_all:
+            response = self.batch(
+                {
+                    "requests": [
+                        {"path": "/auth/profile/"},
+                        {
+                            "method": "PATCH",
+                            "path": f"/auth/users/{self.user.pk}/",
+                            "body": {"first_name": "Batched"},
+                        },
+                    ],
+                    "parallel": True,
+                }
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r["status"] for r in response.json()["data"]["responses"]], [200, 200]
+        )
+        close_all.assert_not_called()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "Batched")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RendererTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="render"), role_name="Render role")
+        cls.users = seed_users(cls.role, 12, prefix="render")
+
+    def get_page(self, accept):
+        cache.clear()
+        return self.client.get(
+            reverse("user-list-create"),
+            {"limit": 5},
+            HTTP_ACCEPT=accept,
+            **auth_header(self.users[0]),
+        )
+
+    @skipUnless(settings.MSGPACK_CONTENT_NEGOTIATION, "MessagePack negotiation is off")
+    def test_paginated_page_as_json_and_msgpack(self):
+        page = json.loads(self.get_page("application/json").content)
+        self.assertEqual(len(page["data"]["list"]), 5)
+
+        response = self.get_page("application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content, raw=False), page)
+
+    def test_requested_indent_is_honoured(self):
+        compact = self.get_page("application/json").content
+        self.assertNotIn(b"\n", compact)
+        for indent in (2, 4):
+            with self.subTest(indent=indent):
+                content = self.get_page(f"application/json; indent={indent}").content
+                self.assertIn(b"\n" + b" " * indent + b'"data"', content)
+                self.assertEqual(json.loads(content), json.loads(compact))
+
+    def test_non_json_types_fall_back_to_drf_encoder(self):
+        key = uuid.uuid4()
+        data = {"id": key, "message": gettext_lazy("Not found."), "amount": Decimal("1.50")}
+        expected = {"id": str(key), "message": "Not found.", "amount": "1.50"}
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), expected)
+        self.assertEqual(
+            msgpack.unpackb(MessagePackRenderer().render(data), raw=False), expected
+        )
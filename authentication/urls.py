@@ -12,7 +12,9 @@ from .views.authviews import (
     # DropboxListFilesAPI,
     # DropboxDownloadFileAPI,
     UserListCreateView,
-    UserDetailView
+    UserDetailView,
+    UserBulkImportView,
+    UserExportView,
     )
 from .views.emailviews import *
 
@@ -30,4 +32,6 @@ urlpatterns = [
     path("add-user/", AddUser.as_view(), name="add-user"),
     path("users/", UserListCreateView.as_view(), name="user-list-create"),
     path("users/<uuid:pk>/", UserDetailView.as_view(), name="user-detail"),
+    path("users/import/", UserBulkImportView.as_view(), name="user-bulk-import"),
+    path("users/export/", UserExportView.as_view(), name="user-export"),
 ]
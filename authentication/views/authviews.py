@@ -1,8 +1,12 @@
 import requests
+from django.http import StreamingHttpResponse
 from rest_framework import status, generics, permissions
+from django.db import transaction
 from django.db.models import Q
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from django.contrib.auth import authenticate
 from ..serializers import (
     UserSerializer,
@@ -25,18 +29,36 @@ from rest_framework_simplejwt.tokens import AccessToken, TokenError
 import json
 from HSM_AI.helper.cloud_to_s3 import upload_base64_to_s3
 import base64
-from HSM_AI.helper.pagination import CustomPagination
+from HSM_AI.helper.conditional import ConditionalGetMixin
+from HSM_AI.helper.fast_serializers import FastListMixin
+from HSM_AI.helper.pagination import CustomPagination, get_list_ordering
+from roles_permissions.cache import warm_my_permissions_cache
+from roles_permissions.permissions import get_tokens_for_user
+from roles_permissions.services import materialize_role_permissions
+from ..services import (
+    EXPORT_FORMATS,
+    IMPORT_FILE_ERROR,
+    IMPORT_FORMATS,
+    detect_import_format,
+    get_bootstrap_document,
+    import_users,
+    iter_import_rows,
+    iter_user_export,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class RegisterUser(APIView):
+    # role + user and permission INSERTs + try_save/create/materialize savepoints
+    query_budget = {"POST": 9}
+
     @swagger_auto_schema(request_body=UserSerializer)
     def post(self, request):
         try:
             serializer = UserSerializer(data=request.data)
-            if serializer.is_valid():
-                user = serializer.save()
+            if serializer.is_valid() and serializer.try_save():
+                user = serializer.instance
                 data = {
                     "id": str(user.id),
                     "email": user.email,
@@ -44,7 +66,7 @@ class RegisterUser(APIView):
                     "last_name": user.last_name,
                     "phone_number": user.phone_number,
                     "country_code": user.country_code,
-                    "role": user.role,
+                    "role": str(user.role_id) if user.role_id else None,
                 }
                 return utils.success_response(
                     message="User registered successfully.",
@@ -79,6 +101,8 @@ class RegisterUser(APIView):
 class LoginUser(APIView):
     authentication_classes = []
     permission_classes = []
+    # user by email + permission rows (cache warm-up)
+    query_budget = {"POST": 2}
 
     def post(self, request):
         # encryptedData = request.data.get('payload')
@@ -99,20 +123,26 @@ class LoginUser(APIView):
 
         # Step 3: If authenticated, return JWT tokens
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = get_tokens_for_user(user)
+            warm_my_permissions_cache(user)
+            data = {
+                "user_id": user.id,
+                "email": user.email,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "token": {
+                    "refresh": str(refresh),
+                    "access": str(refresh.access_token),
+                },
+            }
+            # opt-in: include=profile,permissions,modules saves the follow-up calls
+            include = request.data.get("include") or request.query_params.get("include")
+            if include:
+                data["bootstrap"] = get_bootstrap_document(user, include)
             return Response(
                 {
                     "message": "Login successful.",
-                    "data": {
-                        "user_id": user.id,
-                        "email": user.email,
-                        "first_name": user.first_name,
-                        "last_name": user.last_name,
-                        "token": {
-                            "refresh": str(refresh),
-                            "access": str(refresh.access_token),
-                        },
-                    },
+                    "data": data,
                     "status": 200,
                 },
                 status=status.HTTP_200_OK,
@@ -127,6 +157,8 @@ class LoginUser(APIView):
 
 class SendForgotPasswordOtp(APIView):
     permission_classes = [AllowAny]
+    # user + OTP UPDATE
+    query_budget = {"POST": 2}
 
     def post(self, request):
         email = request.data.get("email")
@@ -153,6 +185,8 @@ class SendForgotPasswordOtp(APIView):
 
 class VerifyForgotPasswordOtp(APIView):
     permission_classes = [AllowAny]
+    # user + OTP cleared
+    query_budget = {"POST": 2}
 
     def post(self, request):
         serializer = ForgotPasswordOtpSerializer(data=request.data)
@@ -184,6 +218,8 @@ class VerifyForgotPasswordOtp(APIView):
 
 class ResetForgotPassword(APIView):
     permission_classes = [AllowAny]
+    # user + password UPDATE
+    query_budget = {"POST": 2}
 
     def post(self, request):
         reset_token = request.data.get("reset_token")
@@ -211,6 +247,8 @@ class ResetForgotPassword(APIView):
 
 class GetUserDetails(APIView):
     permission_classes = [IsAuthenticated]
+    # principal, role joined
+    query_budget = {"GET": 1}
 
     def get(self, request):
         try:
@@ -235,6 +273,8 @@ class GetUserDetails(APIView):
 
 class AddUser(APIView):
     permission_classes = [IsAuthenticated]
+    # principal + RegisterUser's queries
+    query_budget = {"POST": 10}
     # authentication_classes = []
     # permission_classes = []
 
@@ -243,8 +283,8 @@ class AddUser(APIView):
         try:
             serializer = UserSerializer(data=request.data)
 
-            if serializer.is_valid():
-                user = serializer.save()
+            if serializer.is_valid() and serializer.try_save():
+                user = serializer.instance
 
                 data = {
                     "id": str(user.id),
@@ -314,6 +354,8 @@ class AddUser(APIView):
 class MicrosoftLogin(APIView):
     authentication_classes = []
     permission_classes = [AllowAny]
+    # user by email + permission rows (cache warm-up)
+    query_budget = {"POST": 2}
 
     def post(self, request):
         code = request.data.get("code")
@@ -380,20 +422,26 @@ class MicrosoftLogin(APIView):
                 )
 
             # 4️⃣ Generate JWT tokens (same as normal login)
-            refresh = RefreshToken.for_user(user)
+            refresh = get_tokens_for_user(user)
+            warm_my_permissions_cache(user)
+            data = {
+                "user_id": user.id,
+                "email": user.email,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "token": {
+                    "refresh": str(refresh),
+                    "access": str(refresh.access_token),
+                },
+            }
+            # opt-in: include=profile,permissions,modules saves the follow-up calls
+            include = request.data.get("include") or request.query_params.get("include")
+            if include:
+                data["bootstrap"] = get_bootstrap_document(user, include)
             return Response(
                 {
                     "message": "Login successful.",
-                    "data": {
-                        "user_id": user.id,
-                        "email": user.email,
-                        "first_name": user.first_name,
-                        "last_name": user.last_name,
-                        "token": {
-                            "refresh": str(refresh),
-                            "access": str(refresh.access_token),
-                        },
-                    },
+                    "data": data,
                     "status": 200,
                 },
                 status=status.HTTP_200_OK,
@@ -569,21 +617,23 @@ class DropboxDownloadFileAPI(APIView):
 """ Users """
 
 
-class UserListCreateView(generics.ListCreateAPIView):
-    serializer_class = UserSerializer
-    permission_classes = [IsAuthenticated]
-    pagination_class = CustomPagination
+class UserQueryMixin:
+    """
+    Live users filtered by `?search=` / `?role=` and ordered by `?ordering=`,
+    shared by the user list and the export.
+    """
 
     def get_queryset(self):
-        queryset = Users.objects.filter(is_deleted=False).order_by("created_date")
+        queryset = Users.objects.filter(is_deleted=False).order_by(
+            *get_list_ordering(self.request)
+        )
 
         search_term = self.request.query_params.get("search")
-        if search_term:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search_term)
-                | Q(last_name__icontains=search_term)
-                | Q(email__icontains=search_term)
-            )
+        queryset = self.serializer_class.apply_search(
+            queryset,
+            search_term,
+            rank=self.request.query_params.get("ordering") == "relevance",
+        )
 
         role_filter = self.request.query_params.get("role")
         if role_filter:
@@ -592,18 +642,38 @@ class UserListCreateView(generics.ListCreateAPIView):
 
         return queryset
 
+
+class UserListCreateView(
+    ConditionalGetMixin, FastListMixin, UserQueryMixin, generics.ListCreateAPIView
+):
+    serializer_class = UserSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CustomPagination
+    # GET: principal (cache miss) + COUNT + page, role joined
+    # (the ETag check only reads cache versions)
+    # POST: principal + soft-deleted lookup + AddUser's queries
+    query_budget = {"GET": 3, "POST": 11}
+    # role_name is embedded: any role rename changes the list
+    conditional_versions = ("roles",)
+
+    def get_conditional_validators(self, request, *args, **kwargs):
+        return self.list_validators("users")
+
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
+            # values() rows + precompiled serializer (or ?fields= projection)
+            queryset = self.get_list_queryset()
             page = self.paginate_queryset(queryset)
             if page is not None:
-                serializer = self.get_serializer(page, many=True)
-                return self.get_paginated_response(serializer.data)
+                return self.get_paginated_response(self.serialize_list(page))
 
-            serializer = self.get_serializer(queryset, many=True)
+            data = self.serialize_list(queryset)
             return utils.success_response(
-                "Users fetched successfully.", serializer.data, status.HTTP_200_OK
+                "Users fetched successfully.", data, status.HTTP_200_OK
             )
+        except APIException:
+            # invalid cursor or page: let DRF answer 404 / 400
+            raise
         except Exception as e:
             return utils.error_response("Failed to fetch users.", str(e), 500)
 
@@ -619,13 +689,25 @@ class UserListCreateView(generics.ListCreateAPIView):
                 )
 
             # Check for soft-deleted user
-            deleted_user = Users.objects.filter(email=email, is_deleted=True).first()
+            # (latest one: an email can be deleted, reused and deleted again)
+            deleted_user = (
+                Users.objects.filter(email__iexact=email, is_deleted=True)
+                .order_by("-modified_date")
+                .first()
+            )
             if deleted_user:
                 serializer = self.get_serializer(
                     deleted_user, data=request.data, partial=True
                 )
-                if serializer.is_valid():
-                    serializer.save(is_deleted=False)  # Reactivate user
+                # reactivation and its permission rows commit (or roll back) together
+                with transaction.atomic():
+                    restored = serializer.is_valid() and serializer.try_save(
+                        is_deleted=False
+                    )
+                    if restored:
+                        # Re-copy the (possibly new) role's permissions in one statement
+                        materialize_role_permissions(serializer.instance, replace=True)
+                if restored:
                     return utils.success_response(
                         "User restored successfully.",
                         serializer.data,
@@ -639,8 +721,7 @@ class UserListCreateView(generics.ListCreateAPIView):
 
             # Create new user
             serializer = self.get_serializer(data=request.data)
-            if serializer.is_valid():
-                user = serializer.save()
+            if serializer.is_valid() and serializer.try_save():
                 return utils.success_response(
                     "User added successfully.", serializer.data, status.HTTP_201_CREATED
                 )
@@ -655,12 +736,21 @@ class UserListCreateView(generics.ListCreateAPIView):
             )
 
 
-class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UserDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    # GET: principal + modified_date (ETag) + user, role joined
+    # PUT/PATCH: principal + user + UPDATE + try_save/update savepoints
+    # DELETE: principal + user + soft delete UPDATE
+    query_budget = {"GET": 3, "PUT": 7, "PATCH": 7, "DELETE": 3}
+    conditional_versions = ("roles",)
 
     def get_queryset(self):
-        return Users.objects.filter(is_deleted=False)
+        # role_name is serialized, join it instead of a second query
+        return Users.objects.filter(is_deleted=False).select_related("role")
+
+    def get_conditional_validators(self, request, *args, **kwargs):
+        return self.object_validators(Users.objects.filter(is_deleted=False), kwargs["pk"])
 
     def retrieve(self, request, *args, **kwargs):
         try:
@@ -679,8 +769,7 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
             user = self.get_object()
             serializer = self.get_serializer(user, data=request.data, partial=partial)
 
-            if serializer.is_valid():
-                serializer.save()
+            if serializer.is_valid() and serializer.try_save():
                 return utils.success_response(
                     "User updated successfully.", serializer.data, status.HTTP_200_OK
                 )
@@ -701,3 +790,96 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
             )
         except Exception as e:
             return utils.error_response("Failed to delete user.", str(e), 500)
+
+
+class UserBulkImportView(APIView):
+    """
+    Bulk-create users from an uploaded CSV (header row) or JSONL file.
+    Form fields: `file`, optional `file_format` ("csv" / "jsonl", default
+    from the file extension). Returns a per-row error report.
+    """
+
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    # principal + roles + taken emails + user and permission INSERTs
+    # + chunk/materialize savepoints, for a file of one chunk
+    # (USER_IMPORT_CHUNK_SIZE rows); each further chunk repeats all but the first two
+    query_budget = {"POST": 9}
+
+    def post(self, request):
+        try:
+            upload = request.FILES.get("file")
+            if upload is None:
+                return utils.error_response(
+                    "File is required.",
+                    "Missing file in request.",
+                    status.HTTP_400_BAD_REQUEST,
+                )
+
+            file_format = request.data.get("file_format") or detect_import_format(
+                upload.name
+            )
+            if file_format not in IMPORT_FORMATS:
+                return utils.error_response(
+                    "Unsupported file format.",
+                    f"Expected one of: {', '.join(IMPORT_FORMATS)}.",
+                    status.HTTP_400_BAD_REQUEST,
+                )
+
+            report = import_users(iter_import_rows(upload, file_format))
+            if any(IMPORT_FILE_ERROR in error["errors"] for error in report["errors"]):
+                # rows before the unreadable part are imported; the report says which
+                return utils.error_response(
+                    "Malformed import file.", report, status.HTTP_400_BAD_REQUEST
+                )
+            return utils.success_response(
+                f"{report['created']} of {report['total']} users imported.",
+                report,
+                status.HTTP_200_OK,
+            )
+        except Exception:
+            logger.exception("User import failed")
+            return utils.error_response(
+                "Failed to import users.",
+                None,
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class UserExportView(UserQueryMixin, generics.GenericAPIView):
+    """
+    Stream all live users (same `search` / `role` filters as the list) as CSV
+    or NDJSON (`?file_format=`, default csv). `?include=permissions` adds each
+    user's module permissions.
+    """
+
+    serializer_class = UserSerializer
+    permission_classes = [IsAuthenticated]
+    # principal + server-side cursor (role joined) + permissions of the chunk,
+    # for an export of one chunk (USER_EXPORT_CHUNK_SIZE rows); each further
+    # chunk adds one permissions query
+    query_budget = {"GET": 3}
+
+    content_types = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+    def get(self, request):
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in EXPORT_FORMATS:
+            return utils.error_response(
+                "Unsupported file format.",
+                f"Expected one of: {', '.join(EXPORT_FORMATS)}.",
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        include_permissions = "permissions" in request.query_params.get(
+            "include", ""
+        ).split(",")
+        rows = iter_user_export(
+            self.get_queryset(), file_format, include_permissions=include_permissions
+        )
+        response = StreamingHttpResponse(
+            rows, content_type=self.content_types[file_format]
+        )
+        response["Content-Disposition"] = f'attachment; filename="users.{file_format}"'
+        return response
@@ -11,8 +11,11 @@ class RolesPermissionsConfig(AppConfig):
         """
         Bootstrap default data after migrations.
         """
+        from . import signals  # noqa: F401
+
         try:
             from roles_permissions.models import Module, Role, UserModulePermission
+            from roles_permissions.services import materialize_role_permissions
             from authentication.models import Users
         except ImproperlyConfigured:
             return
@@ -84,18 +87,7 @@ class RolesPermissionsConfig(AppConfig):
                         print(f"✅ Super Admin user created: {super_email}")
 
                         # Copy role permissions → UserModulePermission
-                        for perm in role.module_permissions:
-                            UserModulePermission.objects.get_or_create(
-                                user=super_admin,
-                                module_id=perm["module_id"],
-                                defaults={
-                                    "visible": perm.get("visible", True),
-                                    "can_create": perm.get("can_create", True),
-                                    "can_read": perm.get("can_read", True),
-                                    "can_update": perm.get("can_update", True),
-                                    "can_delete": perm.get("can_delete", True),
-                                },
-                            )
+                        materialize_role_permissions(super_admin, role)
                         print("✅ Role permissions assigned to Super Admin user")
                     else:
                         print(f"ℹ️ Super Admin user already exists: {super_email}")
@@ -0,0 +1,46 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .permissions import get_permission_version
+from .serializers import UserModulePermissionSerializer
+from .services import get_effective_permissions
+
+logger = logging.getLogger(__name__)
+
+
+def my_permissions_cache_key(user):
+    """
+    Key embeds the user's permission, role and global module versions, so any
+    write to UserModulePermission / Role / Module makes old entries unreachable.
+    """
+    return f"my_permissions:{user.pk}:{get_permission_version(user)}"
+
+
+def get_my_permissions_data(user):
+    """
+    Returns the serialized effective permissions of `user` (as served by
+    `MyPermissionsView`), hitting the DB only on a cache miss.
+    """
+    key = my_permissions_cache_key(user)
+    data = cache.get(key)
+    if data is None:
+        permissions = get_effective_permissions(user, active_only=True)
+        data = [
+            dict(row)
+            for row in UserModulePermissionSerializer(permissions, many=True).data
+        ]
+        cache.set(key, data, timeout=settings.PERMISSIONS_CACHE_TIMEOUT)
+    return data
+
+
+def warm_my_permissions_cache(user):
+    """
+    Pre-computes the permissions cache entry (called at login).
+    """
+    try:
+        get_my_permissions_data(user)
+    except Exception:
+        # never fail a login because the cache is unavailable
+        logger.exception("Permissions cache warm-up failed for user %s", user.pk)
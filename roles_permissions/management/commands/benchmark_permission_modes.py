@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from HSM_AI.helper.benchmark import format_bytes, format_table, measure, relation_size
+from HSM_AI.helper.seed import seed_modules, seed_role, seed_users
+from roles_permissions.models import UserModulePermission
+from roles_permissions.services import (
+    MATERIALIZED,
+    OVERLAY,
+    apply_role_permission_diff,
+    diff_role_permissions,
+    materialize_role_permissions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "UserModulePermission table growth and role-edit latency with "
+        "PERMISSION_MODE 'materialized' vs 'overlay'. Seeds a role with "
+        "--users users in a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--modules", type=int, default=30)
+        parser.add_argument(
+            "--override-ratio",
+            type=float,
+            default=0.05,
+            help="Share of users with one individually edited permission.",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Role edits per mode.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = self.run(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            format_table(
+                rows,
+                ["mode", "rows", "table_growth", "edit_queries", "edit_mean_ms", "edit_p95_ms"],
+            )
+        )
+
+    def run(self, options):
+        modules = seed_modules(options["modules"], prefix="bench-perm")
+        role = seed_role(modules, role_name="Benchmark permission modes")
+        users = seed_users(role, options["users"], prefix="bench-perm")
+        baseline = relation_size(UserModulePermission)
+
+        # Overlay: only individual overrides are stored
+        overrides = users[: int(len(users) * options["override_ratio"])]
+        UserModulePermission.objects.bulk_create(
+            [
+                UserModulePermission(user=user, module=modules[0], visible=True, can_update=True)
+                for user in overrides
+            ],
+            batch_size=5000,
+        )
+        results = [self.measure_mode(OVERLAY, role, baseline, options["repeat"])]
+
+        # Materialized: every role permission copied to every user
+        for start in range(0, len(users), 1000):
+            materialize_role_permissions(users[start:start + 1000])
+        results.append(self.measure_mode(MATERIALIZED, role, baseline, options["repeat"]))
+        return results
+
+    def measure_mode(self, mode, role, baseline, repeat):
+        size = relation_size(UserModulePermission)
+        edits = [self.toggle_can_update(role, True), self.toggle_can_update(role, False)]
+        state = {"edit": 0}
+
+        def edit_role():
+            # what RoleSerializer.update + the propagation task do, run in-process
+            old_permissions = role.module_permissions
+            role.module_permissions = edits[state["edit"] % 2]
+            state["edit"] += 1
+            role.save()
+            if mode == MATERIALIZED:
+                diff = diff_role_permissions(old_permissions, role.module_permissions)
+                apply_role_permission_diff(role.pk, diff)
+
+        with override_settings(PERMISSION_MODE=mode):
+            timings = measure(edit_role, repeat=repeat, warmup=1)
+
+        return {
+            "mode": mode,
+            "rows": UserModulePermission.objects.filter(user__role=role).count(),
+            "table_growth": format_bytes(None if size is None else size - baseline),
+            "edit_queries": timings["queries"],
+            "edit_mean_ms": timings["mean_ms"],
+            "edit_p95_ms": timings["p95_ms"],
+        }
+
+    @staticmethod
+    def toggle_can_update(role, value):
+        return [{**perm, "can_update": value} for perm in role.module_permissions]
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from roles_permissions.models import Role
+from roles_permissions.services import compact_permission_overrides
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete UserModulePermission rows identical to the user's role default "
+        "(run before/after switching PERMISSION_MODE to 'overlay')."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--role", help="Only compact users of this role id.")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many rows would be deleted without deleting them.",
+        )
+
+    def handle(self, *args, **options):
+        role = None
+        if options["role"]:
+            role = Role.objects.get(pk=options["role"], is_deleted=False)
+
+        count = compact_permission_overrides(role=role, dry_run=options["dry_run"])
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} redundant permission rows."))
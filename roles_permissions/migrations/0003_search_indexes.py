@@ -0,0 +1,50 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:00
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from HSM_AI.helper.schema import PostgresAddIndexConcurrently
+from HSM_AI.helper.search import create_search_indexes, drop_search_indexes
+
+SEARCH_COLUMNS = {
+    "roles_permissions_role": ("role_name",),
+    "roles_permissions_module": ("module_name", "description"),
+}
+
+
+def forwards(apps, schema_editor):
+    for table, columns in SEARCH_COLUMNS.items():
+        create_search_indexes(schema_editor, table, columns)
+
+
+def backwards(apps, schema_editor):
+    for table, columns in SEARCH_COLUMNS.items():
+        drop_search_indexes(schema_editor, table, columns)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('roles_permissions', '0002_module_description'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(forwards, backwards),
+        PostgresAddIndexConcurrently(
+            model_name='role',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('role_name'), name='gin_trgm_ops'), name='role_role_name_trgm'),
+        ),
+        PostgresAddIndexConcurrently(
+            model_name='module',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('module_name'), name='gin_trgm_ops'), name='module_module_name_trgm'),
+        ),
+        PostgresAddIndexConcurrently(
+            model_name='module',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('description'), name='gin_trgm_ops'), name='module_description_trgm'),
+        ),
+    ]
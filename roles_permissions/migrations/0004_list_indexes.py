@@ -0,0 +1,31 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('roles_permissions', '0003_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_date', 'id'], name='module_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='role',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_date', 'id'], name='role_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermodulepermission',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_date', 'id'], name='ump_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermodulepermission',
+            index=models.Index(fields=['user'], include=('module', 'visible', 'can_create', 'can_read', 'can_update', 'can_delete'), name='ump_user_flags_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.17 on 2026-10-18 10:15
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_permissions', '0004_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='module',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('module_name'), condition=models.Q(('is_deleted', False)), name='module_module_name_ci_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='module',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('path'), condition=models.Q(('is_deleted', False)), name='module_path_ci_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='role',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('role_name'), condition=models.Q(('is_deleted', False)), name='role_role_name_ci_uniq'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.17 on 2026-10-18 11:00
+
+import HSM_AI.helper.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_permissions', '0005_ci_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='module',
+            name='id',
+            field=models.UUIDField(default=HSM_AI.helper.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='role',
+            name='id',
+            field=models.UUIDField(default=HSM_AI.helper.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='usermodulepermission',
+            name='id',
+            field=models.UUIDField(default=HSM_AI.helper.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.17 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_permissions', '0006_uuid7_primary_keys'),
+    ]
+
+    # superseded by the *_ci_uniq constraints (lower(col), live rows)
+    operations = [
+        migrations.AlterField(
+            model_name='module',
+            name='module_name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='module',
+            name='path',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='role',
+            name='role_name',
+            field=models.CharField(max_length=100),
+        ),
+    ]
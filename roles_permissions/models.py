@@ -1,6 +1,9 @@
-import uuid
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
 from django.conf import settings
+from django.db.models.functions import Lower, Upper
+
+from HSM_AI.helper.ids import uuid7
 
 
 class BaseModel(models.Model):
@@ -22,8 +25,8 @@ class BaseModel(models.Model):
 #         return self.role_name
 
 class Role(BaseModel):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    role_name = models.CharField(max_length=100, unique=True)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    role_name = models.CharField(max_length=100)  # see role_role_name_ci_uniq
 
     # store module + permissions directly in JSON
     module_permissions = models.JSONField(default=list)
@@ -40,6 +43,26 @@ class Role(BaseModel):
     #   {...}
     # ]
 
+    class Meta:
+        indexes = [
+            # RoleListCreateView: is_deleted=False ORDER BY created_date (+ keyset on id)
+            models.Index(
+                fields=["created_date", "id"],
+                condition=models.Q(is_deleted=False),
+                name="role_live_created_idx",
+            ),
+            # ?search= icontains (UPPER(col) LIKE '%x%'), see HSM_AI/helper/search.py
+            GinIndex(OpClass(Upper("role_name"), name="gin_trgm_ops"), name="role_role_name_trgm"),
+        ]
+        constraints = [
+            # Case-insensitive name uniqueness among live roles (replaces the iexact pre-check)
+            models.UniqueConstraint(
+                Lower("role_name"),
+                condition=models.Q(is_deleted=False),
+                name="role_role_name_ci_uniq",
+            ),
+        ]
+
     def __str__(self):
         return self.role_name
 
@@ -52,14 +75,45 @@ class Module(BaseModel):
         ("inactive", "Inactive"),
     )
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    module_name = models.CharField(max_length=100, unique=True)
-    path = models.CharField(max_length=255, unique=True)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    # see module_module_name_ci_uniq / module_path_ci_uniq
+    module_name = models.CharField(max_length=100)
+    path = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)  
     status = models.CharField(
         max_length=10, choices=STATUS_CHOICES, default="active"
     )
 
+    class Meta:
+        indexes = [
+            # ModuleListCreateView: is_deleted=False ORDER BY created_date (+ keyset on id)
+            models.Index(
+                fields=["created_date", "id"],
+                condition=models.Q(is_deleted=False),
+                name="module_live_created_idx",
+            ),
+            # ?search= icontains (UPPER(col) LIKE '%x%'), see HSM_AI/helper/search.py
+            GinIndex(
+                OpClass(Upper("module_name"), name="gin_trgm_ops"), name="module_module_name_trgm"
+            ),
+            GinIndex(
+                OpClass(Upper("description"), name="gin_trgm_ops"), name="module_description_trgm"
+            ),
+        ]
+        constraints = [
+            # Case-insensitive uniqueness among live modules (replaces the iexact pre-checks)
+            models.UniqueConstraint(
+                Lower("module_name"),
+                condition=models.Q(is_deleted=False),
+                name="module_module_name_ci_uniq",
+            ),
+            models.UniqueConstraint(
+                Lower("path"),
+                condition=models.Q(is_deleted=False),
+                name="module_path_ci_uniq",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.module_name} ({self.status})"
 
@@ -67,7 +121,7 @@ class UserModulePermission(BaseModel):
     """
     User-specific permissions for each module
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -87,6 +141,26 @@ class UserModulePermission(BaseModel):
 
     class Meta:
         unique_together = ('user', 'module')
+        indexes = [
+            models.Index(
+                fields=["created_date", "id"],
+                condition=models.Q(is_deleted=False),
+                name="ump_live_created_idx",
+            ),
+            # MyPermissionsView / permission claims: per-user flags via index-only scan
+            models.Index(
+                fields=["user"],
+                include=[
+                    "module",
+                    "visible",
+                    "can_create",
+                    "can_read",
+                    "can_update",
+                    "can_delete",
+                ],
+                name="ump_user_flags_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user} → {self.module.module_name}"
@@ -0,0 +1,155 @@
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from HSM_AI.helper.cache_versions import get_versions, versions_are_shared
+from .models import UserModulePermission
+from .services import get_effective_permissions, is_overlay_mode
+
+# 5-bit mask per module: visible / create / read / update / delete
+PERM_VISIBLE = 1 << 0
+PERM_CREATE = 1 << 1
+PERM_READ = 1 << 2
+PERM_UPDATE = 1 << 3
+PERM_DELETE = 1 << 4
+
+PERM_BITS = (
+    ("visible", PERM_VISIBLE),
+    ("can_create", PERM_CREATE),
+    ("can_read", PERM_READ),
+    ("can_update", PERM_UPDATE),
+    ("can_delete", PERM_DELETE),
+)
+
+ACTION_BITS = {
+    "visible": PERM_VISIBLE,
+    "create": PERM_CREATE,
+    "read": PERM_READ,
+    "update": PERM_UPDATE,
+    "delete": PERM_DELETE,
+}
+
+METHOD_ACTIONS = {
+    "GET": "read",
+    "HEAD": "read",
+    "OPTIONS": "read",
+    "POST": "create",
+    "PUT": "update",
+    "PATCH": "update",
+    "DELETE": "delete",
+}
+
+
+def pack_permission_mask(perm):
+    """
+    Packs a permission row (model instance or dict with can_* keys) into a 5-bit int.
+    """
+    get = perm.get if isinstance(perm, dict) else lambda name: getattr(perm, name)
+    mask = 0
+    for field, bit in PERM_BITS:
+        if get(field):
+            mask |= bit
+    return mask
+
+
+def get_permission_version(user):
+    """
+    Returns the `perm_ver` of a user: "<user permission ver>.<role ver>.<module ver>".
+    Changes whenever the user's rows, their role or any module are written,
+    and never repeats: evicted counters are re-seeded above their old value.
+    """
+    user_version, role_version, module_version = get_versions(
+        ("perms", user.pk), ("role", user.role_id), ("modules", None)
+    )
+    return f"{user_version}.{role_version}.{module_version}"
+
+
+def build_permission_claims(user):
+    """
+    Returns the compact claims for a user: {"perms": {module_path: mask}, "perm_ver": ...}.
+    Only active, non-deleted modules with at least one bit set are included.
+    Modules are keyed by path, the identifier `HasModulePermission` checks against.
+    """
+    # Version first so a concurrent write can't be masked by the claim snapshot
+    perm_ver = get_permission_version(user)
+
+    perms = {}
+    for perm in get_effective_permissions(user, active_only=True):
+        mask = pack_permission_mask(perm)
+        if mask:
+            perms[perm.module.path] = mask
+
+    return {"perms": perms, "perm_ver": perm_ver}
+
+
+def get_tokens_for_user(user):
+    """
+    Issues a refresh token (and its access token) for the user. When
+    `PERMISSION_CLAIMS_IN_TOKEN` is on, permission claims are embedded and
+    copied into the access token by simplejwt.
+    """
+    refresh = RefreshToken.for_user(user)
+    if settings.PERMISSION_CLAIMS_IN_TOKEN:
+        for claim, value in build_permission_claims(user).items():
+            refresh[claim] = value
+    return refresh
+
+
+class HasModulePermission(BasePermission):
+    """
+    Authorizes a request against the module named by `view.permission_module_path`.
+
+    The action comes from `view.permission_action` or the HTTP method
+    (GET → read, POST → create, PUT/PATCH → update, DELETE → delete).
+    Token claims are used when their `perm_ver` is current (no DB access) and
+    the version counters are shared by every process; otherwise the user's
+    `UserModulePermission` row is checked.
+    """
+
+    message = "You do not have permission to perform this action."
+
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+
+        module_path = getattr(view, "permission_module_path", None)
+        if not module_path:
+            return True
+
+        action = getattr(view, "permission_action", None) or METHOD_ACTIONS.get(
+            request.method
+        )
+        bit = ACTION_BITS.get(action)
+        if bit is None:
+            return False
+
+        claims = request.auth
+        perms = claims.get("perms") if claims is not None else None
+        if (
+            perms is not None
+            # a process-local counter may never see the bump of a revocation
+            and versions_are_shared()
+            and claims.get("perm_ver") == get_permission_version(request.user)
+        ):
+            return bool(perms.get(module_path, 0) & bit)
+
+        return self.has_db_permission(request.user, module_path, bit)
+
+    def has_db_permission(self, user, module_path, bit):
+        if is_overlay_mode():
+            return any(
+                perm.module.path == module_path and pack_permission_mask(perm) & bit
+                for perm in get_effective_permissions(user, active_only=True)
+            )
+
+        perm = (
+            UserModulePermission.objects.filter(
+                user_id=user.pk,
+                module__path=module_path,
+                module__status="active",
+                module__is_deleted=False,
+            )
+            .only(*(field for field, _ in PERM_BITS))
+            .first()
+        )
+        return perm is not None and bool(pack_permission_mask(perm) & bit)
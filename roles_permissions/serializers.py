@@ -1,16 +1,33 @@
+import re
+
 from rest_framework import serializers
 from .models import Role, Module, UserModulePermission
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db import models
 from django.db.models import Q
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.fields import empty
+from HSM_AI.helper.loaders import get_loader
+from HSM_AI.helper.search import get_search_backend
+from .services import diff_role_permissions, is_overlay_mode
+from .tasks import schedule_role_permission_propagation
 
 class SearchableMixin:
     """
     Reusable mixin to add search functionality inside a serializer.
     Usage:
         - Define `search_fields` in Meta
-        - Call `apply_search(queryset, search_term)`
+        - Call `apply_search(queryset, search_term, rank=False)`
     """
     @classmethod
-    def apply_search(cls, queryset, search_term):
+    def apply_search(cls, queryset, search_term, rank=False):
+        """
+        Filters `queryset` by `search_term` over `Meta.search_fields` using the
+        backend for the queryset's database (pg_trgm on Postgres, FTS5 on
+        SQLite, plain icontains otherwise). `rank` orders by relevance where
+        the backend supports it.
+        """
         if not search_term:
             return queryset
 
@@ -18,12 +35,173 @@ class SearchableMixin:
         if not search_fields:
             return queryset
 
-        query = Q()
-        for field in search_fields:
-            # ✅ ensures icontains runs even if field is nullable
-            query |= Q(**{f"{field}__icontains": search_term})
+        backend = get_search_backend(queryset)
+        return backend.search(queryset, search_fields, search_term, rank=rank)
+
+class UniqueConstraintErrorMixin:
+    """
+    Lets the database enforce uniqueness instead of pre-check queries.
+    Usage:
+        - Define `unique_constraint_fields = {constraint name: field}` and
+          `unique_error_messages = {field: message}` in Meta
+        - Call `try_save(**kwargs)` instead of `save()`; a violation of one of
+          those constraints returns False with the message in `errors`
+    """
+    def try_save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                self.save(**kwargs)
+            return True
+        except IntegrityError as e:
+            field = self.get_unique_violation_field(e)
+            if field is None:
+                raise
+            message = self.Meta.unique_error_messages[field]
+            self._errors = {field: [ErrorDetail(message, code="unique")]}
+            return False
+
+    @classmethod
+    def get_unique_violation_field(cls, exc):
+        """
+        Returns the field of the violated constraint listed in
+        `Meta.unique_constraint_fields`, else None.
+        """
+        # Postgres reports the constraint name; SQLite only in the message
+        # ("UNIQUE constraint failed: index 'users_email_ci_uniq'")
+        diag = getattr(exc.__cause__, "diag", None)
+        name = getattr(diag, "constraint_name", None)
+        if name is None:
+            match = re.search(r"index '(\w+)'", str(exc))
+            name = match.group(1) if match else None
+        return getattr(cls.Meta, "unique_constraint_fields", {}).get(name)
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for read requests.
+    Usage:
+        - `?fields=id,role_name` keeps only those fields, `?exclude=...` drops them
+          (GET/HEAD only; writes always validate and return the full serializer)
+        - Call `project_queryset(queryset, request)` on list querysets so only
+          the columns (and relations) behind the kept fields are fetched
+    """
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep, drop = self.get_requested_fields(self.context.get("request"))
+        for name in list(self.fields):
+            if (keep is not None and name not in keep) or name in drop:
+                self.fields.pop(name)
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        """
+        Returns (fields to keep or None for all, fields to drop) from the request.
+        """
+        if request is None or request.method not in ("GET", "HEAD"):
+            return None, set()
+
+        def parse(param):
+            value = request.query_params.get(param)
+            if value is None:
+                return None
+            return {name.strip() for name in value.split(",") if name.strip()}
+
+        return parse(cls.fields_query_param), parse(cls.exclude_query_param) or set()
+
+    @classmethod
+    def project_queryset(cls, queryset, request):
+        """
+        Applies `.only()` / `select_related()` for the fields this request will
+        serialize. Ordering columns are kept loaded (keyset cursors read them).
+        Fields computed from the whole object (source "*") disable projection.
+        """
+        serializer = cls(context={"request": request})
+        model = queryset.model
+        only, related = {model._meta.pk.name}, set()
+
+        for field in serializer._readable_fields:
+            if field.source == "*":
+                return queryset
+            path = field.source.split(".")
+            try:
+                model_field = model._meta.get_field(path[0])
+            except FieldDoesNotExist:
+                return queryset  # property / method, can't tell what it reads
+            if len(path) > 1 and model_field.is_relation:
+                # role.role_name -> JOIN role, load only role_name from it
+                related.add(path[0])
+                only.update((path[0], "__".join(path)))
+            else:
+                only.add(model_field.name)
+
+        for order in queryset.query.order_by:
+            name = order.lstrip("-")
+            if "__" not in name:
+                try:
+                    only.add(model._meta.get_field(name).name)
+                except FieldDoesNotExist:
+                    pass  # annotation (e.g. search_rank)
+
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*only)
+
+class BatchRelatedField(serializers.Field):
+    """
+    Read-only field serializing `attr` of the object behind foreign key
+    `relation`, resolved through the request's `BatchLoader` instead of one
+    lazy fetch per row. Objects already loaded on the instance (select_related,
+    cached principal) are reused without a query.
+    """
+
+    def __init__(self, relation, attr=None, **kwargs):
+        self.relation = relation
+        self.attr = attr
+        kwargs["read_only"] = True
+        kwargs.setdefault("source", f"{relation}_id")
+        super().__init__(**kwargs)
+
+    def get_loader(self, model):
+        related_model = model._meta.get_field(self.relation).related_model
+        return get_loader(self.context.get("request"), related_model)
+
+    def get_attribute(self, instance):
+        key = super().get_attribute(instance)
+        if key is None:
+            return None
+        loader = self.get_loader(type(instance))
+        cached = instance._state.fields_cache.get(self.relation)
+        if cached is not None:
+            loader.add(key, cached)
+            return cached
+        return loader.load(key)
+
+    def to_representation(self, value):
+        return getattr(value, self.attr) if self.attr else str(value.pk)
+
+
+class BatchLoadingListSerializer(serializers.ListSerializer):
+    """
+    Primes the child's `BatchRelatedField` loaders with every key of the page
+    first, so each related model costs one `IN (...)` query for the whole list.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        for field in self.child._readable_fields:
+            if isinstance(field, BatchRelatedField) and items:
+                loader = field.get_loader(type(items[0]))
+                for item in items:
+                    cached = item._state.fields_cache.get(field.relation)
+                    key = getattr(item, field.source)
+                    if cached is not None:
+                        loader.add(key, cached)
+                    else:
+                        loader.prime([key])
+        return super().to_representation(items)
 
-        return queryset.filter(query)
 
 class ModulePermissionSerializer(serializers.Serializer):
     module_id = serializers.UUIDField()
@@ -33,14 +211,46 @@ class ModulePermissionSerializer(serializers.Serializer):
     can_update = serializers.BooleanField(default=False)
     can_delete = serializers.BooleanField(default=False)
 
-class RoleSerializer(SearchableMixin, serializers.ModelSerializer):
+
+def _compile_module_permissions_reader():
+    # ModulePermissionSerializer(many=True) + RoleSerializer's str(module_id)
+    fields = [
+        (name, field.default, field.to_representation)
+        for name, field in ModulePermissionSerializer().fields.items()
+    ]
+
+    def read_perm(perm):
+        data = {}
+        for name, default, convert in fields:
+            value = perm[name] if default is empty or name in perm else default
+            data[name] = None if value is None else convert(value)
+        data["module_id"] = str(data["module_id"])
+        return data
+
+    def read(row):
+        return [read_perm(perm) for perm in row["module_permissions"] or []]
+
+    return read
+
+
+class RoleSerializer(
+    DynamicFieldsMixin, SearchableMixin, UniqueConstraintErrorMixin, serializers.ModelSerializer
+):
     module_permissions = ModulePermissionSerializer(many=True)
 
     class Meta:
         model = Role
         fields = ["id", "role_name", "module_permissions","created_date"]
         search_fields = ["role_name"]
+        # enforced by role_role_name_ci_uniq (lower(role_name), live rows)
+        extra_kwargs = {"role_name": {"validators": []}}
+        unique_constraint_fields = {"role_role_name_ci_uniq": "role_name"}
+        unique_error_messages = {"role_name": "Role name already exists."}
 
+    # read-only fast path for the role list (HSM_AI/helper/fast_serializers.py)
+    values_overrides = {
+        "module_permissions": (("module_permissions",), _compile_module_permissions_reader()),
+    }
 
     def create(self, validated_data):
         module_permissions = validated_data.pop("module_permissions", [])
@@ -50,6 +260,7 @@ class RoleSerializer(SearchableMixin, serializers.ModelSerializer):
         return Role.objects.create(module_permissions=module_permissions, **validated_data)
 
     def update(self, instance, validated_data):
+        old_permissions = instance.module_permissions
         instance.role_name = validated_data.get("role_name", instance.role_name)
         module_permissions = validated_data.get("module_permissions", instance.module_permissions)
         # ensure string UUIDs
@@ -57,8 +268,17 @@ class RoleSerializer(SearchableMixin, serializers.ModelSerializer):
             perm["module_id"] = str(perm.get("module_id"))
         instance.module_permissions = module_permissions
         instance.save()
+
+        # push only the deltas to users already holding this role (Celery)
+        # (overlay mode reads the role directly, nothing to propagate)
+        diff = diff_role_permissions(old_permissions, module_permissions)
+        if not is_overlay_mode() and any(diff.values()):
+            transaction.on_commit(lambda: self._schedule_propagation(instance.pk, diff))
         return instance
 
+    def _schedule_propagation(self, role_id, diff):
+        self.propagation_task_id = schedule_role_permission_propagation(role_id, diff)
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
         # extra safety: ensure module_id always comes out as string
@@ -77,20 +297,26 @@ class RoleSerializer(SearchableMixin, serializers.ModelSerializer):
 #             raise serializers.ValidationError("Role name already exists.")
 #         return value
 
-class ModuleSerializer(SearchableMixin, serializers.ModelSerializer):
+class ModuleSerializer(
+    DynamicFieldsMixin, SearchableMixin, UniqueConstraintErrorMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Module
         fields = ["id", "module_name", "path", "description", "status"]
         search_fields = ["module_name", "description"]
-
-    def validate_module_name(self, value):
-        module_id = self.instance.id if self.instance else None
-        qs = Module.objects.filter(module_name__iexact=value, is_deleted=False)
-        if module_id:
-            qs = qs.exclude(id=module_id)
-        if qs.exists():
-            raise serializers.ValidationError("Module name already exists.")
-        return value
+        # enforced by module_module_name_ci_uniq / module_path_ci_uniq
+        extra_kwargs = {
+            "module_name": {"validators": []},
+            "path": {"validators": []},
+        }
+        unique_constraint_fields = {
+            "module_module_name_ci_uniq": "module_name",
+            "module_path_ci_uniq": "path",
+        }
+        unique_error_messages = {
+            "module_name": "Module name already exists.",
+            "path": "Path already exists.",
+        }
 
     # def validate_path(self, value):
     #     module_id = self.instance.id if self.instance else None
@@ -104,16 +330,30 @@ class ModuleSerializer(SearchableMixin, serializers.ModelSerializer):
         # ✅ ensure path always starts with "/"
         if not value.startswith("/"):
             value = f"/{value}"
-
-        module_id = self.instance.id if self.instance else None
-        qs = Module.objects.filter(path__iexact=value, is_deleted=False)
-        if module_id:
-            qs = qs.exclude(id=module_id)
-        if qs.exists():
-            raise serializers.ValidationError("Path already exists.")
         return value
 
-class UserModulePermissionSerializer(serializers.ModelSerializer):
+class PermissionFlagsSerializer(serializers.Serializer):
+    create = serializers.BooleanField(required=False)
+    read = serializers.BooleanField(required=False)
+    update = serializers.BooleanField(required=False)
+    delete = serializers.BooleanField(required=False)
+
+
+class UserModulePermissionUpdateSerializer(serializers.Serializer):
+    """
+    One entry of the UserPermissionsAdminView.put payload. Omitted flags are left
+    unchanged, so nothing here has a default.
+    """
+    module_id = serializers.UUIDField()
+    visible = serializers.BooleanField(required=False)
+    permissions = PermissionFlagsSerializer(required=False)
+
+
+class UserPermissionsUpdateSerializer(serializers.Serializer):
+    permissions = UserModulePermissionUpdateSerializer(many=True, required=False)
+
+
+class UserModulePermissionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     userId = serializers.UUIDField(source="user_id", write_only=True)
     permissions = serializers.SerializerMethodField()
     module_id = serializers.UUIDField(source="module.id", read_only=True)
@@ -137,6 +377,19 @@ class UserModulePermissionSerializer(serializers.ModelSerializer):
             "delete": obj.can_delete
         }
 
+    # read-only fast path (HSM_AI/helper/fast_serializers.py), same output as get_permissions
+    values_overrides = {
+        "permissions": (
+            ("can_create", "can_read", "can_update", "can_delete"),
+            lambda row: {
+                "create": row["can_create"],
+                "read": row["can_read"],
+                "update": row["can_update"],
+                "delete": row["can_delete"],
+            },
+        ),
+    }
+
     def create(self, validated_data):
         user_id = validated_data.pop("user_id")
         module_id = self.context['request'].data.get("module_id")
@@ -0,0 +1,323 @@
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from HSM_AI.helper.cache_versions import bump_version
+from .models import Module, UserModulePermission
+
+PERMISSION_FIELDS = ("visible", "can_create", "can_read", "can_update", "can_delete")
+
+# PERMISSION_MODE values
+MATERIALIZED = "materialized"  # every role permission copied into UserModulePermission
+OVERLAY = "overlay"  # Role.module_permissions is the base, rows are per-user overrides
+
+
+def is_overlay_mode():
+    return settings.PERMISSION_MODE == OVERLAY
+
+
+def build_role_permission_rows(user, role):
+    """
+    Returns unsaved `UserModulePermission` rows for `user` copied from `role.module_permissions`.
+    """
+    rows = []
+    for perm in role.module_permissions or []:
+        module_id = perm.get("module_id")
+        if not module_id:
+            continue
+
+        rows.append(
+            UserModulePermission(
+                user=user,
+                module_id=module_id,
+                **{field: perm.get(field, False) for field in PERMISSION_FIELDS},
+            )
+        )
+    return rows
+
+
+def materialize_role_permissions(users, role=None, replace=False):
+    """
+    Copies role permissions into `UserModulePermission` for one or more users
+    with a single bulk INSERT (plus one DELETE when `replace` is set).
+
+    Args:
+    - users (Users | iterable of Users): Users to materialize permissions for.
+    - role (Role, optional): Role to copy from. Defaults to each user's own role.
+    - replace (bool): Drop the users' existing rows first (e.g. restoring a
+      soft-deleted user). Otherwise rows that already exist are left untouched.
+
+    In overlay mode nothing is copied (the role is read directly); `replace`
+    still drops the users' overrides.
+    """
+    users = [users] if isinstance(users, models.Model) else list(users)
+
+    rows = []
+    if not is_overlay_mode():
+        for user in users:
+            rows.extend(build_role_permission_rows(user, role or user.role))
+
+    with transaction.atomic():
+        if replace:
+            UserModulePermission.objects.filter(user__in=users).delete()
+        if rows:
+            UserModulePermission.objects.bulk_create(rows, ignore_conflicts=True)
+
+    # bulk_create skips post_save, so invalidate permission versions here
+    # (applied when the caller's transaction commits)
+    for user in users:
+        bump_version("perms", user.pk)
+
+    return rows
+
+
+def get_role_defaults(role):
+    """
+    Returns {module_id: perm dict} from `role.module_permissions`.
+    """
+    if role is None:
+        return {}
+    return {
+        str(perm["module_id"]): perm
+        for perm in role.module_permissions or []
+        if perm.get("module_id")
+    }
+
+
+def get_effective_permissions(user, active_only=False):
+    """
+    Returns the effective `UserModulePermission` list (module loaded) of a
+    user (`Users` instance or id).
+
+    Materialized mode: the user's rows as stored.
+    Overlay mode: the role's module_permissions merged in memory with the
+    user's override rows (override wins). Role-derived entries are unsaved
+    instances with `id=None`.
+
+    Args:
+    - active_only (bool): Only include active, non-deleted modules.
+    """
+    if not isinstance(user, models.Model) and is_overlay_mode():
+        from authentication.models import Users
+
+        user = Users.objects.select_related("role").filter(pk=user).first()
+        if user is None:
+            return []
+
+    user_id = user.pk if isinstance(user, models.Model) else user
+    return get_effective_permissions_bulk([user], active_only)[user_id]
+
+
+def get_effective_permissions_bulk(users, active_only=False):
+    """
+    `get_effective_permissions` for many users with a fixed number of queries
+    (one for the overrides, plus one for role-granted modules in overlay mode).
+    `users` are ids in materialized mode; overlay mode needs `Users` instances
+    with their role loaded.
+
+    Returns:
+    - dict: {user_id: [UserModulePermission, ...]} keyed by the ids as given
+    """
+    user_ids = [user.pk if isinstance(user, models.Model) else user for user in users]
+    overrides = UserModulePermission.objects.filter(
+        user_id__in=user_ids
+    ).select_related("module")
+    if active_only:
+        overrides = overrides.filter(module__status="active", module__is_deleted=False)
+
+    # ids may arrive as UUIDs or strings; group on the string form
+    by_user = {str(user_id): {} for user_id in user_ids}
+    for perm in overrides:
+        by_user[str(perm.user_id)][str(perm.module_id)] = perm
+
+    if not is_overlay_mode():
+        return {
+            user_id: list(by_user[str(user_id)].values()) for user_id in user_ids
+        }
+
+    role_defaults = {
+        user.pk: get_role_defaults(user.role if user.role_id else None) for user in users
+    }
+    missing = set()
+    for user_id, defaults in role_defaults.items():
+        missing |= defaults.keys() - by_user[str(user_id)].keys()
+    modules = (
+        {str(pk): module for pk, module in Module.objects.in_bulk(missing).items()}
+        if missing
+        else {}
+    )
+
+    merged = {}
+    for user_id, defaults in role_defaults.items():
+        by_module = dict(by_user[str(user_id)])
+        perms = []
+        for module_id, perm in defaults.items():
+            if module_id in by_module:
+                perms.append(by_module.pop(module_id))
+                continue
+
+            module = modules.get(module_id)
+            if module is None:
+                continue
+            if active_only and (module.status != "active" or module.is_deleted):
+                continue
+
+            perms.append(
+                UserModulePermission(
+                    id=None,
+                    user_id=user_id,
+                    module=module,
+                    **{field: perm.get(field, False) for field in PERMISSION_FIELDS},
+                )
+            )
+
+        # overrides for modules the role doesn't grant
+        perms.extend(by_module.values())
+        merged[user_id] = perms
+    return merged
+
+
+def compact_permission_overrides(role=None, dry_run=False):
+    """
+    Deletes `UserModulePermission` rows identical to their user's role default,
+    one DELETE per (role, distinct permission values). Used when switching to
+    overlay mode.
+
+    Returns:
+    - int: Number of rows deleted (or that would be, with `dry_run`).
+    """
+    from .models import Role
+
+    roles = [role] if role is not None else Role.objects.filter(is_deleted=False)
+    total = 0
+    for role in roles:
+        groups = {}
+        for module_id, perm in get_role_defaults(role).items():
+            groups.setdefault(_permission_values(perm), []).append(module_id)
+
+        for values, module_ids in groups.items():
+            rows = UserModulePermission.objects.filter(
+                user__role=role,
+                module_id__in=module_ids,
+                **dict(zip(PERMISSION_FIELDS, values)),
+            )
+            if dry_run:
+                total += rows.count()
+            else:
+                # post_delete bumps each affected user's permission version
+                deleted, _ = rows.delete()
+                total += deleted
+    return total
+
+
+def _permission_values(perm):
+    return tuple(bool(perm.get(field, False)) for field in PERMISSION_FIELDS)
+
+
+def diff_role_permissions(old_permissions, new_permissions):
+    """
+    Compares two `Role.module_permissions` JSON lists.
+
+    Returns:
+    - dict: {"added": {module_id: values}, "removed": {module_id: values},
+      "changed": {module_id: (old_values, new_values)}} where values are tuples
+      ordered like `PERMISSION_FIELDS`.
+    """
+    old = {
+        str(perm["module_id"]): _permission_values(perm)
+        for perm in old_permissions or []
+        if perm.get("module_id")
+    }
+    new = {
+        str(perm["module_id"]): _permission_values(perm)
+        for perm in new_permissions or []
+        if perm.get("module_id")
+    }
+    return {
+        "added": {m: new[m] for m in new.keys() - old.keys()},
+        "removed": {m: old[m] for m in old.keys() - new.keys()},
+        "changed": {
+            m: (old[m], new[m]) for m in old.keys() & new.keys() if old[m] != new[m]
+        },
+    }
+
+
+def apply_role_permission_diff(
+    role_id, diff, preserve_overrides=True, batch_size=500, progress=None
+):
+    """
+    Applies a `diff_role_permissions` result to every non-deleted user of a role,
+    `batch_size` users at a time, using set-based DELETE / INSERT / UPDATE.
+
+    With `preserve_overrides`, rows a user was individually edited away from
+    the old role default are left alone (only rows still equal to the old
+    default are updated or removed).
+
+    Args:
+    - progress (callable, optional): Called as progress(done, total) after each batch.
+
+    Returns:
+    - int: Number of users processed.
+    """
+    from authentication.models import Users
+
+    user_ids = list(
+        Users.objects.filter(role_id=role_id, is_deleted=False)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    total = len(user_ids)
+
+    # Group changed modules by (old, new) values so each group is one UPDATE
+    changed_groups = {}
+    # (values may arrive as JSON lists from the task queue)
+    for module_id, (old_values, new_values) in diff["changed"].items():
+        old_values, new_values = tuple(old_values), tuple(new_values)
+        key = (old_values, new_values) if preserve_overrides else (None, new_values)
+        changed_groups.setdefault(key, []).append(module_id)
+
+    removed_groups = {}
+    for module_id, old_values in diff["removed"].items():
+        key = tuple(old_values) if preserve_overrides else None
+        removed_groups.setdefault(key, []).append(module_id)
+
+    for start in range(0, total, batch_size):
+        batch = user_ids[start:start + batch_size]
+        batch_rows = UserModulePermission.objects.filter(user_id__in=batch)
+
+        with transaction.atomic():
+            for old_values, module_ids in removed_groups.items():
+                rows = batch_rows.filter(module_id__in=module_ids)
+                if old_values is not None:
+                    rows = rows.filter(**dict(zip(PERMISSION_FIELDS, old_values)))
+                rows.delete()
+
+            if diff["added"]:
+                UserModulePermission.objects.bulk_create(
+                    [
+                        UserModulePermission(
+                            user_id=user_id,
+                            module_id=module_id,
+                            **dict(zip(PERMISSION_FIELDS, values)),
+                        )
+                        for user_id in batch
+                        for module_id, values in diff["added"].items()
+                    ],
+                    ignore_conflicts=True,
+                )
+
+            now = timezone.now()
+            for (old_values, new_values), module_ids in changed_groups.items():
+                rows = batch_rows.filter(module_id__in=module_ids)
+                if old_values is not None:
+                    rows = rows.filter(**dict(zip(PERMISSION_FIELDS, old_values)))
+                rows.update(modified_date=now, **dict(zip(PERMISSION_FIELDS, new_values)))
+
+        # Set-based writes skip post_save, so invalidate permission versions here
+        for user_id in batch:
+            bump_version("perms", user_id)
+
+        if progress:
+            progress(min(start + batch_size, total), total)
+
+    return total
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from HSM_AI.helper.cache_versions import bump_version
+from .models import Module, Role, UserModulePermission
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_principals(sender, instance, **kwargs):
+    """
+    Role rename / soft delete invalidates the cached principal of every user
+    holding the role (their snapshots embed the role version).
+    """
+    bump_version("role", instance.pk)
+    # table-wide version for responses embedding any role (user lists, ETags)
+    bump_version("roles")
+
+
+@receiver(post_save, sender=UserModulePermission)
+@receiver(post_delete, sender=UserModulePermission)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    """
+    Makes `perm_ver` claims issued before this write stale for the row's user.
+    Bulk writes (bulk_create/bulk_update/update) don't send signals and must
+    call `bump_version("perms", user_id)` themselves.
+    """
+    bump_version("perms", instance.user_id)
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def invalidate_modules(sender, instance, **kwargs):
+    """
+    A module rename/path change/deactivation affects every user's permissions.
+    """
+    bump_version("modules")
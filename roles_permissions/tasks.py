@@ -0,0 +1,65 @@
+import logging
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+
+from .services import apply_role_permission_diff
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True)
+def propagate_role_permissions(self, role_id, diff, preserve_overrides=True):
+    """
+    Applies a role's module_permissions diff to all of its users off the request path.
+    Progress is reported as state "PROGRESS" with meta {"done", "total"}.
+    """
+
+    def progress(done, total):
+        # eager runs (.apply) have no result backend to report to
+        if not self.request.is_eager:
+            self.update_state(state="PROGRESS", meta={"done": done, "total": total})
+
+    total = apply_role_permission_diff(
+        role_id, diff, preserve_overrides=preserve_overrides, progress=progress
+    )
+    return {"done": total, "total": total}
+
+
+def propagation_task_key(role_id, task_id):
+    return f"role_propagation:{role_id}:{task_id}"
+
+
+def is_role_propagation_task(role_id, task_id):
+    """True if `task_id` was queued by `schedule_role_permission_propagation` for this role."""
+    return bool(cache.get(propagation_task_key(role_id, task_id)))
+
+
+def schedule_role_permission_propagation(role_id, diff):
+    """
+    Queues `propagate_role_permissions` and returns the task id. If the broker
+    is unreachable the diff is applied inline so users never keep stale rows;
+    there is nothing to poll then, so None is returned. Errors from the inline
+    run propagate to the caller.
+
+    Publishing does not retry (see CELERY_BROKER_* timeouts in settings), so a
+    dead broker costs the request one connect timeout, not a retry loop.
+
+    The id is recorded against the role so RolePermissionPropagationView only
+    reports on tasks it issued.
+    """
+    preserve_overrides = settings.ROLE_PERMISSION_PRESERVE_OVERRIDES
+    try:
+        result = propagate_role_permissions.apply_async(
+            args=(str(role_id), diff, preserve_overrides), retry=False
+        )
+    except Exception as e:
+        logger.warning("Role permission propagation not queued (%s), running inline", e)
+        apply_role_permission_diff(role_id, diff, preserve_overrides=preserve_overrides)
+        return None
+    cache.set(
+        propagation_task_key(role_id, result.id),
+        True,
+        timeout=settings.ROLE_PROPAGATION_STATUS_TIMEOUT,
+    )
+    return result.id
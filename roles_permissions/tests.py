@@ -1,3 +1,616 @@
-from django.test import TestCase
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection, connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from HSM_AI.helper.cache_versions import get_version
+from HSM_AI.helper.pagination import CountingPaginator
+from HSM_AI.helper.query_budget import assert_max_queries, count_queries, get_query_budget
+from HSM_AI.helper.seed import seed_modules, seed_role, seed_roles, seed_users
+from HSM_AI.helper.single_flight import single_flight
+from authentication.serializers import UserSerializer
+from test_support import (
+    LOCMEM_CACHES,
+    FastListEquivalenceMixin,
+    QueryBudgetMixin,
+    QueryPlanMixin,
+    auth_header,
+)
+from .models import Module, Role, UserModulePermission
+from .serializers import ModuleSerializer
+from .services import PERMISSION_FIELDS, materialize_role_permissions
+from .tasks import propagation_task_key, schedule_role_permission_propagation
+from .views import (
+    ModuleDetailView,
+    ModuleListCreateView,
+    MyPermissionsView,
+    RoleDetailView,
+    RoleListCreateView,
+    RolePermissionPropagationView,
+    UserModulePermissionListView,
+    UserPermissionsAdminView,
+)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PERMISSION_MODE="materialized")
+class MaterializeRolePermissionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.modules = seed_modules(30, prefix="materialize")
+        cls.role = seed_role(cls.modules, role_name="Materialize role")
+        cls.small_role = seed_role(cls.modules[:2], role_name="Materialize small role")
+
+    def materialize_queries(self, count, prefix):
+        users = seed_users(self.role, count, prefix=prefix)
+        with count_queries() as stats:
+            materialize_role_permissions(users)
+        return stats.count
+
+    def test_statements_do_not_grow_with_users(self):
+        self.assertEqual(
+            self.materialize_queries(1, "one"), self.materialize_queries(25, "many")
+        )
+
+    def test_one_insert_for_all_rows(self):
+        users = seed_users(self.role, 10, prefix="insert")
+        # savepoint + INSERT + release
+        with assert_max_queries(3):
+            materialize_role_permissions(users)
+        self.assertEqual(
+            UserModulePermission.objects.filter(user__in=users).count(), 10 * 30
+        )
+
+    def test_user_create_cost_does_not_grow_with_modules(self):
+        def create_queries(role, email):
+            serializer = UserSerializer(
+                data={
+                    "email": email,
+                    "password": "Secret@123",
+                    "first_name": "Query",
+                    "last_name": "Count",
+                    "phone_number": "9999999999",
+                    "role": str(role.pk),
+                }
+            )
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            with count_queries() as stats:
+                serializer.save()
+            return stats.count
+
+        self.assertEqual(
+            create_queries(self.small_role, "small@example.com"),
+            create_queries(self.role, "large@example.com"),
+        )
+
+    def test_versions_bumped_on_commit(self):
+        [user] = seed_users(self.role, 1, prefix="commit")
+        before = get_version("perms", user.pk)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            materialize_role_permissions(user)
+        self.assertEqual(get_version("perms", user.pk), before)
+
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_version("perms", user.pk), before)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PAGINATION_ESTIMATE_THRESHOLD=0)
+class EstimatedCountPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_modules(25, prefix="paginate")
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self, filtered=False):
+        queryset = Module.objects.filter(is_deleted=False).order_by("created_date", "id")
+        return CountingPaginator(queryset, 10, count_strategy="estimated", filtered=filtered)
+
+    def test_pages_are_not_validated_against_the_estimate(self):
+        live = Module.objects.filter(is_deleted=False).count()
+        with patch("HSM_AI.helper.pagination.estimate_live_rows", return_value=1):
+            paginator = self.paginator()
+            last = (live - 1) // 10 + 1
+            page = paginator.page(last)
+            self.assertEqual(len(page), live - (last - 1) * 10)
+            self.assertFalse(page.has_next())
+            with self.assertRaises(EmptyPage):
+                paginator.page(last + 1)
+            # the estimate is only reported
+            self.assertEqual(paginator.count, 1)
+            self.assertFalse(paginator.count_is_exact)
+
+    def test_page_fetch_runs_no_count(self):
+        with assert_max_queries(1) as stats:
+            self.paginator().page(2)
+        self.assertNotIn("COUNT(", stats.queries[0].upper())
+
+    def test_filtered_count_is_exact_then_cached(self):
+        live = Module.objects.filter(is_deleted=False).count()
+        first = self.paginator(filtered=True)
+        self.assertEqual(first.count, live)
+        self.assertTrue(first.count_is_exact)
+        second = self.paginator(filtered=True)
+        with self.assertNumQueries(0):
+            self.assertEqual(second.count, live)
+        self.assertFalse(second.count_is_exact)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PERMISSION_MODE="materialized")
+class ListSerializationTests(FastListEquivalenceMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.modules = seed_modules(12, prefix="fastlist")
+        Module.objects.filter(pk=cls.modules[0].pk).update(description=None, status="inactive")
+        cls.role = seed_role(cls.modules, role_name="Fast list role")
+        # stored permissions may lack flags: both paths apply the serializer defaults
+        Role.objects.create(
+            role_name="Fast list partial role",
+            module_permissions=[{"module_id": str(cls.modules[1].pk), "visible": True}],
+        )
+        seed_roles(12, prefix="fastlist")
+        [cls.user] = seed_users(cls.role, 1, prefix="fastlist")
+        materialize_role_permissions(cls.user)
+
+    def setUp(self):
+        self.auth = auth_header(self.user)
+
+    def assertListsMatch(self, url, cases, unordered=False):
+        for params, fields in cases:
+            with self.subTest(url=url, params=params):
+                # one page holds every row, including the bootstrap modules
+                body = self.assertSameListOutput(
+                    url, {"limit": 100, **params}, unordered, **self.auth
+                )
+                rows = body["data"]["list"] if isinstance(body["data"], dict) else body["data"]
+                self.assertTrue(rows)
+                if fields:
+                    self.assertEqual(set(rows[0]), fields)
+
+    def test_role_list(self):
+        self.assertListsMatch(
+            reverse("role-list-create"),
+            [
+                ({}, None),
+                ({"fields": "id,module_permissions"}, {"id", "module_permissions"}),
+                ({"exclude": "created_date"}, None),
+            ],
+        )
+
+    def test_module_list(self):
+        self.assertListsMatch(
+            reverse("module-list-create"),
+            [
+                ({}, None),
+                ({"fields": "id,module_name,status"}, {"id", "module_name", "status"}),
+                ({"status": "inactive"}, None),
+            ],
+        )
+
+    def test_user_module_permission_list(self):
+        self.assertListsMatch(
+            reverse("user-permissions", args=[self.user.pk]),
+            [
+                ({}, None),
+                ({"fields": "module_id,permissions"}, {"module_id", "permissions"}),
+            ],
+            unordered=True,
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are Postgres-specific")
+class IndexUsageTests(QueryPlanMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.modules = seed_modules(50, prefix="explain")
+        cls.role = seed_role(cls.modules, role_name="Explain role")
+        cls.users = seed_users(cls.role, 20, prefix="explain")
+        materialize_role_permissions(cls.users)
+
+    def test_role_list_page(self):
+        self.assertUsesIndex(
+            Role.objects.filter(is_deleted=False).order_by("created_date", "id")[:10],
+            "role_live_created_idx",
+        )
+
+    def test_module_list_page(self):
+        self.assertUsesIndex(
+            Module.objects.filter(is_deleted=False).order_by("created_date", "id")[:10],
+            "module_live_created_idx",
+        )
+
+    def test_module_search(self):
+        queryset = ModuleSerializer.apply_search(
+            Module.objects.filter(is_deleted=False), "module 4"
+        )
+        self.assertUsesIndex(queryset, "module_module_name_trgm", ["roles_permissions_module"])
+
+    def test_user_permission_flags_use_covering_index(self):
+        # per-user flags come from ump_user_flags_idx alone (INCLUDE columns)
+        self.assertIndexOnlyScan(
+            UserModulePermission.objects.filter(user_id=self.users[0].pk).values(
+                "module_id", *PERMISSION_FIELDS
+            ),
+            "ump_user_flags_idx",
+            ["roles_permissions_usermodulepermission"],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PERMISSION_MODE="materialized")
+class RolePermissionEndpointQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Every roles_permissions URL at 10 and 1000 rows (see QueryBudgetMixin),
+    within the view's `query_budget`. Atomic blocks cost a SAVEPOINT and a
+    RELEASE since the test runs in a transaction.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="budget"), role_name="Budget role")
+        [cls.user] = seed_users(cls.role, 1, prefix="budget")
+
+    def setUp(self):
+        self.auth = auth_header(self.user)
+
+    def send_json(self, method, url, data, **extra):
+        return method(url, data, content_type="application/json", **extra)
+
+    def role_with_modules(self, size):
+        return seed_role(
+            seed_modules(size, prefix=f"budget-{size}"), role_name=f"Budget role {size}"
+        )
+
+    def user_with_modules(self, size):
+        [user] = seed_users(self.role_with_modules(size), 1, prefix=f"budget-{size}")
+        materialize_role_permissions(user)
+        return user
+
+    def last_seeded_module(self, size):
+        return seed_modules(size, prefix=f"budget-{size}")[-1]
+
+    @staticmethod
+    def granted(modules_or_ids, **flags):
+        return [
+            {"module_id": str(getattr(module, "pk", module)), "visible": True, **flags}
+            for module in modules_or_ids
+        ]
+
+    def test_role_list(self):
+        self.assertQueryBudget(
+            get_query_budget(RoleListCreateView, "GET"),
+            lambda size: seed_roles(size, prefix=f"budget-{size}"),
+            lambda _: self.client.get(reverse("role-list-create"), **self.auth),
+        )
+
+    def test_role_create(self):
+        self.assertQueryBudget(
+            get_query_budget(RoleListCreateView, "POST"),
+            lambda size: seed_modules(size, prefix=f"budget-{size}"),
+            lambda modules: self.send_json(
+                self.client.post,
+                reverse("role-list-create"),
+                {
+                    "role_name": f"New role {len(modules)}",
+                    "module_permissions": self.granted(modules, can_read=True),
+                },
+                **self.auth,
+            ),
+        )
+
+    def test_role_retrieve(self):
+        self.assertQueryBudget(
+            get_query_budget(RoleDetailView, "GET"),
+            self.role_with_modules,
+            lambda role: self.client.get(reverse("role-detail", args=[role.pk])),
+        )
+
+    def test_role_update(self):
+        def update(method, role):
+            module_ids = [perm["module_id"] for perm in role.module_permissions]
+            return self.send_json(
+                method,
+                reverse("role-detail", args=[role.pk]),
+                {
+                    "role_name": f"{role.role_name} edited",
+                    "module_permissions": self.granted(module_ids, can_update=True),
+                },
+            )
+
+        for method in (self.client.put, self.client.patch):
+            with self.subTest(method=method.__name__):
+                self.assertQueryBudget(
+                    get_query_budget(RoleDetailView, method.__name__.upper()),
+                    self.role_with_modules,
+                    lambda role: update(method, role),
+                )
+
+    def test_role_delete(self):
+        self.assertQueryBudget(
+            get_query_budget(RoleDetailView, "DELETE"),
+            self.role_with_modules,
+            lambda role: self.client.delete(reverse("role-detail", args=[role.pk])),
+        )
+
+    def test_role_propagation_status(self):
+        def status(_):
+            # issued by the role update (the budget run starts with a cold cache)
+            cache.set(propagation_task_key(self.role.pk, "task-id"), True)
+            with patch("roles_permissions.views.AsyncResult") as result:
+                result.return_value.state = "PROGRESS"
+                result.return_value.info = {"done": 1, "total": 2}
+                return self.client.get(
+                    reverse("role-permission-propagation", args=[self.role.pk, "task-id"]),
+                    **self.auth,
+                )
+
+        self.assertQueryBudget(
+            get_query_budget(RolePermissionPropagationView, "GET"),
+            lambda size: seed_users(self.role, size, prefix=f"budget-{size}"),
+            status,
+        )
+
+    def test_module_list(self):
+        self.assertQueryBudget(
+            get_query_budget(ModuleListCreateView, "GET"),
+            lambda size: seed_modules(size, prefix=f"budget-{size}"),
+            lambda _: self.client.get(reverse("module-list-create"), **self.auth),
+        )
+
+    def test_module_create(self):
+        self.assertQueryBudget(
+            get_query_budget(ModuleListCreateView, "POST"),
+            lambda size: seed_modules(size, prefix=f"budget-{size}")[-1],
+            lambda module: self.send_json(
+                self.client.post,
+                reverse("module-list-create"),
+                {"module_name": f"{module.module_name} new", "path": f"{module.path}-new"},
+                **self.auth,
+            ),
+        )
+
+    def test_module_retrieve(self):
+        self.assertQueryBudget(
+            get_query_budget(ModuleDetailView, "GET"),
+            self.last_seeded_module,
+            lambda module: self.client.get(
+                reverse("module-detail", args=[module.pk]), **self.auth
+            ),
+        )
+
+    def test_module_update(self):
+        for method in (self.client.put, self.client.patch):
+            with self.subTest(method=method.__name__):
+                self.assertQueryBudget(
+                    get_query_budget(ModuleDetailView, method.__name__.upper()),
+                    self.last_seeded_module,
+                    lambda module: self.send_json(
+                        method,
+                        reverse("module-detail", args=[module.pk]),
+                        {"description": "Edited"},
+                        **self.auth,
+                    ),
+                )
+
+    def test_module_delete(self):
+        self.assertQueryBudget(
+            get_query_budget(ModuleDetailView, "DELETE"),
+            self.last_seeded_module,
+            lambda module: self.client.delete(
+                reverse("module-detail", args=[module.pk]), **self.auth
+            ),
+        )
+
+    def test_my_permissions(self):
+        self.assertQueryBudget(
+            get_query_budget(MyPermissionsView, "GET"),
+            self.user_with_modules,
+            lambda user: self.client.get(reverse("my-permissions"), **auth_header(user)),
+        )
+
+    def test_user_permissions_admin_get(self):
+        self.assertQueryBudget(
+            get_query_budget(UserPermissionsAdminView, "GET"),
+            self.user_with_modules,
+            lambda user: self.client.get(
+                reverse("user-permissions-admin", args=[user.pk]), **self.auth
+            ),
+        )
+
+    def test_user_permissions_admin_put(self):
+        def update(user):
+            module_ids = [perm["module_id"] for perm in user.role.module_permissions]
+            return self.send_json(
+                self.client.put,
+                reverse("user-permissions-admin", args=[user.pk]),
+                {
+                    "permissions": [
+                        {"module_id": module_id, "visible": False, "permissions": {"update": True}}
+                        for module_id in module_ids
+                    ]
+                },
+                **self.auth,
+            )
+
+        self.assertQueryBudget(
+            get_query_budget(UserPermissionsAdminView, "PUT"), self.user_with_modules, update
+        )
+
+    def test_user_module_permission_list(self):
+        self.assertQueryBudget(
+            get_query_budget(UserModulePermissionListView, "GET"),
+            self.user_with_modules,
+            lambda user: self.client.get(
+                reverse("user-permissions", args=[user.pk]), **self.auth
+            ),
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PERMISSION_MODE="materialized")
+class UserPermissionsAdminPutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.modules = seed_modules(2, prefix="admin-put")
+        [cls.user] = seed_users(seed_role(cls.modules[:1], role_name="Admin put"), 1, prefix="admin-put")
+
+    def put(self, permissions):
+        return self.client.put(
+            reverse("user-permissions-admin", args=[self.user.pk]),
+            {"permissions": permissions},
+            content_type="application/json",
+            **auth_header(self.user),
+        )
+
+    def test_updates_only_the_flags_sent(self):
+        response = self.put([{"module_id": str(self.modules[1].pk), "permissions": {"read": True}}])
+
+        self.assertEqual(response.status_code, 200)
+        perm = UserModulePermission.objects.get(user=self.user, module=self.modules[1])
+        self.assertEqual(
+            (perm.visible, perm.can_read, perm.can_update), (False, True, False)
+        )
+
+    def test_malformed_module_id_is_a_400(self):
+        response = self.put([{"module_id": "not-a-uuid", "visible": True}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UserModulePermission.objects.filter(user=self.user).exists())
+
+    def test_unknown_module_is_a_400_and_writes_nothing(self):
+        unknown = "00000000-0000-7000-8000-000000000000"
+        response = self.put(
+            [
+                {"module_id": str(self.modules[1].pk), "visible": True},
+                {"module_id": unknown, "visible": True},
+            ]
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(unknown, str(response.json()))
+        self.assertFalse(UserModulePermission.objects.filter(user=self.user).exists())
+
+    def test_non_boolean_flag_is_a_400(self):
+        response = self.put(
+            [{"module_id": str(self.modules[1].pk), "permissions": {"read": "sometimes"}}]
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RolePermissionPropagationViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = seed_role(seed_modules(1, prefix="propagation"), role_name="Propagation")
+        cls.other_role = seed_role([], role_name="Other propagation")
+        [cls.user] = seed_users(cls.role, 1, prefix="propagation")
+
+    def setUp(self):
+        cache.clear()
+
+    def status(self, role, task_id):
+        with patch("roles_permissions.views.AsyncResult") as result:
+            result.return_value.state = "SUCCESS"
+            result.return_value.info = {"done": 1, "total": 1}
+            return self.client.get(
+                reverse("role-permission-propagation", args=[role.pk, task_id]),
+                **auth_header(self.user),
+            )
+
+    def schedule(self):
+        with patch("roles_permissions.tasks.propagate_role_permissions.apply_async") as apply_async:
+            apply_async.return_value.id = "issued-task"
+            return schedule_role_permission_propagation(self.role.pk, {})
+
+    def test_issued_task_is_reported(self):
+        task_id = self.schedule()
+
+        response = self.status(self.role, task_id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["state"], "SUCCESS")
+
+    def test_other_tasks_are_not_found(self):
+        task_id = self.schedule()
+
+        for role, other_task in ((self.role, "celery-internal-task"), (self.other_role, task_id)):
+            with self.subTest(role=role.role_name, task_id=other_task):
+                self.assertEqual(self.status(role, other_task).status_code, 404)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    RESPONSE_CACHE=True,
+    SINGLE_FLIGHT=True,
+    SINGLE_FLIGHT_DISTRIBUTED=False,
+    SINGLE_FLIGHT_STATS_INTERVAL=0,
+)
+class SingleFlightTests(TransactionTestCase):
+    """
+    Concurrent response-cache misses on api/modules/. Each request runs on its
+    own thread and connection, so the rows must be committed.
+    """
+
+    followers = 7
+
+    def setUp(self):
+        seed_modules(20, prefix="single-flight")
+        cache.clear()
+        single_flight.reset()
+
+    def test_concurrent_misses_have_one_leader(self):
+        total = self.followers + 1
+        arrivals = threading.Semaphore(0)
+
+        class CountingFlights(dict):
+            # join() looks its key up here, under the lock, before leading or waiting
+            def get(self, key, default=None):
+                arrivals.release()
+                return super().get(key, default)
+
+        list_modules = ModuleListCreateView.list
+
+        def list_once_all_joined(view, request, *args, **kwargs):
+            # only the leader gets here: hold it until every request has joined
+            for _ in range(total):
+                arrivals.acquire(timeout=5)
+            return list_modules(view, request, *args, **kwargs)
+
+        def fetch(_):
+            try:
+                return Client().get(reverse("module-list-create"))
+            finally:
+                connections.close_all()
+
+        with patch.object(single_flight, "_flights", CountingFlights()), patch.object(
+            ModuleListCreateView, "list", list_once_all_joined
+        ), ThreadPoolExecutor(max_workers=total) as pool:
+            responses = list(pool.map(fetch, range(total)))
+
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual(len({response.content for response in responses}), 1)
+        self.assertEqual(
+            single_flight.snapshot()["ModuleListCreateView"],
+            {"leaders": 1, "coalesced": self.followers, "remote_coalesced": 0, "timeouts": 0},
+        )
+
+    @override_settings(SINGLE_FLIGHT_STATS_INTERVAL=0.01)
+    def test_stats_are_logged_and_reset_each_interval(self):
+        single_flight.record("ModuleListCreateView", "leaders")
+        time.sleep(0.02)
+
+        with self.assertLogs("HSM_AI.helper.single_flight", "INFO") as logs:
+            single_flight.record("ModuleListCreateView", "coalesced")
+
+        self.assertEqual(
+            logs.records[0].structured["views"]["ModuleListCreateView"],
+            {"leaders": 1, "coalesced": 1, "remote_coalesced": 0, "timeouts": 0},
+        )
+        self.assertEqual(single_flight.snapshot(), {})
@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     RoleListCreateView,
     RoleDetailView,
+    RolePermissionPropagationView,
     ModuleListCreateView,
     ModuleDetailView,
     MyPermissionsView,
@@ -13,6 +14,7 @@ urlpatterns = [
     # -------- Roles --------
     path("roles/", RoleListCreateView.as_view(), name="role-list-create"),
     path("roles/<uuid:pk>/", RoleDetailView.as_view(), name="role-detail"),
+    path("roles/<uuid:pk>/propagation/<str:task_id>/", RolePermissionPropagationView.as_view(), name="role-permission-propagation"),
 
     # -------- Modules --------
     path("modules/", ModuleListCreateView.as_view(), name="module-list-create"),
@@ -1,17 +1,36 @@
+from celery.result import AsyncResult
 from rest_framework import generics, status, filters, permissions
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.utils import timezone
+from django.conf import settings
 
 from .models import Role, Module, UserModulePermission
 from .serializers import (
     RoleSerializer,
     ModuleSerializer,
     UserModulePermissionSerializer,
+    UserPermissionsUpdateSerializer,
 )
 from HSM_AI import utils
-from HSM_AI.helper.pagination import CustomPagination
+from HSM_AI.helper.conditional import ConditionalGetMixin
+from HSM_AI.helper.fast_serializers import FastListMixin, ValuesSerializer
+from HSM_AI.helper.response_cache import ResponseCacheMixin
+from HSM_AI.helper.pagination import CustomPagination, get_list_ordering
+from HSM_AI.helper.cache_versions import bump_version
+from authentication.models import Users
+from .cache import get_my_permissions_data
+from .permissions import get_permission_version
+from .tasks import is_role_propagation_task
+from .services import (
+    PERMISSION_FIELDS,
+    get_effective_permissions,
+    get_role_defaults,
+    is_overlay_mode,
+)
 
 
 # ------------------- ROLE CRUD -------------------
@@ -45,7 +64,9 @@ from HSM_AI.helper.pagination import CustomPagination
 #             return utils.error_response("Failed to fetch roles.", str(e), 500, 500)
 
 
-class RoleListCreateView(generics.ListCreateAPIView):
+class RoleListCreateView(
+    ConditionalGetMixin, ResponseCacheMixin, FastListMixin, generics.ListCreateAPIView
+):
     """
     List all roles with pagination & search OR create a new one
     """
@@ -53,56 +74,62 @@ class RoleListCreateView(generics.ListCreateAPIView):
     serializer_class = RoleSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination  # ✅ Add pagination class
+    # GET: principal (cache miss) + COUNT + page (the ETag check only reads cache versions)
+    # POST: principal + INSERT + try_save savepoint
+    query_budget = {"GET": 3, "POST": 4}
+    response_cache_versions = ("roles",)
     """ For first time role creation we need to remove authentication """
 
     # authentication_classes = []
     # permission_classes = []
     def get_queryset(self):
         # Only fetch active & not soft-deleted roles
-        queryset = Role.objects.filter(is_deleted=False).order_by("created_date")
+        queryset = Role.objects.filter(is_deleted=False).order_by(
+            *get_list_ordering(self.request)
+        )
 
         # ✅ search filter
         search_term = self.request.query_params.get("search", None)
-        queryset = self.serializer_class.apply_search(queryset, search_term)
+        queryset = self.serializer_class.apply_search(
+            queryset,
+            search_term,
+            rank=self.request.query_params.get("ordering") == "relevance",
+        )
 
         return queryset
 
+    def get_conditional_validators(self, request, *args, **kwargs):
+        return self.list_validators("roles")
+
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
+            # values() rows + precompiled serializer (or ?fields= projection)
+            queryset = self.get_list_queryset()
             page = self.paginate_queryset(queryset)
             if page is not None:
-                serializer = self.get_serializer(page, many=True)
                 # DRF's get_paginated_response handles the data structure
-                return self.get_paginated_response(serializer.data)
+                return self.get_paginated_response(self.serialize_list(page))
 
-            serializer = self.get_serializer(queryset, many=True)
+            data = self.serialize_list(queryset)
             return utils.success_response(
                 message="Roles fetched successfully.",
-                data=serializer.data,
+                data=data,
                 status_code=status.HTTP_200_OK,
             )
+        except APIException:
+            # invalid cursor or page: let DRF answer 404 / 400
+            raise
         except Exception as e:
             return utils.error_response("Failed to fetch roles.", str(e), 500, 500)
 
     def create(self, request, *args, **kwargs):
-        is_role_exist = Role.objects.filter(
-            role_name__iexact=request.data.get("role_name"),
-            is_deleted=False,
-        ).exists()
-
-        if is_role_exist:
-            return utils.error_response(
-                message="Role name already exists.", errors=None, status_code=400
-            )
-
         try:
             serializer = self.get_serializer(data=request.data)
-            if serializer.is_valid():
-                role = serializer.save()
+            # Name uniqueness is enforced by the DB (role_role_name_ci_uniq)
+            if serializer.is_valid() and serializer.try_save():
                 return utils.success_response(
                     message="Role added successfully.",
-                    data=self.get_serializer(role).data,
+                    data=self.get_serializer(serializer.instance).data,
                     status_code=status.HTTP_200_OK,
                 )
 
@@ -124,7 +151,9 @@ class RoleListCreateView(generics.ListCreateAPIView):
             return utils.error_response("Failed to create role.", str(e), 500)
 
 
-class RoleDetailView(generics.RetrieveUpdateDestroyAPIView):
+class RoleDetailView(
+    ConditionalGetMixin, ResponseCacheMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     Get, Update or Soft Delete a single role
     """
@@ -133,11 +162,19 @@ class RoleDetailView(generics.RetrieveUpdateDestroyAPIView):
     # permission_classes = [IsAuthenticated]
     authentication_classes = []
     permission_classes = []
+    # GET: modified_date (ETag) + role
+    # PUT/PATCH: role + UPDATE + try_save savepoint (propagation runs after commit)
+    # DELETE: role + soft delete UPDATE
+    query_budget = {"GET": 2, "PUT": 4, "PATCH": 4, "DELETE": 2}
+    response_cache_versions = ("roles",)
 
     def get_queryset(self):
         # Only fetch not soft-deleted roles
         return Role.objects.filter(is_deleted=False)
 
+    def get_conditional_validators(self, request, *args, **kwargs):
+        return self.object_validators(self.get_queryset(), kwargs["pk"])
+
     def retrieve(self, request, *args, **kwargs):
         try:
             role = self.get_object()
@@ -156,11 +193,15 @@ class RoleDetailView(generics.RetrieveUpdateDestroyAPIView):
             role = self.get_object()  # DRF handles pk lookup automatically
 
             serializer = self.get_serializer(role, data=request.data, partial=partial)
-            if serializer.is_valid():
-                serializer.save()
+            if serializer.is_valid() and serializer.try_save():
+                data = serializer.data
+                # users of this role are updated in the background; poll with this id
+                task_id = getattr(serializer, "propagation_task_id", None)
+                if task_id:
+                    data = {**data, "propagation_task_id": task_id}
                 return utils.success_response(
                     message="Role updated successfully.",
-                    data=serializer.data,
+                    data=data,
                     status_code=status.HTTP_200_OK,
                 )
 
@@ -228,22 +269,72 @@ class RoleDetailView(generics.RetrieveUpdateDestroyAPIView):
             return utils.error_response("Failed to delete role.", str(e), 500, 500)
 
 
+class RolePermissionPropagationView(generics.GenericAPIView):
+    """
+    Progress of the background job that pushes a role edit to its users.
+    Only task ids issued for this role are answered, anything else is a 404.
+    """
+
+    permission_classes = [IsAuthenticated]
+    # principal (the progress comes from the result backend)
+    query_budget = {"GET": 1}
+
+    def get(self, request, pk, task_id, *args, **kwargs):
+        try:
+            if not is_role_propagation_task(pk, task_id):
+                return utils.error_response(
+                    "Propagation task not found.",
+                    None,
+                    status.HTTP_404_NOT_FOUND,
+                    status.HTTP_404_NOT_FOUND,
+                )
+
+            result = AsyncResult(task_id)
+            info = result.info if isinstance(result.info, dict) else {}
+            return utils.success_response(
+                message="Propagation status fetched successfully.",
+                data={
+                    "task_id": task_id,
+                    "state": result.state,
+                    "done": info.get("done"),
+                    "total": info.get("total"),
+                },
+                status_code=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            return utils.error_response(
+                "Failed to fetch propagation status.", str(e), 500, 500
+            )
+
+
 # ------------------- MODULE CRUD -------------------
 
 
-class ModuleListCreateView(generics.ListCreateAPIView):
+class ModuleListCreateView(
+    ConditionalGetMixin, ResponseCacheMixin, FastListMixin, generics.ListCreateAPIView
+):
     serializer_class = ModuleSerializer
     # permission_classes = [IsAuthenticated]
     # authentication_classes = []
     # permission_classes = []
     pagination_class = CustomPagination
+    # GET: principal (cache miss) + COUNT + page (the ETag check only reads cache versions)
+    # POST: principal + INSERT + try_save savepoint
+    query_budget = {"GET": 3, "POST": 4}
+    response_cache_versions = ("modules",)
 
     def get_queryset(self):
-        queryset = Module.objects.filter(is_deleted=False).order_by("created_date")
+        queryset = Module.objects.filter(is_deleted=False).order_by(
+            *get_list_ordering(self.request)
+        )
 
         # ✅ search
         search_term = self.request.query_params.get("search", None)
-        queryset = self.serializer_class.apply_search(queryset, search_term)
+        queryset = self.serializer_class.apply_search(
+            queryset,
+            search_term,
+            rank=self.request.query_params.get("ordering") == "relevance",
+        )
 
         # ✅ status filter (active / inactive)
         status_filter = self.request.query_params.get("status", None)
@@ -252,31 +343,36 @@ class ModuleListCreateView(generics.ListCreateAPIView):
 
         return queryset
 
+    def get_conditional_validators(self, request, *args, **kwargs):
+        return self.list_validators("modules")
+
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
+            # values() rows + precompiled serializer (or ?fields= projection)
+            queryset = self.get_list_queryset()
             page = self.paginate_queryset(queryset)
             if page is not None:
-                serializer = self.get_serializer(page, many=True)
-                return self.get_paginated_response(serializer.data)
+                return self.get_paginated_response(self.serialize_list(page))
 
-            serializer = self.get_serializer(queryset, many=True)
+            data = self.serialize_list(queryset)
             return utils.success_response(
                 message="Modules fetched successfully.",
-                data=serializer.data,
+                data=data,
                 status_code=status.HTTP_200_OK,
             )
+        except APIException:
+            # invalid cursor or page: let DRF answer 404 / 400
+            raise
         except Exception as e:
             return utils.error_response("Failed to fetch modules.", str(e), 500, 500)
 
     def create(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
-            if serializer.is_valid():
-                module = serializer.save()
+            if serializer.is_valid() and serializer.try_save():
                 return utils.success_response(
                     message="Module created successfully.",
-                    data=self.get_serializer(module).data,
+                    data=self.get_serializer(serializer.instance).data,
                     status_code=status.HTTP_200_OK,
                 )
 
@@ -289,6 +385,15 @@ class ModuleListCreateView(generics.ListCreateAPIView):
                     message="Module name already exists.", errors=None, status_code=400
                 )
 
+            # Handle duplicate path
+            if "path" in serializer.errors and any(
+                "already exists" in str(err).lower()
+                for err in serializer.errors["path"]
+            ):
+                return utils.error_response(
+                    message="Module path already exists.", errors=None, status_code=400
+                )
+
             # Generic validation error
             return utils.error_response(
                 message="Validation error.", errors=serializer.errors, status_code=400
@@ -298,17 +403,24 @@ class ModuleListCreateView(generics.ListCreateAPIView):
             return utils.error_response("Failed to create module.", str(e), 500, 500)
 
 
-class ModuleDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ModuleDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Get, Update or Soft Delete a single module
     """
 
     serializer_class = ModuleSerializer
     permission_classes = [IsAuthenticated]
+    # GET: principal + modified_date (ETag) + module
+    # PUT/PATCH: principal + module + UPDATE + try_save savepoint
+    # DELETE: principal + module + soft delete UPDATE
+    query_budget = {"GET": 3, "PUT": 5, "PATCH": 5, "DELETE": 3}
 
     def get_queryset(self):
         return Module.objects.filter(is_deleted=False)
 
+    def get_conditional_validators(self, request, *args, **kwargs):
+        return self.object_validators(self.get_queryset(), kwargs["pk"])
+
     def retrieve(self, request, *args, **kwargs):
         try:
             module = self.get_object()
@@ -325,8 +437,7 @@ class ModuleDetailView(generics.RetrieveUpdateDestroyAPIView):
         try:
             module = self.get_object()
             serializer = self.get_serializer(module, data=request.data, partial=True)
-            if serializer.is_valid():
-                serializer.save()
+            if serializer.is_valid() and serializer.try_save():
                 return utils.success_response(
                     message="Module updated successfully.",
                     data=serializer.data,
@@ -378,9 +489,11 @@ class ModuleDetailView(generics.RetrieveUpdateDestroyAPIView):
 # ------------------- USER MODULE PERMISSIONS CRUD -------------------
 
 
-class MyPermissionsView(generics.GenericAPIView):
+class MyPermissionsView(ConditionalGetMixin, generics.GenericAPIView):
     serializer_class = UserModulePermissionSerializer
     permission_classes = [IsAuthenticated]
+    # cache miss: principal + overrides (+ role modules in overlay mode)
+    query_budget = {"GET": 3}
 
     def get_queryset(self):
         # fetch only active modules
@@ -388,14 +501,18 @@ class MyPermissionsView(generics.GenericAPIView):
             user_id=self.request.user.id,
             module__status="active",  # ✅ filter
             module__is_deleted=False,
-        )
+        ).select_related("module")
+
+    def get_conditional_validators(self, request, *args, **kwargs):
+        # perm_ver covers the user's rows, their role and all modules: no query
+        return f"{request.user.pk}:{get_permission_version(request.user)}", None
 
     def get(self, request, *args, **kwargs):
         try:
-            permissions = self.get_queryset()
-            serializer = self.get_serializer(permissions, many=True)
             return utils.success_response(
-                "Your permissions fetched successfully.", serializer.data, 200
+                "Your permissions fetched successfully.",
+                get_my_permissions_data(request.user),
+                200,
             )
         except Exception as e:
             return utils.error_response(
@@ -411,16 +528,21 @@ class MyPermissionsView(generics.GenericAPIView):
 class UserPermissionsAdminView(generics.GenericAPIView):
     serializer_class = UserModulePermissionSerializer
     permission_classes = [IsAuthenticated]
+    # GET: principal + overrides (+ user and role modules in overlay mode)
+    # PUT: principal + rows locked + bulk UPDATE + savepoint, editing existing overrides
+    query_budget = {"GET": 4, "PUT": 5}
 
     def get_queryset(self, user_id):
-        return UserModulePermission.objects.filter(user_id=user_id)
+        return UserModulePermission.objects.filter(user_id=user_id).select_related(
+            "module"
+        )
 
     def get(self, request, user_id, *args, **kwargs):
         try:
             # if not request.user.is_superuser:
             #     return utils.error_response("Forbidden: Only super admin can fetch other user's permissions.", {}, 403)
 
-            permissions = self.get_queryset(user_id)
+            permissions = get_effective_permissions(user_id)
             serializer = self.get_serializer(permissions, many=True)
             return utils.success_response(
                 "User permissions fetched successfully.", serializer.data, 200
@@ -431,42 +553,103 @@ class UserPermissionsAdminView(generics.GenericAPIView):
             )
 
     def put(self, request, user_id, *args, **kwargs):
-        try:
-            permissions_data = request.data.get("permissions", [])
-            updated_permissions = []
-
-            for perm_data in permissions_data:
-                module_id = perm_data.get("module_id")
-                if not module_id:
-                    continue
+        payload = UserPermissionsUpdateSerializer(data=request.data)
+        if not payload.is_valid():
+            return utils.error_response(
+                message="Validation error.", errors=payload.errors, status_code=400
+            )
 
-                perm, created = UserModulePermission.objects.get_or_create(
-                    user_id=user_id,
-                    module_id=module_id,
+        try:
+            # (normalized module_id, payload) pairs, in payload order
+            permissions_data = [
+                (str(perm_data["module_id"]), perm_data)
+                for perm_data in payload.validated_data.get("permissions", [])
+            ]
+            module_ids = {module_id for module_id, _ in permissions_data}
+
+            with transaction.atomic():
+                # Single fetch of the rows being edited, locked for the upsert
+                existing = {
+                    str(perm.module_id): perm
+                    for perm in UserModulePermission.objects.select_for_update(
+                        of=("self",)
+                    )
+                    .filter(user_id=user_id, module_id__in=module_ids)
+                    .select_related("module")
+                }
+                new_modules = {
+                    str(pk): module
+                    for pk, module in Module.objects.filter(is_deleted=False)
+                    .in_bulk(module_ids - existing.keys())
+                    .items()
+                }
+                unknown = module_ids - existing.keys() - new_modules.keys()
+                if unknown:
+                    raise ValidationError(
+                        {"module_id": [f"Unknown module: {module_id}" for module_id in sorted(unknown)]}
+                    )
+
+                # overlay mode: a new override starts from the role default
+                role_defaults = {}
+                if is_overlay_mode():
+                    user = Users.objects.select_related("role").filter(pk=user_id).first()
+                    role_defaults = get_role_defaults(user.role if user else None)
+
+                to_create = {}
+                update_fields = set()
+                for module_id, perm_data in permissions_data:
+                    perm = existing.get(module_id) or to_create.get(module_id)
+                    if perm is None:
+                        defaults = role_defaults.get(module_id, {})
+                        perm = UserModulePermission(
+                            user_id=user_id,
+                            module_id=module_id,
+                            **{field: defaults.get(field, False) for field in PERMISSION_FIELDS},
+                        )
+                        if module_id in new_modules:
+                            perm.module = new_modules[module_id]
+                        to_create[module_id] = perm
+
+                    # Only update the fields present in payload
+                    if "visible" in perm_data:
+                        perm.visible = perm_data["visible"]
+                        update_fields.add("visible")
+
+                    perms = perm_data.get("permissions", {})
+                    for action in ("create", "read", "update", "delete"):
+                        if action in perms:
+                            setattr(perm, f"can_{action}", perms[action])
+                            update_fields.add(f"can_{action}")
+
+                if to_create:
+                    UserModulePermission.objects.bulk_create(to_create.values())
+
+                if existing and update_fields:
+                    now = timezone.now()
+                    for perm in existing.values():
+                        perm.modified_date = now
+                    UserModulePermission.objects.bulk_update(
+                        existing.values(), [*update_fields, "modified_date"]
+                    )
+
+            # bulk_* skip post_save, so invalidate the user's permission version here
+            bump_version("perms", user_id)
+
+            updated_permissions = [
+                existing.get(module_id) or to_create[module_id]
+                for module_id in dict.fromkeys(
+                    module_id for module_id, _ in permissions_data
                 )
-
-                # Only update the fields present in payload
-                if "visible" in perm_data:
-                    perm.visible = perm_data["visible"]
-
-                perms = perm_data.get("permissions", {})
-                if "create" in perms:
-                    perm.can_create = perms["create"]
-                if "read" in perms:
-                    perm.can_read = perms["read"]
-                if "update" in perms:
-                    perm.can_update = perms["update"]
-                if "delete" in perms:
-                    perm.can_delete = perms["delete"]
-
-                perm.save()
-                updated_permissions.append(perm)
-
+            ]
             serializer = self.get_serializer(updated_permissions, many=True)
             return utils.success_response(
                 "User permissions updated successfully.", serializer.data, 200
             )
 
+        except ValidationError as e:
+            return utils.error_response(
+                message="Validation error.", errors=e.detail, status_code=400
+            )
         except Exception as e:
             return utils.error_response(
                 "Failed to update user permissions.", str(e), 500
@@ -476,6 +659,8 @@ class UserPermissionsAdminView(generics.GenericAPIView):
 class UserModulePermissionListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = UserModulePermissionSerializer
+    # principal + overrides (+ user and role modules in overlay mode)
+    query_budget = {"GET": 4}
 
     def get_queryset(self):
         user_id = self.kwargs.get("user_id")
@@ -484,12 +669,21 @@ class UserModulePermissionListView(generics.ListAPIView):
         )
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        if settings.FAST_LIST_SERIALIZATION and not is_overlay_mode():
+            # materialized rows are the effective permissions: read them as values()
+            reader = ValuesSerializer(self.serializer_class, self.get_serializer_context())
+            data = reader.serialize(
+                reader.values(
+                    UserModulePermission.objects.filter(user_id=self.kwargs.get("user_id"))
+                )
+            )
+        else:
+            queryset = get_effective_permissions(self.kwargs.get("user_id"))
+            data = self.get_serializer(queryset, many=True).data
         return Response(
             {
                 "status": 200,
                 "message": "User permissions fetched successfully",
-                "data": serializer.data,
+                "data": data,
             }
         )
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from HSM_AI.helper.query_budget import assert_max_queries
+
+# Test-only helpers for the apps' tests.py (not imported by application code)
+
+# Process-local cache, so tests never touch (or depend on) Redis
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def auth_header(user):
+    """
+    Request kwargs authenticating as `user` with a real access token, so
+    authentication runs (and its queries are counted) like in production.
+    """
+    return {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
+
+
+class QueryPlanMixin:
+    """
+    EXPLAIN-based assertions for TestCase (Postgres only). Plans are taken with
+    sequential scans disabled: on test-sized tables a seq scan is always
+    cheapest, so this checks that an index *can* serve the query.
+    """
+
+    def explain(self, queryset, analyze_tables=()):
+        with connection.cursor() as cursor:
+            for table in analyze_tables:
+                cursor.execute(f'ANALYZE "{table}"')
+            # SET LOCAL ends with the test's transaction
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index_name, analyze_tables=()):
+        plan = self.explain(queryset, analyze_tables)
+        self.assertIn(index_name, plan, f"{index_name} not used:\n{plan}")
+        return plan
+
+    def assertIndexOnlyScan(self, queryset, index_name, analyze_tables=()):
+        # with plain and bitmap index scans off too, only a covering index
+        # (all selected columns in the index) can serve the query cheaply
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_indexscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+        plan = self.explain(queryset, analyze_tables)
+        expected = f"Index Only Scan using {index_name}"
+        self.assertIn(expected, plan, f"no index-only scan on {index_name}:\n{plan}")
+        return plan
+
+
+class QueryBudgetMixin:
+    """
+    Per-URL query budgets for TestCase. `assertQueryBudget` runs a request
+    once per size in `budget_sizes`, each time after `setup(size)` created
+    that many rows and with cold caches (the principal lookup is counted):
+    every run must stay within `budget` and run the same number of queries.
+    """
+
+    budget_sizes = (10, 1000)
+
+    def assertQueryBudget(self, budget, setup, request):
+        self.assertIsNotNone(budget, "the view declares no query_budget for this method")
+        counts = {}
+        for size in self.budget_sizes:
+            context = setup(size)
+            cache.clear()
+            with assert_max_queries(budget) as stats:
+                response = request(context)
+                # a streamed body runs its queries while it is consumed
+                if getattr(response, "streaming", False):
+                    b"".join(response.streaming_content)
+            self.assertLess(response.status_code, 400, getattr(response, "data", None))
+            counts[size] = stats.count
+        self.assertEqual(len(set(counts.values())), 1, f"queries by size: {counts}")
+        return response
+
+
+class FastListEquivalenceMixin:
+    """
+    `assertSameListOutput` fetches a list URL with FAST_LIST_SERIALIZATION on
+    (values() rows) and off (the DRF serializer), with cold caches, and
+    requires identical JSON bodies.
+    """
+
+    def assertSameListOutput(self, url, params=None, unordered=False, **extra):
+        bodies = []
+        for fast in (True, False):
+            cache.clear()
+            with override_settings(FAST_LIST_SERIALIZATION=fast):
+                response = self.client.get(url, params or {}, **extra)
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            if unordered:
+                # the query has no ORDER BY: compare rows, not their order
+                body["data"] = sorted(body["data"], key=repr)
+            bodies.append(body)
+        self.assertEqual(bodies[0], bodies[1])
+        return bodies[0]